@@ -1,144 +0,0 @@
-class InterruptDrivenLED:
-    """
-    A class that implements an interrupt-driven method using DSC timers and output compare modules
-    to control the timing of separate LED sequences.
-
-    Attributes:
-    - ir_led_timer (int): The timer number for the IR LED sequence.
-    - red_led_timer (int): The timer number for the red LED sequence.
-    - ir_led_oc (int): The output compare module number for the IR LED sequence.
-    - red_led_oc (int): The output compare module number for the red LED sequence.
-    """
-
-    def __init__(self, ir_led_timer: int, red_led_timer: int, ir_led_oc: int, red_led_oc: int):
-        """
-        Constructs a new InterruptDrivenLED instance.
-
-        Parameters:
-        - ir_led_timer (int): The timer number for the IR LED sequence.
-        - red_led_timer (int): The timer number for the red LED sequence.
-        - ir_led_oc (int): The output compare module number for the IR LED sequence.
-        - red_led_oc (int): The output compare module number for the red LED sequence.
-        """
-
-        self.ir_led_timer = ir_led_timer
-        self.red_led_timer = red_led_timer
-        self.ir_led_oc = ir_led_oc
-        self.red_led_oc = red_led_oc
-
-    def setup_interrupts(self):
-        """
-        Sets up the interrupts and timers for the LED sequences.
-
-        This function configures the DSC timers (Timer2 and Timer3) and the output compare modules
-        (OC1 and OC2) to control the timing of the IR LED and red LED sequences.
-
-        Raises:
-        - ValueError: If any of the timer or output compare module numbers are invalid.
-        """
-
-        # Check if the timer and output compare module numbers are valid
-        if self.ir_led_timer not in [2, 3] or self.red_led_timer not in [2, 3] or \
-                self.ir_led_oc not in [1, 2] or self.red_led_oc not in [1, 2]:
-            raise ValueError("Invalid timer or output compare module number.")
-
-        # Configure Timer2 for IR LED sequence
-        # ...
-
-        # Configure Timer3 for red LED sequence
-        # ...
-
-        # Configure OC1 for IR LED sequence
-        # ...
-
-        # Configure OC2 for red LED sequence
-        # ...
-
-    def start_ir_led_sequence(self):
-        """
-        Starts the IR LED sequence.
-
-        This function triggers the start of the IR LED sequence by enabling the corresponding
-        timer and output compare module.
-
-        Raises:
-        - ValueError: If the IR LED timer or output compare module numbers are invalid.
-        """
-
-        # Check if the IR LED timer and output compare module numbers are valid
-        if self.ir_led_timer not in [2, 3] or self.ir_led_oc not in [1, 2]:
-            raise ValueError("Invalid IR LED timer or output compare module number.")
-
-        # Enable Timer2 for IR LED sequence
-        # ...
-
-        # Enable OC1 for IR LED sequence
-        # ...
-
-    def start_red_led_sequence(self):
-        """
-        Starts the red LED sequence.
-
-        This function triggers the start of the red LED sequence by enabling the corresponding
-        timer and output compare module.
-
-        Raises:
-        - ValueError: If the red LED timer or output compare module numbers are invalid.
-        """
-
-        # Check if the red LED timer and output compare module numbers are valid
-        if self.red_led_timer not in [2, 3] or self.red_led_oc not in [1, 2]:
-            raise ValueError("Invalid red LED timer or output compare module number.")
-
-        # Enable Timer3 for red LED sequence
-        # ...
-
-        # Enable OC2 for red LED sequence
-        # ...
-
-    def stop_ir_led_sequence(self):
-        """
-        Stops the IR LED sequence.
-
-        This function stops the IR LED sequence by disabling the corresponding timer and output compare module.
-        """
-
-        # Disable Timer2 for IR LED sequence
-        # ...
-
-        # Disable OC1 for IR LED sequence
-        # ...
-
-    def stop_red_led_sequence(self):
-        """
-        Stops the red LED sequence.
-
-        This function stops the red LED sequence by disabling the corresponding timer and output compare module.
-        """
-
-        # Disable Timer3 for red LED sequence
-        # ...
-
-        # Disable OC2 for red LED sequence
-        # ...
-
-
-# Example usage of the InterruptDrivenLED class:
-
-# Create an instance of InterruptDrivenLED with timer and output compare module numbers
-led_controller = InterruptDrivenLED(ir_led_timer=2, red_led_timer=3, ir_led_oc=1, red_led_oc=2)
-
-# Set up the interrupts and timers for the LED sequences
-led_controller.setup_interrupts()
-
-# Start the IR LED sequence
-led_controller.start_ir_led_sequence()
-
-# Start the red LED sequence
-led_controller.start_red_led_sequence()
-
-# Stop the IR LED sequence
-led_controller.stop_ir_led_sequence()
-
-# Stop the red LED sequence
-led_controller.stop_red_led_sequence()
\ No newline at end of file
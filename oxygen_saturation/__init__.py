@@ -0,0 +1,70 @@
+"""
+Calculates the oxygen saturation using absorption spectroscopy measurements in red and NIR wavelengths.
+
+Importing the package has no side effects and imports none of its submodules: the names
+below are loaded from their submodule on first access, and pandas and openpyxl are only
+imported when a workbook is actually parsed.
+"""
+
+import importlib
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "calculate_log10_ratio_array": "calculate_log10_ratio",
+    "Log10RatioResult": "calculate_log10_ratio",
+    "calculate_scvo2_from_absorbance": "calculate_scvo2",
+    "calculate_scvo2_batch": "calculate_scvo2",
+    "calculate_average_median": "median_average",
+    "StreamingAggregator": "median_average",
+    "ChannelAggregators": "median_average",
+    "RollingMedian": "median_average",
+    "RollingScvO2": "rolling_scvo2",
+    "rolling_scvo2": "rolling_scvo2",
+    "BandpassFilter": "bandpass_filter",
+    "detect_beats": "peak_detection",
+    "BeatDetector": "peak_detection",
+    "calculate_spo2": "spo2_calculation",
+    "spo2_from_trace": "spo2_calculation",
+    "RatioLookupTable": "spo2_calculation",
+    "fit_calibration": "calibration",
+    "segment_trace": "segmentation",
+    "spo2_from_segments": "segmentation",
+    "read_numeric_columns": "read_excel",
+    "read_all_numeric_columns": "read_excel",
+    "WorkbookCache": "excel_cache",
+    "ExtinctionRegistry": "extinction",
+    "solve_saturation": "multiwavelength",
+    "calculate_saturation_lstsq": "multiwavelength",
+    "DualChannelRingBuffer": "ring_buffer",
+    "iter_capture_chunks": "capture_reader",
+    "BinaryCaptureWriter": "capture_reader",
+    "ColumnarCapture": "columnar_capture",
+    "write_columnar_capture": "columnar_capture",
+    "InterruptDrivenLED": "interrupt_driven_led",
+    "run_batch": "batch_scvo2",
+    "ResultsStore": "results_store",
+    "bootstrap_sheets": "bootstrap_scvo2",
+    "run_bootstrap": "bootstrap_scvo2",
+    "AcquisitionServer": "acquisition_server",
+    "SimulatedDevice": "acquisition_server",
+    "MeasurementSession": "measurement_session",
+    "score_measurement_sets": "measurement_session",
+    "Instrumentation": "instrumentation",
+    "INSTRUMENTATION": "instrumentation",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,605 @@
+import asyncio
+import math
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+from .bandpass_filter import SAMPLE_RATE_HZ, BandpassFilter
+from .interrupt_driven_led import SimulatedADC
+from .measurement_session import MeasurementSession
+from .peak_detection import BeatDetector
+from .segmentation import DEFAULT_THRESHOLDS, STATUS_NAMES, VALID, Thresholds, segment_trace
+from .spo2_calculation import DEFAULT_LOOKUP_TABLE, RatioLookupTable, calculate_spo2
+
+# Framed protocol, all little-endian. Every frame is a header followed by its payload:
+#   magic     2 bytes   b"OX"
+#   version   uint8     PROTOCOL_VERSION
+#   type      uint8     HELLO, SAMPLES, MEASUREMENT or BYE
+#   length    uint32    length of the payload in bytes, at most MAX_PAYLOAD
+# Payloads:
+#   HELLO        float32 sample rate in Hz, uint16 length, then the UTF-8 device id; always first
+#   SAMPLES      uint32 index of the first sample, then one row of uint16 ADC counts per sample:
+#                CH0_ADRES_Red, CH1_ADRES_Red, CH0_ADRES_IR, CH1_ADRES_IR (DC and AC of each LED)
+#   MEASUREMENT  uint16 red and NIR wavelengths in nm, then float32 red air, red sample,
+#                NIR air and NIR sample optical powers
+#   BYE          empty; the device is done
+FRAME_MAGIC = b"OX"
+PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBBI")
+HELLO, SAMPLES, MEASUREMENT, BYE = 1, 2, 3, 4
+MAX_PAYLOAD = 1 << 20
+
+_HELLO = struct.Struct("<fH")
+_SAMPLES = struct.Struct("<I")
+_MEASUREMENT = struct.Struct("<HH4f")
+_SAMPLE_DTYPE = np.dtype("<u2")
+_SAMPLE_COLUMNS = 4
+
+# Swings of the filtered AC smaller than this, in ADC counts, are noise or the dicrotic notch
+DEFAULT_MIN_AMPLITUDE = 100.0
+
+# Default number of results waiting for a consumer before the devices are slowed down
+DEFAULT_QUEUE_SIZE = 1024
+
+
+class ProtocolError(ValueError):
+    """
+    Raised when a device sends a malformed or unexpected frame.
+    """
+
+
+def encode_frame(frame_type: int, payload: bytes = b"") -> bytes:
+    """
+    Encodes one frame of the acquisition protocol.
+
+    Parameters:
+    - frame_type (int): HELLO, SAMPLES, MEASUREMENT or BYE.
+    - payload (bytes): The payload of the frame.
+
+    Returns:
+    bytes: The header followed by the payload.
+
+    Raises:
+    - ProtocolError: If the payload is longer than MAX_PAYLOAD.
+    """
+
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame payload of {len(payload)} bytes exceeds {MAX_PAYLOAD} bytes.")
+    return FRAME_HEADER.pack(FRAME_MAGIC, PROTOCOL_VERSION, frame_type, len(payload)) + payload
+
+
+def encode_hello(device_id: str, sample_rate_hz: float = SAMPLE_RATE_HZ) -> bytes:
+    """
+    Encodes the HELLO frame that opens a device stream.
+    """
+
+    name = device_id.encode("utf-8")
+    return encode_frame(HELLO, _HELLO.pack(sample_rate_hz, len(name)) + name)
+
+
+def decode_hello(payload: bytes) -> tuple:
+    """
+    Decodes the payload of a HELLO frame.
+
+    Returns:
+    tuple: The device id and its sampling rate in Hz.
+
+    Raises:
+    - ProtocolError: If the payload is too short or the sampling rate is not a positive number.
+
+    Examples:
+    >>> decode_hello(encode_hello("bed-1")[FRAME_HEADER.size:])
+    ('bed-1', 250.0)
+    >>> decode_hello(encode_hello("bed-1", float("nan"))[FRAME_HEADER.size:])
+    Traceback (most recent call last):
+    ...
+    oxygen_saturation.acquisition_server.ProtocolError: Unsupported sample rate of nan Hz.
+    """
+
+    if len(payload) < _HELLO.size:
+        raise ProtocolError("HELLO payload is too short.")
+
+    sample_rate_hz, length = _HELLO.unpack_from(payload)
+    if not (math.isfinite(sample_rate_hz) and sample_rate_hz > 0):
+        raise ProtocolError(f"Unsupported sample rate of {sample_rate_hz:g} Hz.")
+
+    return payload[_HELLO.size:_HELLO.size + length].decode("utf-8"), sample_rate_hz
+
+
+def encode_samples(first_index: int, red_dc, red_ac, ir_dc, ir_ac) -> bytes:
+    """
+    Encodes a SAMPLES frame.
+
+    Parameters:
+    - first_index (int): The index of the first sample since the start of the stream.
+    - red_dc, red_ac, ir_dc, ir_ac (array_like): The ADC counts of the samples, 0...65535.
+
+    Returns:
+    bytes: The frame.
+
+    Examples:
+    >>> frame = encode_samples(0, [1500], [2048], [1800], [2048])
+    >>> len(frame), decode_samples(frame[FRAME_HEADER.size:])[1].tolist()
+    (20, [[1500, 2048, 1800, 2048]])
+    """
+
+    rows = np.column_stack([np.asarray(column).ravel() for column in (red_dc, red_ac, ir_dc, ir_ac)])
+    return encode_frame(SAMPLES, _SAMPLES.pack(first_index) + rows.astype(_SAMPLE_DTYPE).tobytes())
+
+
+def decode_samples(payload: bytes) -> tuple:
+    """
+    Decodes the payload of a SAMPLES frame.
+
+    Returns:
+    tuple: The index of the first sample and an (n, 4) array of the Red DC, Red AC, IR DC
+    and IR AC counts.
+
+    Raises:
+    - ProtocolError: If the payload is not a whole number of samples.
+    """
+
+    if len(payload) < _SAMPLES.size or (len(payload) - _SAMPLES.size) % (_SAMPLE_COLUMNS * _SAMPLE_DTYPE.itemsize):
+        raise ProtocolError("SAMPLES payload is not a whole number of samples.")
+
+    (first_index,) = _SAMPLES.unpack_from(payload)
+    rows = np.frombuffer(payload, dtype=_SAMPLE_DTYPE, offset=_SAMPLES.size).reshape(-1, _SAMPLE_COLUMNS)
+    return first_index, rows
+
+
+def encode_measurement(red_air: float, red_sample: float, nir_air: float, nir_sample: float,
+                       red_wavelength: int = 660, nir_wavelength: int = 810) -> bytes:
+    """
+    Encodes a MEASUREMENT frame with one set of air/sample optical powers.
+    """
+
+    return encode_frame(MEASUREMENT, _MEASUREMENT.pack(red_wavelength, nir_wavelength,
+                                                       red_air, red_sample, nir_air, nir_sample))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple:
+    """
+    Reads one frame.
+
+    Returns:
+    tuple: The frame type and payload, or None if the stream ended between two frames.
+
+    Raises:
+    - ProtocolError: If the header is invalid.
+    - asyncio.IncompleteReadError: If the stream ended inside a frame.
+    """
+
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as error:
+        if not error.partial:
+            return None
+        raise
+
+    magic, version, frame_type, length = FRAME_HEADER.unpack(header)
+    if magic != FRAME_MAGIC or version != PROTOCOL_VERSION:
+        raise ProtocolError("Not an acquisition protocol frame, or an unsupported version.")
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame payload of {length} bytes exceeds {MAX_PAYLOAD} bytes.")
+
+    return frame_type, await reader.readexactly(length)
+
+
+class DeviceResult(NamedTuple):
+    """
+    A result published by the acquisition server.
+
+    Attributes:
+    - device_id (str): The device that sent the data.
+    - kind (str): 'spo2' for a beat of the sample stream, 'scvo2' for a MEASUREMENT frame.
+    - sample_index (int): The sample index of the beat (IR_Min2), or of the last sample
+      received before the measurement.
+    - time (float): sample_index in seconds since the start of the stream.
+    - value (float): The %SpO2 or %ScvO2.
+    - pulse_rate (float): The pulse rate of the beat in beats per minute, NaN for ScvO2.
+    """
+
+    device_id: str
+    kind: str
+    sample_index: int
+    time: float
+    value: float
+    pulse_rate: float
+
+
+class DevicePipeline:
+    """
+    The incremental processing of one device stream: filtering, beat detection and SpO2.
+
+    Each SAMPLES frame is filtered with the state of the previous ones, so the beats are
+    the same whatever the frame size. The probe-off and no-finger samples are skipped, and
+    the first num_taps - 1 filtered samples of each valid segment, where the delay line is
+    still filling, give no beat.
+
+    Examples:
+    >>> adc = SimulatedADC(seed=1)
+    >>> times = np.arange(2500) / SAMPLE_RATE_HZ
+    >>> red_dc, red_ac = adc.read('red', times)
+    >>> ir_dc, ir_ac = adc.read('ir', times)
+    >>> pipeline = DevicePipeline("bed-1")
+    >>> results = pipeline.process_samples(0, np.column_stack((red_dc, red_ac, ir_dc, ir_ac)))
+    >>> len(results), round(results[-1].value, 1), round(results[-1].pulse_rate)
+    (5, 97.5, 72)
+    """
+
+    def __init__(self, device_id: str, sample_rate_hz: float = SAMPLE_RATE_HZ,
+                 lookup_table: RatioLookupTable = DEFAULT_LOOKUP_TABLE,
+                 min_amplitude: float = DEFAULT_MIN_AMPLITUDE, bandpass: BandpassFilter = None,
+                 thresholds: Thresholds = DEFAULT_THRESHOLDS):
+        """
+        Constructs a new DevicePipeline instance.
+
+        Parameters:
+        - device_id (str): The device sending the stream.
+        - sample_rate_hz (float): The sampling rate of the device in Hz.
+        - lookup_table (RatioLookupTable): The Ratio-to-SpO2 table.
+        - min_amplitude (float): See peak_detection.detect_beats, in ADC counts.
+        - bandpass (BandpassFilter, optional): A two-channel filter for the Red and IR AC,
+          BandpassFilter.design at sample_rate_hz by default.
+        - thresholds (Thresholds): The thresholds of the probe-off and finger-present checks.
+        """
+
+        self.device_id = device_id
+        self.sample_rate_hz = sample_rate_hz
+        self.lookup_table = lookup_table
+        self.bandpass = bandpass if bandpass is not None else BandpassFilter.design(sample_rate_hz=sample_rate_hz,
+                                                                                     n_channels=2)
+        self.detector = BeatDetector(sample_rate_hz, min_amplitude)
+        self.thresholds = thresholds
+        self.session = None
+        self.n_samples = 0
+
+        # The status of the last sample, and the DC levels of the samples the detector may
+        # still report a beat on, from the start of the current valid segment
+        self._status = None
+        self._restart(0)
+
+    def process_samples(self, first_index: int, rows) -> list:
+        """
+        Consumes the samples of one SAMPLES frame.
+
+        Only the valid samples are filtered and searched for beats: at the start of each
+        valid segment, the filter and the beat detector restart.
+
+        Parameters:
+        - first_index (int): The index of the first sample, which must follow the previous frame.
+        - rows (array_like): An (n, 4) array of Red DC, Red AC, IR DC and IR AC counts.
+
+        Returns:
+        list: One DeviceResult per beat completed by these samples, and one with the kind
+        'probe_off' or 'no_finger' and a NaN value when such a segment starts.
+
+        Raises:
+        - ProtocolError: If samples are missing or repeated.
+        """
+
+        if first_index != self.n_samples:
+            raise ProtocolError(f"Expected sample {self.n_samples} from '{self.device_id}', got {first_index}.")
+
+        rows = np.asarray(rows, dtype=float).reshape(-1, _SAMPLE_COLUMNS)
+        self.n_samples += rows.shape[0]
+
+        results = []
+        segments = segment_trace(rows[:, 0], rows[:, 1], self.thresholds)
+        for start, stop, status in zip(segments.start.tolist(), segments.stop.tolist(), segments.status.tolist()):
+            if status != self._status:
+                self._status = status
+                if status == VALID:
+                    self._restart(first_index + start)
+                else:
+                    index = first_index + start
+                    results.append(DeviceResult(self.device_id, STATUS_NAMES[status], index,
+                                                index / self.sample_rate_hz, math.nan, math.nan))
+
+            if status == VALID:
+                results.extend(self._process_valid(rows[start:stop]))
+
+        return results
+
+    def _restart(self, index: int):
+        """
+        Restarts the filter and the beat detector at the first sample of a valid segment.
+        """
+
+        self.bandpass.reset()
+        self.detector.reset()
+
+        # The outputs depending on the zeros of the delay line are not passed to the detector
+        self._settling = self.bandpass.num_taps - 1
+        self._segment_start = index + self._settling
+        self._dc = np.empty((0, 2))
+        self._dc_start = 0
+
+    def _process_valid(self, rows: np.ndarray) -> list:
+        """
+        Filters valid samples and returns the DeviceResult of the beats they complete.
+        """
+
+        filtered = self.bandpass.process(rows[:, [1, 3]].T)
+        if self._settling:
+            skipped = min(self._settling, rows.shape[0])
+            self._settling -= skipped
+            filtered = filtered[:, skipped:]
+            rows = rows[skipped:]
+
+        # The detector counts the samples from the end of the settling, and so does the DC history
+        beats = self.detector.process(filtered[1], filtered[0])
+        self._dc = np.concatenate((self._dc, rows[:, [0, 2]]))
+
+        results = []
+        if beats.beat_index.size:
+            dc = self._dc[beats.beat_index - self._dc_start]
+            spo2 = calculate_spo2(*beats.ir_extrema.T, *beats.red_extrema.T, dc[:, 0], dc[:, 1], self.lookup_table).spo2
+            results = [DeviceResult(self.device_id, "spo2", self._segment_start + int(index),
+                                    (self._segment_start + index) / self.sample_rate_hz, float(value), float(rate))
+                       for index, value, rate in zip(beats.beat_index, spo2, beats.pulse_rate)]
+
+        # Keeping the DC levels of exactly the samples still pending in the detector, where
+        # its next beats will be
+        keep = self.detector.pending
+        self._dc_start += self._dc.shape[0] - keep
+        self._dc = self._dc[self._dc.shape[0] - keep:]
+
+        return results
+
+    def process_measurement(self, payload: bytes) -> DeviceResult:
+        """
+        Adds the set of a MEASUREMENT frame to the ScvO2 session of the device.
+
+        All the sets received with the same wavelengths are kept; see MeasurementSession.
+
+        Returns:
+        DeviceResult: The ScvO2 of all the sets so far, NaN until the readings are valid.
+
+        Raises:
+        - ProtocolError: If the payload is malformed or the wavelengths are unknown.
+        """
+
+        if len(payload) != _MEASUREMENT.size:
+            raise ProtocolError("MEASUREMENT payload has the wrong length.")
+        red_wavelength, nir_wavelength, red_air, red_sample, nir_air, nir_sample = _MEASUREMENT.unpack(payload)
+
+        if self.session is None or (self.session.red_wavelength, self.session.nir_wavelength) != \
+                (red_wavelength, nir_wavelength):
+            try:
+                self.session = MeasurementSession(red_wavelength, nir_wavelength)
+            except ValueError as error:
+                raise ProtocolError(str(error)) from error
+
+        self.session.add_red(red_air, red_sample)
+        self.session.add_nir(nir_air, nir_sample)
+        try:
+            scvo2 = self.session.result().scvo2
+        except ValueError:
+            scvo2 = math.nan
+
+        index = max(self.n_samples - 1, 0)
+        return DeviceResult(self.device_id, "scvo2", index, index / self.sample_rate_hz, scvo2, math.nan)
+
+
+class AcquisitionServer:
+    """
+    An asyncio server receiving the streams of many devices over TCP or UNIX sockets.
+
+    Every connection is a coroutine, not a thread, running its own DevicePipeline. The
+    results go to one bounded queue: when the consumer falls behind and the queue is full,
+    the connections wait before reading their next frame, so the socket buffers fill up and
+    the devices are slowed down by TCP flow control instead of the server running out of
+    memory.
+
+    Attributes:
+    - results (asyncio.Queue): The DeviceResult of every device, to be consumed with get().
+    - devices (dict): The number of samples received from each connected device.
+    - errors (list): The (device id, message) of every connection closed on an error.
+
+    Examples:
+    >>> async def demo():
+    ...     server = AcquisitionServer()
+    ...     listener = await server.start_tcp("127.0.0.1", 0)
+    ...     port = listener.sockets[0].getsockname()[1]
+    ...     sent = await SimulatedDevice("bed-1", seed=1).run(20.0, host="127.0.0.1", port=port)
+    ...     await server.close()
+    ...     results = [server.results.get_nowait() for _ in range(server.results.qsize())]
+    ...     return sent, len(results), round(results[-1].value, 1)
+    >>> asyncio.run(demo())
+    (5000, 11, 97.4)
+
+    A device whose HELLO cannot be processed is closed and recorded in errors:
+
+    >>> async def bad_rate():
+    ...     server = AcquisitionServer()
+    ...     listener = await server.start_tcp("127.0.0.1", 0)
+    ...     reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+    ...     writer.write(encode_hello("bed-2", 4.0))
+    ...     await reader.read()
+    ...     writer.close()
+    ...     await server.close()
+    ...     return server.errors, server.devices
+    >>> asyncio.run(bad_rate())
+    ([('bed-2', 'Unsupported sample rate of 4 Hz: Cutoff frequencies must satisfy 0 < low < high < sample_rate / 2.')], {})
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE, lookup_table: RatioLookupTable = DEFAULT_LOOKUP_TABLE,
+                 min_amplitude: float = DEFAULT_MIN_AMPLITUDE):
+        """
+        Constructs a new AcquisitionServer instance; call start_tcp or start_unix to listen.
+
+        Parameters:
+        - queue_size (int): The number of results waiting for the consumer before the
+          devices are slowed down.
+        - lookup_table (RatioLookupTable): The Ratio-to-SpO2 table of every device.
+        - min_amplitude (float): See peak_detection.detect_beats, in ADC counts.
+        """
+
+        self.results = asyncio.Queue(queue_size)
+        self.lookup_table = lookup_table
+        self.min_amplitude = min_amplitude
+        self.devices = {}
+        self.errors = []
+        self._listeners = []
+        self._connections = set()
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        """
+        Starts listening on a TCP port; port 0 picks a free one, see the returned server's sockets.
+        """
+
+        listener = await asyncio.start_server(self._handle_connection, host, port)
+        self._listeners.append(listener)
+        return listener
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """
+        Starts listening on a UNIX socket.
+        """
+
+        listener = await asyncio.start_unix_server(self._handle_connection, path)
+        self._listeners.append(listener)
+        return listener
+
+    async def close(self):
+        """
+        Stops listening and waits for the open connections to finish their current frame.
+        """
+
+        for listener in self._listeners:
+            listener.close()
+        for listener in self._listeners:
+            await listener.wait_closed()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Processes the frames of one device until BYE or the end of the stream.
+        """
+
+        self._connections.add(asyncio.current_task())
+        device_id = None
+        try:
+            frame = await read_frame(reader)
+            if frame is None:
+                return
+            if frame[0] != HELLO:
+                raise ProtocolError("The first frame must be HELLO.")
+
+            hello_id, sample_rate_hz = decode_hello(frame[1])
+            if hello_id in self.devices:
+                raise ProtocolError(f"Device '{hello_id}' is already connected.")
+            device_id = hello_id
+
+            # The filter cannot be designed for every positive rate, e.g. not below 10 Hz
+            try:
+                pipeline = DevicePipeline(device_id, sample_rate_hz, self.lookup_table, self.min_amplitude)
+            except ValueError as error:
+                raise ProtocolError(f"Unsupported sample rate of {sample_rate_hz:g} Hz: {error}") from error
+            self.devices[device_id] = 0
+
+            while True:
+                frame = await read_frame(reader)
+                if frame is None or frame[0] == BYE:
+                    return
+
+                frame_type, payload = frame
+                if frame_type == SAMPLES:
+                    results = pipeline.process_samples(*decode_samples(payload))
+                    self.devices[device_id] = pipeline.n_samples
+                elif frame_type == MEASUREMENT:
+                    results = [pipeline.process_measurement(payload)]
+                else:
+                    raise ProtocolError(f"Unexpected frame type {frame_type}.")
+
+                # Waiting here when the queue is full is the backpressure on the device
+                for result in results:
+                    await self.results.put(result)
+
+        except (ProtocolError, asyncio.IncompleteReadError, UnicodeDecodeError, ConnectionError) as error:
+            self.errors.append((device_id, str(error) or type(error).__name__))
+        finally:
+            if device_id is not None:
+                self.devices.pop(device_id, None)
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+
+class SimulatedDevice:
+    """
+    A bedside unit simulated with SimulatedADC, streaming to an AcquisitionServer.
+
+    Attributes:
+    - device_id (str): The id sent in the HELLO frame.
+    - adc (SimulatedADC): The simulated front end.
+    - sample_rate_hz (float): The sampling rate in Hz.
+    - frame_samples (int): The number of samples per SAMPLES frame.
+    """
+
+    def __init__(self, device_id: str, adc: SimulatedADC = None, sample_rate_hz: float = SAMPLE_RATE_HZ,
+                 frame_samples: int = 25, seed: int = None):
+        """
+        Constructs a new SimulatedDevice instance.
+
+        Parameters:
+        - device_id (str): The id sent in the HELLO frame.
+        - adc (SimulatedADC, optional): The simulated front end, with the default settings by default.
+        - sample_rate_hz (float): The sampling rate in Hz.
+        - frame_samples (int): The number of samples per SAMPLES frame, 25 (100ms) by default.
+        - seed (int, optional): The seed of the default ADC noise.
+        """
+
+        self.device_id = device_id
+        self.adc = adc if adc is not None else SimulatedADC(seed=seed)
+        self.sample_rate_hz = sample_rate_hz
+        self.frame_samples = frame_samples
+
+    async def run(self, duration: float, host: str = None, port: int = None, path: str = None,
+                  realtime: bool = False, measurements=()) -> int:
+        """
+        Connects to a server, streams duration seconds of samples and says BYE.
+
+        Parameters:
+        - duration (float): The length of the stream in seconds.
+        - host, port (optional): The TCP address of the server.
+        - path (str, optional): The UNIX socket of the server, instead of host and port.
+        - realtime (bool): True to pace the frames at the sampling rate, False to send as
+          fast as the server accepts them.
+        - measurements (iterable of tuple): Sets of (red air, red sample, NIR air, NIR sample)
+          sent as MEASUREMENT frames after the samples.
+
+        Returns:
+        int: The number of samples sent.
+        """
+
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+
+        n_samples = int(duration * self.sample_rate_hz)
+        try:
+            writer.write(encode_hello(self.device_id, self.sample_rate_hz))
+            for start in range(0, n_samples, self.frame_samples):
+                times = np.arange(start, min(start + self.frame_samples, n_samples)) / self.sample_rate_hz
+                red_dc, red_ac = self.adc.read("red", times)
+                ir_dc, ir_ac = self.adc.read("ir", times)
+                writer.write(encode_samples(start, red_dc, red_ac, ir_dc, ir_ac))
+
+                # Waiting for the server to read when its buffers are full
+                await writer.drain()
+                if realtime:
+                    await asyncio.sleep(times.size / self.sample_rate_hz)
+
+            for measurement in measurements:
+                writer.write(encode_measurement(*measurement))
+            writer.write(encode_frame(BYE))
+            await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+        return n_samples
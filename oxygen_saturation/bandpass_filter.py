@@ -0,0 +1,192 @@
+import numpy as np
+from .instrumentation import stage
+
+# Timer2/Timer3 period of the firmware: (1 / (40MHz / 2)) * 64 * 1250 = 4ms, i.e. 250 samples per second
+SAMPLE_RATE_HZ = 250.0
+
+# Above this number of taps, blocks are filtered with FFT overlap-save instead of direct convolution
+FFT_THRESHOLD_TAPS = 64
+
+
+class BandpassFilter:
+    """
+    A streaming FIR filter, the Python port of the firmware's FIR() calls.
+
+    The firmware filters one sample per call, FIR(1, &FIR_output_IR[0], &FIR_input_IR[0],
+    &BandpassIRFilter), and the filter structure keeps the delay line between calls. This
+    class keeps the same delay line, one per channel, so that consecutive blocks of any
+    size give exactly the per-sample output of the firmware:
+
+        y[n] = sum(h[k] * x[n - k] for k in range(num_taps))
+
+    with the delay line initialized to zeros. Blocks are filtered with a direct convolution
+    for short filters and with FFT overlap-save for long ones. The arithmetic is done in
+    double precision, not in the Q15 fractional format of the dsPIC DSP library.
+
+    Attributes:
+    - coefficients (np.ndarray): The FIR coefficients h[0]...h[num_taps - 1].
+    - n_channels (int): The number of channels filtered in parallel, e.g. 2 for Red and IR.
+    """
+
+    def __init__(self, coefficients, n_channels: int = 1):
+        """
+        Constructs a new BandpassFilter instance.
+
+        Parameters:
+        - coefficients (array_like): The FIR coefficients, the same as in the firmware's filter structure.
+        - n_channels (int): The number of channels filtered in parallel.
+
+        Raises:
+        - ValueError: If there are no coefficients or if n_channels is not positive.
+        """
+
+        self.coefficients = np.asarray(coefficients, dtype=float).ravel()
+        if self.coefficients.size == 0:
+            raise ValueError("At least one filter coefficient is required.")
+        if n_channels < 1:
+            raise ValueError("The number of channels must be positive.")
+
+        self.n_channels = n_channels
+        self.reset()
+
+    @classmethod
+    def design(cls, low_hz: float = 0.5, high_hz: float = 5.0, sample_rate_hz: float = SAMPLE_RATE_HZ,
+               num_taps: int = 255, n_channels: int = 1) -> "BandpassFilter":
+        """
+        Creates a filter with a Hamming-windowed sinc bandpass design.
+
+        Use this when the coefficients of the firmware filter are not at hand; to reproduce
+        the firmware output, pass its coefficients to the constructor instead.
+
+        Parameters:
+        - low_hz (float): The lower cutoff frequency in Hz.
+        - high_hz (float): The upper cutoff frequency in Hz.
+        - sample_rate_hz (float): The sampling rate in Hz.
+        - num_taps (int): The number of coefficients, odd for a symmetric filter.
+        - n_channels (int): The number of channels filtered in parallel.
+
+        Returns:
+        BandpassFilter: The new filter.
+
+        Raises:
+        - ValueError: If the cutoff frequencies are not in 0 < low_hz < high_hz < sample_rate_hz / 2.
+        """
+
+        if not 0 < low_hz < high_hz < sample_rate_hz / 2:
+            raise ValueError("Cutoff frequencies must satisfy 0 < low < high < sample_rate / 2.")
+
+        # Difference of two lowpass windowed sincs
+        n = np.arange(num_taps) - (num_taps - 1) / 2
+        high = 2 * high_hz / sample_rate_hz * np.sinc(2 * high_hz / sample_rate_hz * n)
+        low = 2 * low_hz / sample_rate_hz * np.sinc(2 * low_hz / sample_rate_hz * n)
+        coefficients = (high - low) * np.hamming(num_taps)
+
+        return cls(coefficients, n_channels)
+
+    @property
+    def num_taps(self) -> int:
+        """
+        int: The number of filter coefficients.
+        """
+
+        return self.coefficients.size
+
+    def reset(self):
+        """
+        Clears the delay lines, like the firmware's FIRDelayInit().
+        """
+
+        self._delay = np.zeros((self.n_channels, self.num_taps - 1))
+
+    def process_sample(self, sample):
+        """
+        Filters one sample per channel, exactly like one firmware FIR(1, ...) call.
+
+        This is the per-sample reference; use process for blocks of samples.
+
+        Parameters:
+        - sample (float or array_like): One input sample, or one sample per channel.
+
+        Returns:
+        float or np.ndarray: The output sample, or one output sample per channel.
+        """
+
+        output = self.process(np.reshape(np.asarray(sample, dtype=float), (self.n_channels, 1)))
+        if self.n_channels == 1:
+            return float(output[0, 0])
+        return output[:, 0]
+
+    def process(self, block) -> np.ndarray:
+        """
+        Filters a block of samples and keeps the filter state for the next block.
+
+        Parameters:
+        - block (array_like): The input samples, of shape (n,) for a single channel or
+          (n_channels, n) for several channels.
+
+        Returns:
+        np.ndarray: The output samples, with the same shape as the block.
+
+        Raises:
+        - ValueError: If the shape of the block does not match the number of channels.
+
+        Examples:
+        >>> bandpass = BandpassFilter([1.0, 2.0, 3.0])
+        >>> bandpass.process([1.0, 0.0])
+        array([1., 2.])
+        >>> bandpass.process([])
+        array([], dtype=float64)
+        >>> bandpass.process([0.0])
+        array([3.])
+        >>> BandpassFilter([1.0, 2.0, 3.0], n_channels=2).process(np.empty((2, 0))).shape
+        (2, 0)
+        """
+
+        block = np.asarray(block, dtype=float)
+        single_channel = block.ndim == 1
+        samples = block.reshape(1, -1) if single_channel else block
+
+        if samples.ndim != 2 or samples.shape[0] != self.n_channels:
+            raise ValueError(f"Expected a block of shape (n,) or ({self.n_channels}, n), got {block.shape}.")
+
+        # With no new sample, the 'valid' convolution of the delay line alone would swap its operands
+        if samples.shape[1] == 0:
+            return np.empty(block.shape)
+
+        with stage("filter", rows=samples.size):
+            # Prepending the delay line, so that only the 'valid' part of the convolution is needed
+            extended = np.concatenate((self._delay, samples), axis=1)
+            if self.num_taps > FFT_THRESHOLD_TAPS and samples.shape[1] > self.num_taps:
+                output = _overlap_save(extended, self.coefficients)
+            else:
+                output = np.stack([np.convolve(channel, self.coefficients, mode='valid') for channel in extended])
+
+            # Keeping the last num_taps - 1 inputs for the next block
+            self._delay = extended[:, extended.shape[1] - (self.num_taps - 1):].copy()
+
+        return output[0] if single_channel else output
+
+
+def _overlap_save(extended: np.ndarray, coefficients: np.ndarray) -> np.ndarray:
+    """
+    'Valid' convolution of each row of extended with coefficients, by FFT overlap-save.
+    """
+
+    num_taps = coefficients.size
+    n_outputs = extended.shape[1] - num_taps + 1
+
+    # FFT size of at least four filter lengths, and the number of outputs per segment
+    fft_size = 1 << int(np.ceil(np.log2(4 * num_taps)))
+    hop = fft_size - num_taps + 1
+    n_segments = -(-n_outputs // hop)
+
+    # Padding so that the last segment is complete, then viewing all segments at once
+    padded_length = (n_segments - 1) * hop + fft_size
+    padded = np.zeros((extended.shape[0], padded_length))
+    padded[:, :extended.shape[1]] = extended
+    segments = np.lib.stride_tricks.sliding_window_view(padded, fft_size, axis=1)[:, ::hop]
+
+    spectrum = np.fft.rfft(segments, axis=-1) * np.fft.rfft(coefficients, fft_size)
+    filtered = np.fft.irfft(spectrum, fft_size, axis=-1)[:, :, num_taps - 1:]
+
+    return filtered.reshape(extended.shape[0], -1)[:, :n_outputs]
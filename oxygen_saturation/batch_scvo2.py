@@ -0,0 +1,274 @@
+import csv
+import glob
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from .calculate_scvo2 import WAVELENGTH_PAIRS, calculate_scvo2_batch
+from .read_excel import read_all_numeric_columns, read_numeric_columns
+
+WAVELENGTHS = (660, 810, 940)
+
+# Columns of the combined output, one row per sheet, sample and wavelength pair
+OUTPUT_FIELDS = ("file", "sheet", "sample", "red_wavelength", "nir_wavelength", "scvo2")
+
+
+class BatchSummary(NamedTuple):
+    """
+    The result of run_batch.
+
+    Attributes:
+    - workbooks (int): The number of workbooks processed.
+    - rows (int): The number of ScvO2 values written.
+    - errors (list): One (file, sheet, message) tuple per sheet or workbook that could not be scored.
+    """
+
+    workbooks: int
+    rows: int
+    errors: list
+
+
+def sample_names(column_names) -> list:
+    """
+    Finds the samples of a sheet, i.e. the column prefixes measured at every wavelength.
+
+    The sheets name their columns <sample>_<wavelength>, with 'air' for the measurements
+    in air, e.g. Sam1_660 or clear_810.
+
+    Parameters:
+    - column_names (iterable of str): The column names of the sheet.
+
+    Returns:
+    list: The sample names other than 'air', in column order.
+
+    Examples:
+    >>> sample_names(['air_660', 'air_810', 'air_940', 'Sam1_660', 'Sam1_810', 'Sam1_940', 'Sam2_660'])
+    ['Sam1']
+    """
+
+    column_names = [str(column_name) for column_name in column_names]
+    present = set(column_names)
+
+    samples = []
+    for column_name in column_names:
+        prefix, _, wavelength = column_name.rpartition("_")
+        if wavelength == str(WAVELENGTHS[0]) and prefix not in ("", "air") and \
+                all(f"{prefix}_{w}" in present for w in WAVELENGTHS):
+            samples.append(prefix)
+    return samples
+
+
+def score_columns(file_path: str, sheet_name: str, columns: dict) -> list:
+    """
+    Calculates the ScvO2 of every sample of one sheet, from the medians of its columns.
+
+    Parameters:
+    - file_path (str): The path to the Excel file, copied to the output rows.
+    - sheet_name (str): The name of the sheet, copied to the output rows.
+    - columns (dict): The numeric columns of the sheet, as returned by read_numeric_columns.
+
+    Returns:
+    list: One (file, sheet, sample, red_wavelength, nir_wavelength, scvo2) tuple per
+    sample and wavelength pair.
+
+    Raises:
+    - ValueError: If the sheet has no air or sample columns, or if one of them is empty.
+    """
+
+    samples = sample_names(columns)
+    if not samples or any(f"air_{w}" not in columns for w in WAVELENGTHS):
+        raise ValueError(f"Sheet '{sheet_name}' has no air and sample columns.")
+
+    medians = {}
+    for prefix in ["air"] + samples:
+        for wavelength in WAVELENGTHS:
+            values = columns[f"{prefix}_{wavelength}"]
+            if values.size == 0:
+                raise ValueError(f"Column '{prefix}_{wavelength}' of sheet '{sheet_name}' has no numeric values.")
+            medians[prefix, wavelength] = float(np.median(values))
+
+    arguments = []
+    for wavelength in WAVELENGTHS:
+        arguments.append(medians["air", wavelength])
+        arguments.append([medians[prefix, wavelength] for prefix in samples])
+    scvo2 = calculate_scvo2_batch(*arguments)
+
+    return [
+        (file_path, sheet_name, prefix, red_wavelength, nir_wavelength, float(value))
+        for red_wavelength, nir_wavelength in WAVELENGTH_PAIRS
+        for prefix, value in zip(samples, scvo2[(red_wavelength, nir_wavelength)])
+    ]
+
+
+def workbook_errors() -> tuple:
+    """
+    Returns the exceptions raised when a workbook is missing, truncated or corrupt.
+
+    These are caught per workbook or sheet by the batch runners, which report them as
+    errors and go on with the next one.
+
+    Returns:
+    tuple: The exception classes, for an except clause.
+    """
+
+    errors = (OSError, ValueError, KeyError, zipfile.BadZipFile)
+
+    # openpyxl is only imported once a workbook has failed to load
+    try:
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        return errors
+    return errors + (InvalidFileException,)
+
+
+def score_workbook(file_path: str, sheet_names=None, use_cache: bool = True) -> tuple:
+    """
+    Calculates the ScvO2 of every sample of some or all of the sheets of a workbook.
+
+    This is the task run by each worker of run_batch. The errors are returned instead of
+    raised, so that one bad sheet does not stop the batch.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - sheet_names (iterable of str, optional): The sheets to score. All sheets if None.
+    - use_cache (bool): If True, serve the workbook from the converted-workbook cache.
+
+    Returns:
+    tuple: The output rows (see score_columns) and a list of (file, sheet, message) errors.
+
+    Examples:
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as truncated:
+    ...     _ = truncated.write(b"PK\x03\x04" + bytes(100))
+    >>> rows, errors = score_workbook(truncated.name, use_cache=False)
+    >>> rows, errors[0][1:]
+    ([], (None, 'File is not a zip file'))
+    >>> os.remove(truncated.name)
+    """
+
+    rows = []
+    errors = []
+
+    try:
+        if sheet_names is None:
+            sheets = read_all_numeric_columns(file_path, use_cache=use_cache)
+        else:
+            sheets = {sheet_name: None for sheet_name in sheet_names}
+    except workbook_errors() as e:
+        return rows, [(file_path, None, str(e))]
+
+    for sheet_name, columns in sheets.items():
+        try:
+            if columns is None:
+                columns = read_numeric_columns(file_path, sheet_name, use_cache=use_cache)
+            rows.extend(score_columns(file_path, sheet_name, columns))
+        except workbook_errors() as e:
+            errors.append((file_path, sheet_name, str(e)))
+
+    return rows, errors
+
+
+def find_workbooks(paths) -> list:
+    """
+    Expands directories and glob patterns into a sorted list of workbooks.
+
+    Parameters:
+    - paths (iterable of str): Workbook paths, directories (searched for *.xlsx) or glob patterns.
+
+    Returns:
+    list: The paths of the workbooks, without duplicates.
+    """
+
+    workbooks = set()
+    for path in paths:
+        if os.path.isdir(path):
+            workbooks.update(glob.glob(os.path.join(path, "*.xlsx")))
+        elif glob.has_magic(path):
+            workbooks.update(glob.glob(path, recursive=True))
+        else:
+            workbooks.add(path)
+
+    # Skipping the lock files Excel leaves next to open workbooks
+    return sorted(path for path in workbooks if not os.path.basename(path).startswith("~$"))
+
+
+def _score_task(task: tuple) -> tuple:
+    """
+    Unpacks a (file_path, sheet_names, use_cache) task for the process pool.
+    """
+
+    return score_workbook(*task)
+
+
+def run_batch(paths, output_path: str, sheet_names=None, workers: int = None, chunksize: int = 4,
+              use_cache: bool = True, store=None) -> BatchSummary:
+    """
+    Calculates the ScvO2 of every sheet of many workbooks in parallel and writes one combined CSV.
+
+    The workbooks are distributed over a pool of worker processes, chunksize workbooks per
+    task, and the results are written in workbook order as they come in.
+
+    Parameters:
+    - paths (iterable of str): Workbook paths, directories or glob patterns; see find_workbooks.
+    - output_path (str): The path of the combined CSV file, with the columns of OUTPUT_FIELDS.
+    - sheet_names (iterable of str, optional): The sheets to score in each workbook. All sheets if None.
+    - workers (int, optional): The number of worker processes, the number of CPUs by default.
+      With 1, the workbooks are scored in this process.
+    - chunksize (int): The number of workbooks sent to a worker at once.
+    - use_cache (bool): If True, serve the workbooks from the converted-workbook cache.
+    - store (ResultsStore, optional): A results_store.ResultsStore to add the rows to as
+      well, with the time the batch started.
+
+    Returns:
+    BatchSummary: The number of workbooks and rows, and the sheets that could not be scored.
+
+    Raises:
+    - ValueError: If workers or chunksize is not positive.
+    """
+
+    if (workers is not None and workers < 1) or chunksize < 1:
+        raise ValueError("The number of workers and the chunk size must be positive.")
+
+    workbooks = find_workbooks(paths)
+    if sheet_names is not None:
+        sheet_names = list(sheet_names)
+    tasks = [(file_path, sheet_names, use_cache) for file_path in workbooks]
+
+    row_count = 0
+    errors = []
+    started = time.time()
+    with open(output_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(OUTPUT_FIELDS)
+
+        if workers == 1:
+            row_count = _write_results(writer, map(_score_task, tasks), errors, store, started)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_score_task, tasks, chunksize=chunksize)
+                row_count = _write_results(writer, results, errors, store, started)
+
+    return BatchSummary(len(workbooks), row_count, errors)
+
+
+def _write_results(writer, results, errors: list, store=None, started: float = None) -> int:
+    """
+    Writes the rows of each task result, to the store as well if there is one, and collects its errors.
+
+    Returns:
+    int: The number of rows written.
+    """
+
+    row_count = 0
+    for rows, task_errors in results:
+        writer.writerows(rows)
+        if store is not None:
+            store.add_scored(rows, started)
+        row_count += len(rows)
+        errors.extend(task_errors)
+    return row_count
+
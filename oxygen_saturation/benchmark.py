@@ -0,0 +1,291 @@
+import functools
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import NamedTuple
+
+import numpy as np
+
+from .bandpass_filter import SAMPLE_RATE_HZ, BandpassFilter
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .calculate_scvo2 import calculate_scvo2_from_absorbance
+from .capture_reader import iter_csv_chunks
+from .interrupt_driven_led import SimulatedADC
+from .median_average import StreamingAggregator
+from .peak_detection import detect_beats
+from .rolling_scvo2 import rolling_scvo2
+
+# Row counts benchmarked by default; up to 10_000_000 can be requested
+DEFAULT_SIZES = (10, 1000, 100000, 1000000)
+
+# Excel files are only generated up to this many rows, writing larger ones takes minutes
+MAX_EXCEL_ROWS = 100000
+
+# A stage fails when it is this much slower than the baseline (0.25 = 25% slower)
+DEFAULT_THRESHOLD = 0.25
+
+# Each stage is run until its timed runs add up to this, so that the best one of a fast stage is stable
+MIN_MEASURE_SECONDS = 0.2
+
+# Stages faster than this are not checked against the baseline: a 25% change of a few
+# microseconds is timer noise, not a regression
+DEFAULT_MIN_SECONDS = 0.005
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    The measurement of one stage at one size.
+
+    Attributes:
+    - stage (str): The name of the stage.
+    - rows (int): The number of rows processed.
+    - seconds (float): The best wall time over the repeats.
+    - rows_per_second (float): rows / seconds.
+    - peak_bytes (int): The peak memory allocated by the stage, as traced by tracemalloc.
+    """
+
+    stage: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    peak_bytes: int
+
+
+def make_measurements(rows: int, seed: int = 0) -> dict:
+    """
+    Generates air and sample optical powers in the layout of the workbooks.
+
+    Parameters:
+    - rows (int): The number of readings per column.
+    - seed (int): The seed of the random generator.
+
+    Returns:
+    dict: Float arrays for air_<λ>, Sam1_<λ> and Sam2_<λ> at 660, 810 and 940nm.
+    """
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for wavelength, air, sample in ((660, 14.5, 5.9), (810, 11.9, 6.5), (940, 8.5, 3.4)):
+        columns[f"air_{wavelength}"] = rng.normal(air, 0.1, rows)
+        columns[f"Sam1_{wavelength}"] = rng.normal(sample, 0.1, rows)
+        columns[f"Sam2_{wavelength}"] = rng.normal(sample * 0.9, 0.1, rows)
+    return columns
+
+
+def make_trace(rows: int, seed: int = 0) -> dict:
+    """
+    Generates Red and IR DC/AC traces at the firmware sampling rate with the simulated ADC.
+
+    Parameters:
+    - rows (int): The number of samples per channel.
+    - seed (int): The seed of the ADC noise.
+
+    Returns:
+    dict: Float arrays red_dc, red_ac, ir_dc and ir_ac.
+    """
+
+    adc = SimulatedADC(seed=seed)
+    times = np.arange(rows) / SAMPLE_RATE_HZ
+    red_dc, red_ac = adc.read("red", times)
+    ir_dc, ir_ac = adc.read("ir", times)
+    return {"red_dc": red_dc.astype(float), "red_ac": red_ac.astype(float),
+            "ir_dc": ir_dc.astype(float), "ir_ac": ir_ac.astype(float)}
+
+
+def _stages(rows: int, work_dir: str) -> dict:
+    """
+    Lists the stages at one size, each with a function preparing its inputs.
+
+    The inputs are only built for the stages that run, and the shared ones once, so that
+    e.g. running scvo2 alone does not write the Excel and CSV files.
+
+    Returns:
+    dict: A dictionary mapping each stage name to a function that prepares the stage and
+    returns a function running it once.
+    """
+
+    @functools.lru_cache(maxsize=None)
+    def measurements():
+        return make_measurements(rows)
+
+    @functools.lru_cache(maxsize=None)
+    def trace():
+        return make_trace(rows)
+
+    def load_excel():
+        import pandas as pd
+
+        from .read_excel import read_numeric_columns
+
+        excel_path = os.path.join(work_dir, f"measurements_{rows}.xlsx")
+        pd.DataFrame(measurements()).to_excel(excel_path, sheet_name="Sheet1", index=False)
+        return lambda: read_numeric_columns(excel_path, "Sheet1", use_cache=False)
+
+    def load_csv():
+        csv_path = os.path.join(work_dir, f"measurements_{rows}.csv")
+        with open(csv_path, "w", encoding="utf-8") as file:
+            file.write(",".join(measurements()) + "\n")
+            np.savetxt(file, np.column_stack(list(measurements().values())), delimiter=",", fmt="%.6g")
+        return lambda: [chunk for chunk in iter_csv_chunks(csv_path)]
+
+    def median():
+        values = measurements()["Sam1_660"]
+        return lambda: StreamingAggregator().update(values)
+
+    def log10_ratio():
+        air, sample = measurements()["air_660"], measurements()["Sam1_660"]
+        return lambda: calculate_log10_ratio_array(air, sample)
+
+    def scvo2():
+        A_red = calculate_log10_ratio_array(measurements()["air_660"], measurements()["Sam1_660"]).values
+        A_nir = calculate_log10_ratio_array(measurements()["air_810"], measurements()["Sam1_810"]).values
+        return lambda: calculate_scvo2_from_absorbance(A_red, A_nir)
+
+    def rolling():
+        red, nir = measurements()["Sam1_660"], measurements()["Sam1_810"]
+        return lambda: rolling_scvo2(14.5, red, 11.9, nir, step=25)
+
+    def bandpass():
+        ac = np.stack((trace()["red_ac"], trace()["ir_ac"]))
+        return lambda: BandpassFilter.design(n_channels=2).process(ac)
+
+    def peaks():
+        ir_ac, red_ac = trace()["ir_ac"], trace()["red_ac"]
+        return lambda: detect_beats(ir_ac, red_ac)
+
+    stages = {"load_excel": load_excel} if rows <= MAX_EXCEL_ROWS else {}
+    stages.update(load_csv=load_csv, median=median, log10_ratio=log10_ratio, scvo2=scvo2, rolling_scvo2=rolling,
+                  filter=bandpass, peaks=peaks)
+    return stages
+
+
+def _measure(function, repeat: int) -> tuple:
+    """
+    Runs a stage repeat times, and more until the runs add up to MIN_MEASURE_SECONDS.
+
+    Returns:
+    tuple: The best wall time in seconds and the peak traced memory in bytes.
+    """
+
+    best = float("inf")
+    runs = 0
+    total = 0.0
+    while runs < repeat or total < MIN_MEASURE_SECONDS:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        runs += 1
+        total += elapsed
+
+    # Tracing slows the stage down, so the memory is measured on a separate run
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=None, repeat: int = 3) -> list:
+    """
+    Times every stage of the ingest -> absorbance -> ScvO2 pipeline on synthetic data.
+
+    Parameters:
+    - sizes (iterable of int): The numbers of rows to benchmark.
+    - stages (iterable of str, optional): The stages to run. All stages if None.
+    - repeat (int): The least number of timed runs of each stage; the best one is kept.
+
+    Returns:
+    list: One BenchmarkResult per stage and size.
+    """
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="oxygen_saturation_benchmark_")
+    try:
+        for rows in sizes:
+            for stage, prepare in _stages(rows, work_dir).items():
+                if stages is not None and stage not in stages:
+                    continue
+                seconds, peak = _measure(prepare(), repeat)
+                results.append(BenchmarkResult(stage, rows, seconds, rows / seconds if seconds else float("inf"), peak))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+
+def save_baseline(results: list, file_path: str):
+    """
+    Records benchmark results as a JSON baseline.
+
+    Parameters:
+    - results (list): The BenchmarkResult of every stage and size.
+    - file_path (str): The path of the JSON file.
+    """
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump({
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "results": [result._asdict() for result in results],
+        }, file, indent=2)
+
+
+def compare_to_baseline(results: list, file_path: str, threshold: float = DEFAULT_THRESHOLD,
+                        min_seconds: float = DEFAULT_MIN_SECONDS) -> list:
+    """
+    Finds the stages that are slower than in a JSON baseline by more than threshold.
+
+    Parameters:
+    - results (list): The BenchmarkResult of every stage and size.
+    - file_path (str): The path of the JSON baseline.
+    - threshold (float): The relative slowdown allowed, e.g. 0.25 for 25%.
+    - min_seconds (float): Stages taking less than this, in the baseline and now, are not compared.
+
+    Returns:
+    list: One (stage, rows, baseline seconds, seconds) tuple per regression. Stages and
+    sizes missing from the baseline are not compared.
+
+    Examples:
+    >>> import tempfile
+    >>> baseline = os.path.join(tempfile.mkdtemp(), "baseline.json")
+    >>> save_baseline([BenchmarkResult("scvo2", 10, 0.00001, 1e6, 0), BenchmarkResult("scvo2", 10 ** 6, 0.01, 1e8, 0)],
+    ...               baseline)
+    >>> compare_to_baseline([BenchmarkResult("scvo2", 10, 0.00002, 5e5, 0),
+    ...                      BenchmarkResult("scvo2", 10 ** 6, 0.02, 5e7, 0)], baseline)
+    [('scvo2', 1000000, 0.01, 0.02)]
+
+    Raises:
+    - FileNotFoundError: If the baseline does not exist.
+    """
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        baseline = {(entry["stage"], entry["rows"]): entry["seconds"] for entry in json.load(file)["results"]}
+
+    regressions = []
+    for result in results:
+        reference = baseline.get((result.stage, result.rows))
+        if reference is None or max(reference, result.seconds) < min_seconds:
+            continue
+        if result.seconds > reference * (1 + threshold):
+            regressions.append((result.stage, result.rows, reference, result.seconds))
+    return regressions
+
+
+def format_results(results: list) -> str:
+    """
+    Formats benchmark results as a text table.
+    """
+
+    lines = [f"{'stage':<12} {'rows':>10} {'seconds':>12} {'rows/s':>14} {'peak MiB':>10}"]
+    for result in results:
+        lines.append(f"{result.stage:<12} {result.rows:>10} {result.seconds:>12.6f} "
+                     f"{result.rows_per_second:>14.0f} {result.peak_bytes / 2 ** 20:>10.2f}")
+    return "\n".join(lines)
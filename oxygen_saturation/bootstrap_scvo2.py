@@ -0,0 +1,263 @@
+import csv
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from .batch_scvo2 import WAVELENGTHS, BatchSummary, find_workbooks, sample_names, score_columns, workbook_errors
+from .calculate_scvo2 import WAVELENGTH_PAIRS, calculate_scvo2_batch
+from .read_excel import read_all_numeric_columns, read_numeric_columns
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SEED = 0
+
+# Resamples per task: the index matrices of a task hold chunk_size x column length indexes
+DEFAULT_CHUNK_SIZE = 250
+
+# Columns of the combined output, one row per sheet, sample and wavelength pair
+BOOTSTRAP_FIELDS = ("file", "sheet", "sample", "red_wavelength", "nir_wavelength", "scvo2", "lower", "upper")
+
+
+class ScvO2Interval(NamedTuple):
+    """
+    The ScvO2 of one sample and wavelength pair, with its bootstrap confidence interval.
+
+    Attributes:
+    - file (str): The path to the Excel file.
+    - sheet (str): The name of the sheet.
+    - sample (str): The name of the sample, e.g. Sam1.
+    - red_wavelength (int): The wavelength of the red LED in nm.
+    - nir_wavelength (int): The wavelength of the NIR LED in nm.
+    - scvo2 (float): The ScvO2 from the medians of the columns, as in score_columns.
+    - lower (float): The lower bound of the percentile interval.
+    - upper (float): The upper bound of the percentile interval.
+    """
+
+    file: str
+    sheet: str
+    sample: str
+    red_wavelength: int
+    nir_wavelength: int
+    scvo2: float
+    lower: float
+    upper: float
+
+
+def _resample_chunk(task: tuple) -> dict:
+    """
+    Calculates the ScvO2 of one chunk of bootstrap resamples, run by the process pool.
+
+    Every column is resampled with replacement, independently of the others, with one
+    index matrix of shape (n_resamples, column length), and reduced to its median.
+
+    Returns:
+    dict: A dictionary mapping each wavelength pair to an (n_resamples, n_samples) array.
+    """
+
+    columns, samples, n_resamples, seed_sequence = task
+    rng = np.random.default_rng(seed_sequence)
+
+    medians = {}
+    for key, values in columns.items():
+        index = rng.integers(0, values.size, size=(n_resamples, values.size))
+        medians[key] = np.median(values[index], axis=1)
+
+    # One row per resample: the air medians broadcast against the sample medians
+    arguments = []
+    for wavelength in WAVELENGTHS:
+        arguments.append(medians["air", wavelength][:, np.newaxis])
+        arguments.append(np.column_stack([medians[prefix, wavelength] for prefix in samples]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return calculate_scvo2_batch(*arguments)
+
+
+def _sheet_tasks(sheet_name: str, columns: dict, n_resamples: int, seed: int, chunk_size: int) -> tuple:
+    """
+    Splits the resamples of one sheet into tasks.
+
+    The seed of each sheet is derived from seed and sheet_name, and each chunk gets
+    an independent stream spawned from it, so the intervals do not depend on the number
+    of workers nor on the other sheets of the batch.
+
+    Returns:
+    tuple: The sample names and the list of tasks.
+    """
+
+    samples = sample_names(columns)
+    needed = {(prefix, wavelength): np.asarray(columns[f"{prefix}_{wavelength}"], dtype=float)
+              for prefix in ["air"] + samples for wavelength in WAVELENGTHS}
+
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence([seed, zlib.crc32(str(sheet_name).encode("utf-8"))]).spawn(len(sizes))
+    return samples, [(needed, samples, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+
+def _intervals(estimates: list, samples: list, chunks: list, confidence: float) -> list:
+    """
+    Combines the resampled ScvO2 of the chunks of one sheet into percentile intervals.
+    """
+
+    alpha = (1 - confidence) / 2 * 100
+    bounds = {}
+    for pair in WAVELENGTH_PAIRS:
+        resampled = np.concatenate([chunk[pair] for chunk in chunks])
+        lower, upper = np.nanpercentile(resampled, [alpha, 100 - alpha], axis=0)
+        bounds.update({(prefix, *pair): (float(low), float(high)) for prefix, low, high in zip(samples, lower, upper)})
+
+    return [ScvO2Interval(*row, *bounds[row[2], row[3], row[4]]) for row in estimates]
+
+
+def _map(function, tasks: list, workers: int):
+    """
+    Runs the tasks in this process if workers is 1, in a process pool otherwise.
+    """
+
+    if workers == 1:
+        return list(map(function, tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, tasks))
+
+
+def _bootstrap(sheets: list, n_resamples: int, confidence: float, seed: int, workers: int, chunk_size: int) -> tuple:
+    """
+    Calculates the intervals of (file, sheet, columns) entries, with one process pool for all of them.
+    """
+
+    if n_resamples < 1 or chunk_size < 1 or (workers is not None and workers < 1):
+        raise ValueError("The number of resamples, the number of workers and the chunk size must be positive.")
+    if not 0 < confidence < 1:
+        raise ValueError("The confidence level must be between 0 and 1.")
+
+    prepared = []
+    tasks = []
+    errors = []
+    for file_path, sheet_name, columns in sheets:
+        try:
+            estimates = score_columns(file_path, sheet_name, columns)
+        except ValueError as e:
+            errors.append((file_path, sheet_name, str(e)))
+            continue
+
+        # The absolute path, so that workbooks of the same name in different directories
+        # are not resampled with the same streams
+        name = f"{os.path.abspath(file_path)}/{sheet_name}"
+        samples, sheet_tasks = _sheet_tasks(name, columns, n_resamples, seed, chunk_size)
+        prepared.append((estimates, samples, len(tasks), len(tasks) + len(sheet_tasks)))
+        tasks.extend(sheet_tasks)
+
+    chunks = _map(_resample_chunk, tasks, workers) if tasks else []
+
+    intervals = []
+    for estimates, samples, first, last in prepared:
+        intervals.extend(_intervals(estimates, samples, chunks[first:last], confidence))
+    return intervals, errors
+
+
+def bootstrap_sheets(file_path: str, sheets: dict, n_resamples: int = DEFAULT_RESAMPLES,
+                     confidence: float = DEFAULT_CONFIDENCE, seed: int = DEFAULT_SEED, workers: int = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple:
+    """
+    Calculates bootstrap confidence intervals of the ScvO2 of every sample of some sheets.
+
+    The readings of every air and sample column are resampled n_resamples times, and the
+    ScvO2 is calculated from the medians of each resample, like score_columns does from the
+    medians of the columns. The resamples of all the sheets are split into chunks and
+    distributed over one process pool.
+
+    Parameters:
+    - file_path (str): The path to the Excel file, copied to the results.
+    - sheets (dict): A dictionary mapping each sheet name to its numeric columns, as
+      returned by read_all_numeric_columns.
+    - n_resamples (int): The number of bootstrap resamples.
+    - confidence (float): The confidence level of the intervals, e.g. 0.95.
+    - seed (int): The seed of the resampling; the same seed and absolute file path give the
+      same intervals.
+    - workers (int, optional): The number of worker processes, the number of CPUs by
+      default. With 1, the resamples are calculated in this process.
+    - chunk_size (int): The number of resamples per task.
+
+    Returns:
+    tuple: One ScvO2Interval per sheet, sample and wavelength pair, and a list of
+    (file, sheet, message) errors for the sheets that could not be scored.
+
+    Raises:
+    - ValueError: If n_resamples, workers or chunk_size is not positive, or confidence is not in (0, 1).
+
+    Examples:
+    >>> rng = np.random.default_rng(0)
+    >>> columns = {f"{prefix}_{w}": rng.normal(level, 0.1, 30) for prefix, levels in
+    ...            (("air", (14.5, 11.9, 8.5)), ("Sam1", (5.9, 6.5, 3.4))) for w, level in zip(WAVELENGTHS, levels)}
+    >>> intervals, errors = bootstrap_sheets("data.xlsx", {"Sheet1": columns}, n_resamples=500, workers=1)
+    >>> interval = intervals[0]
+    >>> bool(interval.lower < interval.scvo2 < interval.upper), errors
+    (True, [])
+    """
+
+    return _bootstrap([(file_path, sheet_name, columns) for sheet_name, columns in sheets.items()],
+                      n_resamples, confidence, seed, workers, chunk_size)
+
+
+def run_bootstrap(paths, output_path: str, sheet_names=None, n_resamples: int = DEFAULT_RESAMPLES,
+                  confidence: float = DEFAULT_CONFIDENCE, seed: int = DEFAULT_SEED, workers: int = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, use_cache: bool = True) -> BatchSummary:
+    """
+    Calculates the ScvO2 confidence intervals of every sheet of many workbooks into one CSV.
+
+    The workbooks are loaded in this process, and the resamples of all their sheets are
+    distributed over one process pool.
+
+    Parameters:
+    - paths (iterable of str): Workbook paths, directories or glob patterns; see find_workbooks.
+    - output_path (str): The path of the combined CSV file, with the columns of BOOTSTRAP_FIELDS.
+    - sheet_names (iterable of str, optional): The sheets of each workbook. All sheets if None.
+    - n_resamples (int): The number of bootstrap resamples.
+    - confidence (float): The confidence level of the intervals, e.g. 0.95.
+    - seed (int): The seed of the resampling.
+    - workers (int, optional): The number of worker processes, the number of CPUs by default.
+    - chunk_size (int): The number of resamples per task.
+    - use_cache (bool): If True, serve the workbooks from the converted-workbook cache.
+
+    Returns:
+    BatchSummary: The number of workbooks and rows, and the sheets that could not be scored.
+
+    Raises:
+    - ValueError: If n_resamples, workers or chunk_size is not positive, or confidence is not in (0, 1).
+
+    Examples:
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> with open(os.path.join(directory, "truncated.xlsx"), "wb") as file:
+    ...     _ = file.write(b"PK\x03\x04" + bytes(100))
+    >>> summary = run_bootstrap([directory], os.path.join(directory, "ci.csv"), workers=1, use_cache=False)
+    >>> summary.rows, [error[1:] for error in summary.errors]
+    (0, [(None, 'File is not a zip file')])
+    """
+
+    workbooks = find_workbooks(paths)
+    sheets = []
+    errors = []
+    for file_path in workbooks:
+        try:
+            if sheet_names is None:
+                workbook = read_all_numeric_columns(file_path, use_cache=use_cache)
+            else:
+                workbook = {sheet_name: read_numeric_columns(file_path, sheet_name, use_cache=use_cache)
+                            for sheet_name in sheet_names}
+        except workbook_errors() as e:
+            errors.append((file_path, None, str(e)))
+            continue
+        sheets.extend((file_path, sheet_name, columns) for sheet_name, columns in workbook.items())
+
+    intervals, sheet_errors = _bootstrap(sheets, n_resamples, confidence, seed, workers, chunk_size)
+    errors.extend(sheet_errors)
+
+    with open(output_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(BOOTSTRAP_FIELDS)
+        writer.writerows(intervals)
+
+    return BatchSummary(len(workbooks), len(intervals), errors)
@@ -8,18 +8,9 @@
 # ------------------------------
 # Importing Necessary Libraries
 # ------------------------------
-import math
-
-# Define all the necessary Extinction coefficients, Moaveni's data
-# At 660nm, HbO2 has a ε of 320 [cm-1/M] and Hb has a ε of 3200 [cm-1/M];
-# At 810nm, HbO2 has a ε of 860 [cm-1/M] and Hb has a ε of 880 [cm-1/M];
-# At 940nm, HbO2 has a ε of 1200 [cm-1/M] and Hb has a ε of 800 [cm-1/M].
-e_hbO2_660 = 320
-e_hb_660 = 3200
-e_hbO2_810 = 860
-e_hb_810 = 880
-e_hbO2_940 = 1200
-e_hb_940 = 800
+from .measurement_session import MeasurementSession
+
+# The extinction coefficients (Moaveni's data) come from extinction.DEFAULT_REGISTRY
 
 def get_wavelength_option():
     """
@@ -54,16 +45,21 @@ def enter_measurements(choice):
 
 def calculate():
     """
-    Calculate ScvO2 based on measurements and choice of wavelength.
-    Parameters:
-    int choice: The user's choice of wavelength option.
-    float air: Measurement in air.
-    float sample: Measurement in sample.
+    Calculate ScvO2 from measurements entered interactively.
+
+    Every set of measurements is kept: the absorbances are accumulated in one
+    MeasurementSession per NIR wavelength, and the ScvO2 is calculated from the robust
+    means of all of them. See measurement_session for the non-interactive API.
+
+    Returns:
+    dict: A dictionary mapping each NIR wavelength with measurements to its SessionResult.
     """
-    # Initialize lists to store the measurements.
-    A_red_list = []
-    A_Nir_list = []
-    
+    # One session per NIR wavelength; the red measurements are added to the 810nm session
+    # only, and shared with the 940nm one, so that each reading is counted once
+    sessions = {810: MeasurementSession(660, 810)}
+    sessions[940] = sessions[810].share_red(940)
+    nir_wavelengths = {2: 810, 3: 940}
+
     # Flag to control the loop for entering measurements.
     continue_entering = True
 
@@ -77,12 +73,10 @@ def calculate():
             air, sample = enter_measurements(choice)
 
             if choice == 1:
-                A_red = math.log10(air / sample)
-                A_red_list.append(A_red)
+                sessions[810].add_red(air, sample)
                 red_entered = True
             elif choice == 2 or choice == 3:
-                A_Nir = math.log10(air / sample)
-                A_Nir_list.append(A_Nir)
+                sessions[nir_wavelengths[choice]].add_nir(air, sample)
                 nir_entered = True
 
 
@@ -93,25 +87,18 @@ def calculate():
 
         except ValueError:
             print("Invalid measurement entered. Please enter a valid float value.")
-    
+
     if not (red_entered and nir_entered):
         raise ValueError("At least one set of data in red and one in NIR is required.")
 
-    R = A_red / A_Nir
-    e_hb_red = e_hb_660
-    e_hbO2_red = e_hbO2_660
-    
-    if choice == 2:
-        e_hb_Nir = e_hb_810
-        e_hbO2_Nir = e_hbO2_810
-    elif choice == 3:
-        e_hb_Nir = e_hb_940
-        e_hbO2_Nir = e_hbO2_940
-    
-    ScvO2 = (e_hb_red - R * e_hb_Nir) / (e_hb_red - e_hbO2_red + R * (e_hbO2_Nir - e_hb_Nir)) * 100 
+    results = {}
+    for nir_wavelength, session in sessions.items():
+        if session.A_nir_list.size and session.A_red_list.size:
+            results[nir_wavelength] = session.result()
+            print(f"Calculated results (w/ 660nm and {nir_wavelength}nm): {round(results[nir_wavelength].scvo2, 2)}%")
 
-    print(f"Calculated results: {round(ScvO2, 2)}%")
+    return results
 
 # Main execution starts here
-
-calculate()
+if __name__ == "__main__":
+    calculate()
@@ -0,0 +1,126 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+from .instrumentation import stage
+
+def calculate_log10_ratio(x: float, y: float) -> float:
+    """
+    Calculates the logarithm base 10 of the ratio between two numbers.
+
+    This function takes two numbers, x and y, and computes the logarithm base 10
+    of their ratio (x / y).
+
+    Parameters:
+    - x (float): The numerator of the ratio.
+    - y (float): The denominator of the ratio.
+
+    Returns:
+    float: The logarithm base 10 of the ratio (x / y).
+
+    Raises:
+    - ValueError: If the denominator (y) is zero, which would result in a division by zero.
+
+    Examples:
+    >>> calculate_log10_ratio(10, 2)
+    0.6989700043360189
+
+    >>> calculate_log10_ratio(100, 10)
+    1.0
+
+    >>> calculate_log10_ratio(1, 0)
+    Traceback (most recent call last):
+        ...
+    ValueError: Denominator (y) should not be zero.
+    """
+
+    # Checking if the denominator (y) is zero
+    if y == 0:
+        raise ValueError("Denominator (y) should not be zero.")
+
+    # Calculating the logarithm base 10 of the ratio (x / y)
+    result = math.log10(x / y)
+
+    # Returning the calculated result
+    return result
+
+class Log10RatioResult(NamedTuple):
+    """
+    The result of calculate_log10_ratio_array.
+
+    Attributes:
+    - values (np.ndarray): The logarithm base 10 of each ratio, NaN where it is undefined.
+    - zero_denominator (np.ndarray): Boolean mask of the elements whose denominator is zero.
+    - non_positive_ratio (np.ndarray): Boolean mask of the elements whose ratio is zero,
+      negative or NaN, so that its logarithm is undefined.
+    """
+
+    values: np.ndarray
+    zero_denominator: np.ndarray
+    non_positive_ratio: np.ndarray
+
+    @property
+    def invalid(self) -> np.ndarray:
+        """
+        np.ndarray: Boolean mask of every element whose value is NaN.
+        """
+
+        return self.zero_denominator | self.non_positive_ratio
+
+    @property
+    def error_count(self) -> int:
+        """
+        int: The number of invalid elements.
+        """
+
+        return int(np.count_nonzero(self.invalid))
+
+
+def calculate_log10_ratio_array(x, y) -> Log10RatioResult:
+    """
+    Calculates the logarithm base 10 of the element-wise ratio of two arrays.
+
+    This is the array version of calculate_log10_ratio, used to compute the absorbance
+    log10(air / sample) of a whole capture at once. Instead of raising on the first bad
+    element, the invalid elements are set to NaN and flagged in the returned masks.
+
+    Parameters:
+    - x (array_like): The numerators of the ratios, e.g. the measurements in air.
+    - y (array_like): The denominators of the ratios, e.g. the measurements in the sample.
+
+    Returns:
+    Log10RatioResult: The logarithms, with the masks of the zero denominators and of the
+    non-positive ratios.
+
+    Examples:
+    >>> result = calculate_log10_ratio_array([10, 100, 1, -1], [2, 10, 0, 2])
+    >>> result.values
+    array([0.69897, 1.     ,     nan,     nan])
+    >>> result.zero_denominator
+    array([False, False,  True, False])
+    >>> result.non_positive_ratio
+    array([False, False, False,  True])
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    with stage("absorbance", rows=max(x.size, y.size)):
+        # Flagging the zero denominators and the ratios without a logarithm
+        zero_denominator = y == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = x / y
+            non_positive_ratio = ~zero_denominator & ~(ratio > 0)
+            values = np.log10(ratio)
+
+        values = np.where(zero_denominator | non_positive_ratio, np.nan, values)
+
+    return Log10RatioResult(values, zero_denominator, non_positive_ratio)
+
+
+if __name__ == "__main__":
+    # Example usage:
+    x_value = 10
+    y_value = 2
+    log_ratio = calculate_log10_ratio(x_value, y_value)
+    print(f"The logarithm base 10 of {x_value} / {y_value} is {log_ratio}.")
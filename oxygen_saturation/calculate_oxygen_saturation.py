@@ -9,6 +9,7 @@
 # Importing Necessary Libraries
 # ------------------------------
 import math
+from .extinction import DEFAULT_REGISTRY
 
 
 def calculate_oxygen_saturation(red_power: float, nir_power: float) -> float:
@@ -74,14 +75,17 @@ def retrieve_preset_value(choice):
     int choice: The user's choice of wavelength option.
 
     Returns:
-    float: The preset value corresponding to the choice.
+    tuple: The (HbO2, Hb) extinction coefficients at the chosen wavelength, or None for an invalid choice.
     """
-    preset_values = {
-        1: (e_hbO2_660, e_hb_660),
-        2: (e_hbO2_660, e_hb_810),
-        3: (e_hbO2_940, e_hb_940)
+    preset_wavelengths = {
+        1: 660,
+        2: 810,
+        3: 940
     }
-    return preset_values.get(choice, None)
+    wavelength = preset_wavelengths.get(choice, None)
+    if wavelength is None:
+        return None
+    return DEFAULT_REGISTRY.coefficients(wavelength)
 
 
 def enter_measurements():
@@ -163,43 +167,6 @@ def calculate_with_preset_formula(value):
     result = value * 2
     return result
 
-# Define all the necessary Extinction coefficients, Moaveni's data
-# At 660nm, HbO2 has a ε of 320 [cm-1/M] and Hb has a ε of 3200 [cm-1/M];
-# At 810nm, HbO2 has a ε of 860 [cm-1/M] and Hb has a ε of 880 [cm-1/M];
-# At 940nm, HbO2 has a ε of 1200 [cm-1/M] and Hb has a ε of 800 [cm-1/M].
-e_hbO2_660 = 320
-e_hb_660 = 3200
-e_hbO2_810 = 860
-e_hb_810 = 880
-e_hbO2_940 = 1200
-e_hb_940 = 800
-
-
-
-# Main code
-choice = get_wavelength_option()
-
-if 1 <= choice <= 3:
-    value = retrieve_preset_value(choice)
-    if value is not None:
-        e_hbO2, e_hb = value
-        print(f"Extinction coefficients of HbO2 and Hb: {e_hbO2},{e_hb}")
-    else:
-        print("Invalid choice. Preset value not found.")
-else:
-    print("Invalid choice. Please choose between 1 and 3.")
-
-
-try:
-    oxygen_saturation = calculate_oxygen_saturation(red_measurement, nir_measurement)
-    print(f"The oxygen saturation is {oxygen_saturation}%.")
-except ValueError as e:
-    print(f"Error: {e}")
-except ZeroDivisionError as e:
-    print(f"Error: {e}")
-
-
-
 
 # Unit tests for calculate_oxygen_saturation function.
 
@@ -257,19 +224,46 @@ class TestCalculateOxygenSaturation(unittest.TestCase):
         with self.assertRaises(ZeroDivisionError):
             calculate_oxygen_saturation(red_power, nir_power)
 
-# Examples of using the calculate_oxygen_saturation function:
-
-# Example 1: Calculating oxygen saturation with positive power measurements
-red_power1 = 10.0
-nir_power1 = 5.0
-oxygen_saturation1 = calculate_oxygen_saturation(red_power1, nir_power1)
-print(f"For red power measurement = {red_power1} and NIR power measurement = {nir_power1}, the oxygen saturation is {oxygen_saturation1}.")
-
-# Example 2: Calculating oxygen saturation with negative power measurements (should raise an error)
-try:
-    red_power2 = -10.0
-    nir_power2 = 5.0
-    oxygen_saturation2 = calculate_oxygen_saturation(red_power2, nir_power2)
-    print(f"For red power measurement = {red_power2} and NIR power measurement = {nir_power2}, the oxygen saturation is {oxygen_saturation2}.")
-except ValueError as e:
-    print(f"Error while calculating oxygen saturation: {e}")
\ No newline at end of file
+
+if __name__ == "__main__":
+    # Examples of using the calculate_oxygen_saturation function:
+
+    # Example 1: Calculating oxygen saturation with positive power measurements
+    red_power1 = 10.0
+    nir_power1 = 5.0
+    oxygen_saturation1 = calculate_oxygen_saturation(red_power1, nir_power1)
+    print(f"For red power measurement = {red_power1} and NIR power measurement = {nir_power1}, the oxygen saturation is {oxygen_saturation1}.")
+
+    # Example 2: Calculating oxygen saturation with negative power measurements (should raise an error)
+    try:
+        red_power2 = -10.0
+        nir_power2 = 5.0
+        oxygen_saturation2 = calculate_oxygen_saturation(red_power2, nir_power2)
+        print(f"For red power measurement = {red_power2} and NIR power measurement = {nir_power2}, the oxygen saturation is {oxygen_saturation2}.")
+    except ValueError as e:
+        print(f"Error while calculating oxygen saturation: {e}")
+
+    # Main code
+    choice = get_wavelength_option()
+
+    if 1 <= choice <= 3:
+        value = retrieve_preset_value(choice)
+        if value is not None:
+            e_hbO2, e_hb = value
+            print(f"Extinction coefficients of HbO2 and Hb: {e_hbO2},{e_hb}")
+        else:
+            print("Invalid choice. Preset value not found.")
+    else:
+        print("Invalid choice. Please choose between 1 and 3.")
+
+
+    red_measurement = float(input("The optical power measurement obtained from the red LED: "))
+    nir_measurement = float(input("The optical power measurement obtained from the NIR LED: "))
+
+    try:
+        oxygen_saturation = calculate_oxygen_saturation(red_measurement, nir_measurement)
+        print(f"The oxygen saturation is {oxygen_saturation}%.")
+    except ValueError as e:
+        print(f"Error: {e}")
+    except ZeroDivisionError as e:
+        print(f"Error: {e}")
@@ -0,0 +1,92 @@
+import numpy as np
+
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .extinction import DEFAULT_REGISTRY, ExtinctionRegistry
+from .instrumentation import stage
+
+# The red/NIR wavelength pairs used by the isosbestic method
+WAVELENGTH_PAIRS = ((660, 810), (660, 940))
+
+
+def calculate_scvo2_from_absorbance(A_red, A_nir, red_wavelength: float = 660, nir_wavelength: float = 810,
+                                    registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> np.ndarray:
+    """
+    Calculates ScvO2 with the isosbestic method for arrays of red and NIR absorbances.
+
+    The whole array is evaluated at once with NumPy, so any number of readings can be
+    scored in a single call. Scalars are accepted and broadcast against arrays. The
+    constant terms of the formula come from the registry, which computes them once per
+    wavelength pair.
+
+    Parameters:
+    - A_red (array_like): The absorbances measured with the red LED.
+    - A_nir (array_like): The absorbances measured with the NIR LED.
+    - red_wavelength (float): The wavelength of the red LED in nm.
+    - nir_wavelength (float): The wavelength of the NIR LED in nm.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    np.ndarray: The ScvO2 of every reading, in percent.
+
+    Raises:
+    - ValueError: If one of the wavelengths has no extinction coefficients.
+
+    Formula:
+    R = A_red / A_nir
+    ScvO2 = (e_hb_red - R * e_hb_nir) / (e_hb_red - e_hbO2_red + R * (e_hbO2_nir - e_hb_nir)) * 100
+
+    Examples:
+    >>> calculate_scvo2_from_absorbance([0.2, 0.3], 0.25).round(2)
+    array([87.15, 75.07])
+    """
+
+    constants = registry.pair(red_wavelength, nir_wavelength)
+
+    # ISOSBESTIC METHOD
+    with stage("solve", rows=np.size(A_red)):
+        R = np.asarray(A_red, dtype=float) / np.asarray(A_nir, dtype=float)
+        return constants.scvo2(R)
+
+
+def calculate_scvo2_batch(air_660, sample_660, air_810, sample_810, air_940, sample_940,
+                          registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> dict:
+    """
+    Calculates ScvO2 for every sample with both the 660/810nm and the 660/940nm pairs.
+
+    The air measurements are broadcast against the sample measurements, so a single
+    air reading per wavelength can be used with any number of samples, and the sample
+    arrays can have any shape (for example one row per sample and one column per reading).
+    Samples whose absorbance is undefined (zero or negative measurements) give NaN.
+
+    Parameters:
+    - air_660 (array_like): The optical power measured in air with the 660nm LED.
+    - sample_660 (array_like): The optical power measured in the samples with the 660nm LED.
+    - air_810 (array_like): The optical power measured in air with the 810nm LED.
+    - sample_810 (array_like): The optical power measured in the samples with the 810nm LED.
+    - air_940 (array_like): The optical power measured in air with the 940nm LED.
+    - sample_940 (array_like): The optical power measured in the samples with the 940nm LED.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    dict: A dictionary mapping each wavelength pair, (660, 810) and (660, 940), to a
+    NumPy array with the ScvO2 of every sample in percent.
+
+    Examples:
+    >>> results = calculate_scvo2_batch(14.0, [5.9, 6.1], 11.9, [6.5, 6.6], 8.5, [3.4, 3.5])
+    >>> results[(660, 810)].round(2)
+    array([68.13, 68.72])
+    """
+
+    # Calculation of absorbances
+    absorbances = {
+        660: calculate_log10_ratio_array(air_660, sample_660).values,
+        810: calculate_log10_ratio_array(air_810, sample_810).values,
+        940: calculate_log10_ratio_array(air_940, sample_940).values,
+    }
+
+    return {
+        (red_wavelength, nir_wavelength): calculate_scvo2_from_absorbance(
+            absorbances[red_wavelength], absorbances[nir_wavelength], red_wavelength, nir_wavelength, registry
+        )
+        for red_wavelength, nir_wavelength in WAVELENGTH_PAIRS
+    }
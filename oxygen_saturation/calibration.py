@@ -0,0 +1,127 @@
+import csv
+from typing import NamedTuple
+
+import numpy as np
+
+from .spo2_calculation import RatioLookupTable
+
+# Empirical pulse oximeter calibrations are usually quadratic in Ratio
+DEFAULT_DEGREE = 2
+
+# Entries of the fitted tables: 1 KiB of float in the firmware
+DEFAULT_TABLE_SIZE = 256
+
+
+class CalibrationFit(NamedTuple):
+    """
+    The result of fit_calibration.
+
+    Attributes:
+    - table (RatioLookupTable): The uniformly spaced table sampled from the fitted curve.
+    - coefficients (np.ndarray): The coefficients of the curve, %SpO2 = sum(c[k] * Ratio**k).
+    - rms_error (float): The RMS difference between the curve and the reference %SpO2.
+    - table_error (float): The largest difference between the table and the curve at the
+      reference ratios, i.e. the interpolation error of the table.
+    """
+
+    table: RatioLookupTable
+    coefficients: np.ndarray
+    rms_error: float
+    table_error: float
+
+
+def load_reference_csv(file_path: str) -> tuple:
+    """
+    Reads (Ratio, reference %SpO2) pairs from a CSV file with ratio and SpO2 columns.
+
+    The first row is skipped if it is a header.
+
+    Parameters:
+    - file_path (str): The path to the CSV file.
+
+    Returns:
+    tuple: The ratios and the reference %SpO2, as two arrays.
+
+    Raises:
+    - FileNotFoundError: If the specified file does not exist.
+    - ValueError: If a row does not hold two numbers.
+    """
+
+    pairs = []
+    with open(file_path, "r", newline="", encoding="utf-8") as file:
+        for line_number, row in enumerate(csv.reader(file), start=1):
+            if not row:
+                continue
+            try:
+                pairs.append((float(row[0]), float(row[1])))
+            except (ValueError, IndexError):
+                if line_number == 1:
+                    continue
+                raise ValueError(f"Line {line_number} of '{file_path}' does not hold a ratio and a SpO2.")
+
+    pairs = np.array(pairs, dtype=float).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def fit_calibration(ratio, spo2, degree: int = DEFAULT_DEGREE, size: int = DEFAULT_TABLE_SIZE,
+                    ratio_start: float = None, ratio_stop: float = None) -> CalibrationFit:
+    """
+    Fits a Ratio-to-SpO2 curve to reference measurements and samples it into a lookup table.
+
+    The curve is a least-squares polynomial of the ratio, clipped to [0, 100] %SpO2. The
+    table covers the reference ratios by default: ratios outside are clamped to its ends
+    rather than extrapolated.
+
+    Parameters:
+    - ratio (array_like): The measured ratios, e.g. SpO2Result.ratio.
+    - spo2 (array_like): The reference %SpO2 of each ratio, e.g. from a co-oximeter.
+    - degree (int): The degree of the polynomial.
+    - size (int): The number of entries of the table.
+    - ratio_start (float, optional): The ratio of the first entry, the smallest reference ratio by default.
+    - ratio_stop (float, optional): The ratio of the last entry, the largest reference ratio by default.
+
+    Returns:
+    CalibrationFit: The table, the curve and its errors.
+
+    Raises:
+    - ValueError: If ratio and spo2 do not have the same length, if there are fewer valid
+      pairs than degree + 1, if the table range is empty, or if size is less than 2.
+
+    Examples:
+    >>> ratio = np.array([0.4, 0.6, 0.8, 1.0, 1.2, 1.4])
+    >>> fit = fit_calibration(ratio, 104 - 17 * ratio - 6 * ratio ** 2)
+    >>> fit.coefficients.round(6)
+    array([104., -17.,  -6.])
+    >>> fit.table([0.5, 2.0]).round(2)
+    array([94.  , 68.44])
+    """
+
+    ratio = np.asarray(ratio, dtype=float).ravel()
+    spo2 = np.asarray(spo2, dtype=float).ravel()
+    if ratio.shape != spo2.shape:
+        raise ValueError("There must be one reference SpO2 per ratio.")
+
+    valid = np.isfinite(ratio) & np.isfinite(spo2)
+    ratio = ratio[valid]
+    spo2 = spo2[valid]
+    if ratio.size < degree + 1:
+        raise ValueError(f"A curve of degree {degree} needs at least {degree + 1} valid pairs.")
+
+    ratio_start = ratio.min() if ratio_start is None else ratio_start
+    ratio_stop = ratio.max() if ratio_stop is None else ratio_stop
+    if not ratio_start < ratio_stop:
+        raise ValueError("The first ratio of the table must be below the last one.")
+
+    # Fitting in a scaled domain keeps the least-squares problem well conditioned
+    curve = np.polynomial.Polynomial.fit(ratio, spo2, degree).convert()
+
+    def calibration(values):
+        return np.clip(curve(values), 0, 100)
+
+    table = RatioLookupTable.from_function(calibration, ratio_start, ratio_stop, size)
+
+    inside = (ratio >= ratio_start) & (ratio <= ratio_stop)
+    table_error = np.abs(table(ratio[inside]) - calibration(ratio[inside])).max(initial=0.0)
+
+    return CalibrationFit(table, curve.coef, float(np.sqrt(np.mean((curve(ratio) - spo2) ** 2))),
+                          float(table_error))
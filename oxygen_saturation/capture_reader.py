@@ -0,0 +1,300 @@
+import struct
+
+import numpy as np
+
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .calculate_scvo2 import calculate_scvo2_from_absorbance
+from .instrumentation import stage
+from .median_average import ChannelAggregators
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# Binary capture format, all little-endian:
+#   magic        8 bytes   b"OXYCAP\x00\x01" (the last byte is the format version)
+#   n_columns    uint16
+#   dtype        4 bytes   NumPy type string of every column, e.g. b"<f4\x00"
+#   names        n_columns times: uint16 length, then the UTF-8 column name
+#   rows         n_rows times: one value per column, in column order
+BINARY_MAGIC = b"OXYCAP\x00\x01"
+DEFAULT_BINARY_DTYPE = "<f4"
+
+
+def iter_csv_chunks(file_path: str, column_names=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Reads a CSV capture chunk by chunk, so that memory stays flat however long the file is.
+
+    Parameters:
+    - file_path (str): The path to the CSV file, with a header row of column names.
+    - column_names (iterable of str, optional): The columns to read. All columns if None.
+    - chunk_size (int): The number of rows per chunk.
+
+    Yields:
+    dict: A dictionary mapping each column name to a float array of at most chunk_size
+    values, NaN for text and empty cells.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If one of the requested columns does not exist in the file.
+    """
+
+    # pandas is only needed for the CSV parser
+    import pandas as pd
+
+    usecols = list(column_names) if column_names is not None else None
+    with pd.read_csv(file_path, usecols=usecols, chunksize=chunk_size) as reader:
+        while True:
+            # Timing the parsing only, not the consumer of the chunk
+            with stage("load") as record:
+                data_frame = next(reader, None)
+                if data_frame is None:
+                    return
+                chunk = {
+                    column_name: pd.to_numeric(data_frame[column_name], errors='coerce').to_numpy(dtype=float)
+                    for column_name in (usecols or data_frame.columns)
+                }
+                record.add(rows=len(data_frame))
+            yield chunk
+
+
+class BinaryCaptureWriter:
+    """
+    Writes a capture in the compact binary format, one chunk of rows at a time.
+
+    Examples:
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "capture.bin")
+    >>> with BinaryCaptureWriter(path, ['red', 'ir']) as writer:
+    ...     writer.write({'red': [1.0, 2.0, 3.0], 'ir': [4.0, 5.0, 6.0]})
+    >>> [chunk['ir'] for chunk in iter_binary_chunks(path, chunk_size=2)]
+    [array([4., 5.]), array([6.])]
+    """
+
+    def __init__(self, file_path: str, column_names, dtype: str = DEFAULT_BINARY_DTYPE):
+        """
+        Constructs a new BinaryCaptureWriter instance and writes the header.
+
+        Parameters:
+        - file_path (str): The path of the binary file, overwritten if it exists.
+        - column_names (iterable of str): The names of the columns, in storage order.
+        - dtype (str): The little-endian NumPy type of every value, e.g. '<f4' or '<i2'.
+
+        Raises:
+        - ValueError: If there are no columns or the type is not a little-endian number type.
+        """
+
+        self.column_names = [str(column_name) for column_name in column_names]
+        self.dtype = np.dtype(dtype)
+        if not self.column_names:
+            raise ValueError("At least one column is required.")
+        if self.dtype.kind not in "iuf" or self.dtype.byteorder == ">" or len(self.dtype.str) > 4:
+            raise ValueError(f"Unsupported binary capture type '{dtype}'.")
+
+        self._row_dtype = np.dtype([(column_name, self.dtype) for column_name in self.column_names])
+        self._file = open(file_path, "wb")
+        self._file.write(_encode_header(self.column_names, self.dtype))
+
+    def write(self, chunk: dict):
+        """
+        Appends a chunk of rows.
+
+        Parameters:
+        - chunk (dict): A dictionary mapping every column name to its values, all of the same length.
+
+        Raises:
+        - ValueError: If a column is missing or the columns do not have the same length.
+        """
+
+        values = [np.ravel(chunk[column_name]) for column_name in self.column_names]
+        if len({column.size for column in values}) > 1:
+            raise ValueError("All the columns of a chunk must have the same length.")
+
+        rows = np.empty(values[0].size, dtype=self._row_dtype)
+        for column_name, column in zip(self.column_names, values):
+            rows[column_name] = column
+        rows.tofile(self._file)
+
+    def close(self):
+        """
+        Closes the file.
+        """
+
+        self._file.close()
+
+    def __enter__(self) -> "BinaryCaptureWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _encode_header(column_names: list, dtype: np.dtype) -> bytes:
+    """
+    Encodes the header of the binary capture format.
+    """
+
+    header = [BINARY_MAGIC, struct.pack("<H", len(column_names)), dtype.str.encode("ascii").ljust(4, b"\x00")]
+    for column_name in column_names:
+        name = column_name.encode("utf-8")
+        header.append(struct.pack("<H", len(name)) + name)
+    return b"".join(header)
+
+
+def _read_exactly(file, size: int) -> bytes:
+    """
+    Reads size bytes of the header of the binary capture format.
+
+    Raises:
+    - ValueError: If the file ends first.
+    """
+
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("The header of the binary capture is truncated.")
+    return data
+
+
+def _read_header(file) -> tuple:
+    """
+    Reads the header of the binary capture format.
+
+    Returns:
+    tuple: The column names and the NumPy type of the values.
+
+    Raises:
+    - ValueError: If the file is not a binary capture, or its header is truncated or corrupt.
+
+    Examples:
+    >>> import io
+    >>> header = _encode_header(["red", "nir"], np.dtype("<f4"))
+    >>> _read_header(io.BytesIO(header))
+    (['red', 'nir'], dtype('float32'))
+    >>> _read_header(io.BytesIO(header[:-2]))
+    Traceback (most recent call last):
+    ...
+    ValueError: The header of the binary capture is truncated.
+    """
+
+    if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Not a binary capture file, or an unsupported version.")
+
+    (n_columns,) = struct.unpack("<H", _read_exactly(file, 2))
+    try:
+        dtype = np.dtype(_read_exactly(file, 4).rstrip(b"\x00").decode("ascii"))
+    except TypeError:
+        raise ValueError("The header of the binary capture has an unknown value type.")
+
+    column_names = []
+    for _ in range(n_columns):
+        (length,) = struct.unpack("<H", _read_exactly(file, 2))
+        column_names.append(_read_exactly(file, length).decode("utf-8"))
+
+    return column_names, dtype
+
+
+def iter_binary_chunks(file_path: str, column_names=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Reads a binary capture chunk by chunk, so that memory stays flat however long the file is.
+
+    The rows are read into one preallocated buffer, reused for every chunk.
+
+    Parameters:
+    - file_path (str): The path to the binary file.
+    - column_names (iterable of str, optional): The columns to read. All columns if None.
+    - chunk_size (int): The number of rows per chunk.
+
+    Yields:
+    dict: A dictionary mapping each column name to a float array of at most chunk_size values.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If the file is not a binary capture, its header is truncated, or a requested column does not exist.
+    """
+
+    with open(file_path, "rb") as file:
+        stored_names, dtype = _read_header(file)
+        row_dtype = np.dtype([(column_name, dtype) for column_name in stored_names])
+
+        if column_names is None:
+            column_names = stored_names
+        for column_name in column_names:
+            if column_name not in stored_names:
+                raise ValueError(f"Column '{column_name}' does not exist in '{file_path}'.")
+
+        buffer = bytearray(chunk_size * row_dtype.itemsize)
+        while True:
+            # Timing the read only, not the consumer of the chunk
+            with stage("load") as record:
+                n_bytes = file.readinto(buffer)
+                n_rows = n_bytes // row_dtype.itemsize
+                if n_rows == 0:
+                    return
+
+                rows = np.frombuffer(buffer, dtype=row_dtype, count=n_rows)
+                chunk = {column_name: rows[column_name].astype(float) for column_name in column_names}
+                record.add(rows=n_rows, bytes_read=n_bytes)
+            yield chunk
+
+            if n_rows < chunk_size:
+                return
+
+
+def iter_capture_chunks(file_path: str, column_names=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Reads a CSV or binary capture chunk by chunk, depending on its content.
+
+    Parameters:
+    - file_path (str): The path to the capture.
+    - column_names (iterable of str, optional): The columns to read. All columns if None.
+    - chunk_size (int): The number of rows per chunk.
+
+    Yields:
+    dict: A dictionary mapping each column name to a float array; see iter_csv_chunks.
+    """
+
+    with open(file_path, "rb") as file:
+        is_binary = file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+    reader = iter_binary_chunks if is_binary else iter_csv_chunks
+    return reader(file_path, column_names, chunk_size)
+
+
+def aggregate_chunks(chunks) -> ChannelAggregators:
+    """
+    Feeds chunks to one streaming count/mean/median aggregator per column, skipping NaN.
+
+    Parameters:
+    - chunks (iterable of dict): The chunks, e.g. from iter_capture_chunks.
+
+    Returns:
+    ChannelAggregators: The statistics of every column.
+    """
+
+    aggregators = ChannelAggregators()
+    for chunk in chunks:
+        aggregators.update({column_name: values[~np.isnan(values)] for column_name, values in chunk.items()})
+    return aggregators
+
+
+def iter_scvo2_chunks(chunks, air_red: float, air_nir: float, red_column: str, nir_column: str,
+                      red_wavelength: float = 660, nir_wavelength: float = 810):
+    """
+    Calculates the ScvO2 of every row of a capture, chunk by chunk.
+
+    Parameters:
+    - chunks (iterable of dict): The chunks, e.g. from iter_capture_chunks.
+    - air_red (float): The optical power measured in air with the red LED.
+    - air_nir (float): The optical power measured in air with the NIR LED.
+    - red_column (str): The column of the sample measurements with the red LED.
+    - nir_column (str): The column of the sample measurements with the NIR LED.
+    - red_wavelength (float): The wavelength of the red LED in nm.
+    - nir_wavelength (float): The wavelength of the NIR LED in nm.
+
+    Yields:
+    np.ndarray: The ScvO2 of the rows of each chunk in percent, NaN where an absorbance is undefined.
+    """
+
+    for chunk in chunks:
+        A_red = calculate_log10_ratio_array(air_red, chunk[red_column]).values
+        A_nir = calculate_log10_ratio_array(air_nir, chunk[nir_column]).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yield calculate_scvo2_from_absorbance(A_red, A_nir, red_wavelength, nir_wavelength)
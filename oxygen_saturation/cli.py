@@ -0,0 +1,267 @@
+import argparse
+import os
+import sys
+
+from .batch_scvo2 import run_batch, score_workbook
+
+
+def _print_errors(errors: list):
+    """
+    Prints the (file, sheet, message) errors of score_workbook or run_batch.
+    """
+
+    for file_path, sheet_name, message in errors:
+        print(f"Error in '{file_path}'" + (f", sheet '{sheet_name}'" if sheet_name else "") + f": {message}")
+
+
+def _scvo2(args) -> int:
+    """
+    Prints the ScvO2 of every sample of one workbook, like 'calculate directly.py'.
+    """
+
+    rows, errors = score_workbook(args.file, args.sheets, not args.no_cache)
+    for _, sheet_name, sample, red_wavelength, nir_wavelength, scvo2 in rows:
+        print(f"{sheet_name}: ScvO2 (w/ {red_wavelength}nm and {nir_wavelength}nm) of {sample} = {round(scvo2, 2)}%")
+    _print_errors(errors)
+    return 1 if errors and not rows else 0
+
+
+def _batch(args) -> int:
+    """
+    Scores many workbooks in parallel into one CSV file.
+    """
+
+    if args.db:
+        from .results_store import ResultsStore
+        with ResultsStore(args.db) as store:
+            summary = run_batch(args.paths, args.output, args.sheets, args.workers, args.chunksize,
+                                not args.no_cache, store)
+    else:
+        summary = run_batch(args.paths, args.output, args.sheets, args.workers, args.chunksize, not args.no_cache)
+    _print_errors(summary.errors)
+    print(f"Wrote {summary.rows} ScvO2 values from {summary.workbooks} workbooks to '{args.output}'.")
+    return 0
+
+
+def _bootstrap(args) -> int:
+    """
+    Calculates the ScvO2 confidence intervals of many workbooks into one CSV file.
+    """
+
+    from .bootstrap_scvo2 import run_bootstrap
+
+    summary = run_bootstrap(args.paths, args.output, args.sheets, args.resamples, args.confidence, args.seed,
+                            args.workers, args.chunk_size, not args.no_cache)
+    _print_errors(summary.errors)
+    print(f"Wrote {summary.rows} ScvO2 intervals from {summary.workbooks} workbooks to '{args.output}'.")
+    return 0
+
+
+def _calculate(args) -> int:
+    """
+    Runs the interactive measurement entry of cal.py.
+    """
+
+    from .cal import calculate
+    calculate()
+    return 0
+
+
+def _benchmark(args) -> int:
+    """
+    Times the pipeline stages, records a baseline and checks for regressions.
+    """
+
+    from .benchmark import compare_to_baseline, format_results, run_benchmarks, save_baseline
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeat)
+    print(format_results(results))
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"Saved the baseline to '{args.baseline}'.")
+        return 0
+
+    if os.path.isfile(args.baseline):
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        for stage, rows, reference, seconds in regressions:
+            print(f"Regression: {stage} on {rows} rows took {seconds:.6f}s instead of {reference:.6f}s.")
+        return 1 if regressions else 0
+
+    return 0
+
+
+def _calibrate(args) -> int:
+    """
+    Fits a Ratio-to-SpO2 lookup table to reference measurements.
+    """
+
+    from .calibration import fit_calibration, load_reference_csv
+
+    ratio, spo2 = load_reference_csv(args.file)
+    fit = fit_calibration(ratio, spo2, args.degree, args.size, args.start, args.stop)
+    source = fit.table.to_c_array(args.name)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(source + "\n")
+    else:
+        print(source)
+    if args.npz:
+        fit.table.save(args.npz)
+
+    terms = " ".join(f"{coefficient:+.6g}*R^{power}" for power, coefficient in enumerate(fit.coefficients))
+    print(f"SpO2 = {terms}, RMS error {fit.rms_error:.3f}%, table error {fit.table_error:.4f}%.", file=sys.stderr)
+    return 0
+
+
+def _serve(args) -> int:
+    """
+    Runs the acquisition server and prints every result as a CSV line.
+    """
+
+    import asyncio
+
+    from .acquisition_server import AcquisitionServer
+
+    async def serve():
+        server = AcquisitionServer(args.queue_size)
+        if args.unix:
+            await server.start_unix(args.unix)
+            print(f"Listening on '{args.unix}'.", flush=True)
+        else:
+            await server.start_tcp(args.host, args.port)
+            print(f"Listening on {args.host}:{args.port}.", flush=True)
+
+        print("device,kind,sample_index,time,value,pulse_rate")
+        while True:
+            result = await server.results.get()
+            print(",".join(str(field) for field in result), flush=True)
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _simulate(args) -> int:
+    """
+    Streams simulated devices to a running acquisition server.
+    """
+
+    import asyncio
+
+    from .acquisition_server import SimulatedDevice
+
+    async def simulate():
+        devices = [SimulatedDevice(f"{args.prefix}{number}", seed=number) for number in range(args.devices)]
+        return await asyncio.gather(*(
+            device.run(args.duration, args.host, args.port, args.unix, args.realtime) for device in devices))
+
+    sent = asyncio.run(simulate())
+    print(f"Sent {sum(sent)} samples from {len(sent)} devices.")
+    return 0
+
+
+def main(argv=None) -> int:
+    """
+    The command line entry point, run with python -m oxygen_saturation.
+
+    Parameters:
+    - argv (list of str, optional): The arguments, sys.argv[1:] by default.
+
+    Returns:
+    int: The exit status.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m oxygen_saturation",
+                                     description="Calculate the oxygen saturation from red and NIR measurements.")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Print the time, calls, rows and bytes of every pipeline stage at the end.")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write the pipeline stages to a Chrome trace JSON file (chrome://tracing).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scvo2 = commands.add_parser("scvo2", help="Print the ScvO2 of the samples of one workbook.")
+    scvo2.add_argument("file", help="The Excel workbook.")
+    scvo2.set_defaults(handler=_scvo2)
+
+    batch = commands.add_parser("batch", help="Score many workbooks in parallel into one CSV file.")
+    batch.add_argument("paths", nargs="+", help="Workbooks, directories or glob patterns.")
+    batch.add_argument("-o", "--output", default="scvo2_results.csv", help="The combined CSV output.")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="The number of worker processes.")
+    batch.add_argument("--chunksize", type=int, default=4, help="The number of workbooks per task.")
+    batch.add_argument("--db", metavar="FILE", help="Also add the results to a SQLite results store.")
+    batch.set_defaults(handler=_batch)
+
+    bootstrap = commands.add_parser("bootstrap", help="Calculate bootstrap confidence intervals into one CSV file.")
+    bootstrap.add_argument("paths", nargs="+", help="Workbooks, directories or glob patterns.")
+    bootstrap.add_argument("-o", "--output", default="scvo2_intervals.csv", help="The combined CSV output.")
+    bootstrap.add_argument("-j", "--workers", type=int, default=None, help="The number of worker processes.")
+    bootstrap.add_argument("--resamples", type=int, default=2000, help="The number of bootstrap resamples.")
+    bootstrap.add_argument("--confidence", type=float, default=0.95, help="The confidence level of the intervals.")
+    bootstrap.add_argument("--seed", type=int, default=0, help="The seed of the resampling.")
+    bootstrap.add_argument("--chunk-size", type=int, default=250, help="The number of resamples per task.")
+    bootstrap.set_defaults(handler=_bootstrap)
+
+    for command in (scvo2, batch, bootstrap):
+        command.add_argument("-s", "--sheet", action="append", dest="sheets",
+                             help="A sheet to score; can be repeated. All sheets by default.")
+        command.add_argument("--no-cache", action="store_true", help="Parse the workbooks without the cache.")
+
+    calculate = commands.add_parser("calculate", help="Enter red and NIR measurements interactively.")
+    calculate.set_defaults(handler=_calculate)
+
+    benchmark = commands.add_parser("benchmark", help="Time the pipeline stages on synthetic data.")
+    benchmark.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000, 1000000],
+                           help="The numbers of rows, up to 10000000.")
+    benchmark.add_argument("--stages", nargs="+", default=None, help="The stages to run, all by default.")
+    benchmark.add_argument("--repeat", type=int, default=3, help="The number of timed runs per stage.")
+    benchmark.add_argument("--baseline", default="benchmark_baseline.json", help="The JSON baseline.")
+    benchmark.add_argument("--save", action="store_true", help="Record the results as the new baseline.")
+    benchmark.add_argument("--threshold", type=float, default=0.25,
+                           help="The relative slowdown that fails the run, 0.25 for 25%%.")
+    benchmark.set_defaults(handler=_benchmark)
+
+    calibrate = commands.add_parser("calibrate", help="Fit a Ratio-to-SpO2 lookup table for the firmware.")
+    calibrate.add_argument("file", help="A CSV file of ratio and reference SpO2 pairs.")
+    calibrate.add_argument("--degree", type=int, default=2, help="The degree of the fitted polynomial.")
+    calibrate.add_argument("--size", type=int, default=256, help="The number of entries of the table.")
+    calibrate.add_argument("--start", type=float, default=None, help="The first ratio, the smallest by default.")
+    calibrate.add_argument("--stop", type=float, default=None, help="The last ratio, the largest by default.")
+    calibrate.add_argument("--name", default="SpO2_Table", help="The name of the C array.")
+    calibrate.add_argument("-o", "--output", help="The C file to write, standard output by default.")
+    calibrate.add_argument("--npz", metavar="FILE", help="Also save the table for RatioLookupTable.load.")
+    calibrate.set_defaults(handler=_calibrate)
+
+    serve = commands.add_parser("serve", help="Receive and score the streams of many devices.")
+    serve.add_argument("--queue-size", type=int, default=1024,
+                       help="The number of results waiting to be printed before the devices are slowed down.")
+    simulate = commands.add_parser("simulate", help="Stream simulated devices to a running server.")
+    simulate.add_argument("-n", "--devices", type=int, default=10, help="The number of devices.")
+    simulate.add_argument("--duration", type=float, default=60.0, help="The length of each stream in seconds.")
+    simulate.add_argument("--prefix", default="bed-", help="The prefix of the device ids.")
+    simulate.add_argument("--realtime", action="store_true", help="Pace the samples at the sampling rate.")
+    for command in (serve, simulate):
+        command.add_argument("--host", default="127.0.0.1", help="The TCP address of the server.")
+        command.add_argument("--port", type=int, default=7450, help="The TCP port of the server.")
+        command.add_argument("--unix", metavar="PATH", help="A UNIX socket, instead of TCP.")
+    serve.set_defaults(handler=_serve)
+    simulate.set_defaults(handler=_simulate)
+
+    args = parser.parse_args(argv)
+    if not (args.metrics or args.trace):
+        return args.handler(args)
+
+    # Only the stages run in this process are recorded, e.g. batch or bootstrap with -j 1
+    from .instrumentation import INSTRUMENTATION
+    INSTRUMENTATION.enable(tracing=bool(args.trace))
+    try:
+        return args.handler(args)
+    finally:
+        INSTRUMENTATION.disable()
+        if args.metrics:
+            print(INSTRUMENTATION.to_prometheus(), end="")
+        if args.trace:
+            INSTRUMENTATION.save_chrome_trace(args.trace)
@@ -0,0 +1,263 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Columnar capture format, all little-endian:
+#   magic          8 bytes   b"OXYCOL\x00\x01" (the last byte is the format version)
+#   header_length  uint32    length of the JSON header in bytes
+#   header         JSON      {"n_rows": n, "columns": [{"name", "dtype", "offset"}, ...]}
+#   columns        each column is n_rows contiguous values of its dtype, starting at its
+#                  offset from the start of the file, aligned on ALIGNMENT bytes
+# The column named TIME_COLUMN is the time index in seconds, in increasing order.
+COLUMNAR_MAGIC = b"OXYCOL\x00\x01"
+TIME_COLUMN = "time"
+ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    """
+    Rounds an offset up to the next multiple of ALIGNMENT.
+    """
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_columnar_capture(file_path: str, columns: dict, time=None, sample_rate_hz: float = None):
+    """
+    Writes columns of equal length to a columnar capture file.
+
+    Parameters:
+    - file_path (str): The path of the file, overwritten if it exists.
+    - columns (dict): A dictionary mapping each column name to its values. The NumPy type
+      of each column is kept, converted to little-endian.
+    - time (array_like, optional): The time of each row in seconds, in increasing order.
+    - sample_rate_hz (float, optional): If time is None, the rows are sampled at this rate
+      starting at 0. One row per second by default.
+
+    Raises:
+    - ValueError: If the columns do not have the same length, if a column is named like
+      the time index, or if the time index is not in increasing order.
+    """
+
+    arrays = {str(name): np.ascontiguousarray(values) for name, values in columns.items()}
+    if TIME_COLUMN in arrays:
+        raise ValueError(f"The column name '{TIME_COLUMN}' is reserved for the time index.")
+
+    n_rows = len(next(iter(arrays.values()))) if arrays else (0 if time is None else len(time))
+    if any(array.ndim != 1 or array.size != n_rows for array in arrays.values()):
+        raise ValueError("All the columns must be one-dimensional and have the same length.")
+
+    if time is None:
+        time = np.arange(n_rows) / (sample_rate_hz or 1.0)
+    time = np.asarray(time, dtype="<f8")
+    if time.shape != (n_rows,) or np.any(np.diff(time) < 0):
+        raise ValueError("The time index must have one increasing value per row.")
+
+    arrays = {TIME_COLUMN: time, **{name: array.astype(array.dtype.newbyteorder("<")) for name, array in arrays.items()}}
+
+    # The offsets depend on the header length, which depends on the offsets: reserve enough room
+    descriptions = [{"name": name, "dtype": array.dtype.str, "offset": 0} for name, array in arrays.items()]
+    header_room = _aligned(len(COLUMNAR_MAGIC) + 4 + len(json.dumps({"n_rows": n_rows, "columns": descriptions})) +
+                           len(descriptions) * 20)
+    offset = header_room
+    for description, array in zip(descriptions, arrays.values()):
+        description["offset"] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({"n_rows": n_rows, "columns": descriptions}).encode("utf-8")
+
+    with open(file_path, "wb") as file:
+        file.write(COLUMNAR_MAGIC + struct.pack("<I", len(header)) + header)
+        for description, array in zip(descriptions, arrays.values()):
+            file.seek(description["offset"])
+            array.tofile(file)
+        file.truncate(offset)
+
+
+class ColumnarCapture:
+    """
+    A columnar capture file opened with numpy.memmap.
+
+    Nothing is parsed or copied when a column or a time window is accessed: the arrays
+    returned are views into the memory-mapped file, and the operating system only reads
+    the pages that are actually used.
+
+    Attributes:
+    - file_path (str): The path of the file.
+    - n_rows (int): The number of rows.
+    - column_names (list): The names of the data columns, without the time index.
+
+    Examples:
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "capture.oxc")
+    >>> write_columnar_capture(path, {'red': np.arange(10.0), 'ir': np.arange(10, 20, dtype=np.int16)}, sample_rate_hz=2)
+    >>> capture = ColumnarCapture(path)
+    >>> capture.column_names
+    ['red', 'ir']
+    >>> capture.window(1.0, 2.5)['ir']
+    memmap([12, 13, 14], dtype=int16)
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Opens a columnar capture file.
+
+        Parameters:
+        - file_path (str): The path of the file.
+
+        Raises:
+        - FileNotFoundError: If the specified file path does not exist.
+        - ValueError: If the file is not a columnar capture, an unsupported version, or if
+          it is truncated or its header is corrupt.
+        """
+
+        with open(file_path, "rb") as file:
+            if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError(f"'{file_path}' is not a columnar capture file, or an unsupported version.")
+            length = file.read(4)
+            if len(length) != 4:
+                raise ValueError(f"The header of '{file_path}' is truncated.")
+            (header_length,) = struct.unpack("<I", length)
+            header = file.read(header_length)
+            if len(header) != header_length:
+                raise ValueError(f"The header of '{file_path}' is truncated.")
+
+        try:
+            header = json.loads(header.decode("utf-8"))
+            n_rows = int(header["n_rows"])
+            descriptions = [(str(description["name"]), np.dtype(description["dtype"]), int(description["offset"]))
+                            for description in header["columns"]]
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError(f"The header of '{file_path}' is corrupt.") from error
+
+        self.file_path = file_path
+        self.n_rows = n_rows
+
+        self._columns = {}
+        file_size = os.path.getsize(file_path)
+        for name, dtype, offset in descriptions:
+            if offset + self.n_rows * dtype.itemsize > file_size:
+                raise ValueError(f"'{file_path}' is truncated: column '{name}' ends after the end of the file.")
+            if self.n_rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=(self.n_rows,))
+
+        self.column_names = [name for name in self._columns if name != TIME_COLUMN]
+
+    @property
+    def time(self) -> np.ndarray:
+        """
+        np.ndarray: The memory-mapped time index in seconds.
+        """
+
+        return self._columns[TIME_COLUMN]
+
+    def __getitem__(self, column_name: str) -> np.ndarray:
+        """
+        Returns a whole column as a memory-mapped array.
+
+        Raises:
+        - KeyError: If the column does not exist.
+        """
+
+        if column_name not in self._columns:
+            raise KeyError(f"Column '{column_name}' does not exist in '{self.file_path}'.")
+        return self._columns[column_name]
+
+    def rows(self, start_time: float, stop_time: float) -> slice:
+        """
+        Finds the rows of a time window with a binary search of the time index.
+
+        Parameters:
+        - start_time (float): The start of the window in seconds, included.
+        - stop_time (float): The end of the window in seconds, excluded.
+
+        Returns:
+        slice: The rows whose time is in [start_time, stop_time).
+        """
+
+        start = int(np.searchsorted(self.time, start_time, side="left"))
+        stop = int(np.searchsorted(self.time, stop_time, side="left"))
+        return slice(start, max(start, stop))
+
+    def window(self, start_time: float, stop_time: float, column_names=None) -> dict:
+        """
+        Returns the rows of a time window, without parsing or copying.
+
+        Parameters:
+        - start_time (float): The start of the window in seconds, included.
+        - stop_time (float): The end of the window in seconds, excluded.
+        - column_names (iterable of str, optional): The columns to return. All columns,
+          including the time index, if None.
+
+        Returns:
+        dict: A dictionary mapping each column name to a read-only view of its rows in the window.
+
+        Raises:
+        - KeyError: If one of the columns does not exist.
+        """
+
+        rows = self.rows(start_time, stop_time)
+        if column_names is None:
+            column_names = self._columns
+        return {column_name: self[column_name][rows] for column_name in column_names}
+
+
+def convert_workbook_sheet(file_path: str, sheet_name: str, output_path: str, sample_rate_hz: float = None):
+    """
+    Converts one sheet of a workbook in the data.xlsx layout to a columnar capture.
+
+    Every column of the sheet (e.g. air_660, Sam1_660, ..., Sam2_940) becomes a float64
+    column, with NaN for the text and empty cells, and the rows are time-stamped at
+    sample_rate_hz.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - sheet_name (str): The name of the sheet.
+    - output_path (str): The path of the columnar capture file.
+    - sample_rate_hz (float, optional): The rate of the rows, one row per second by default.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If the specified sheet does not exist in the Excel file.
+    """
+
+    from .excel_cache import get_default_cache
+
+    columns = get_default_cache().load_sheet(file_path, sheet_name)
+    write_columnar_capture(output_path, columns, sample_rate_hz=sample_rate_hz)
+
+
+def convert_workbook(file_path: str, output_dir: str, sample_rate_hz: float = None) -> dict:
+    """
+    Converts every sheet of a workbook in the data.xlsx layout to a columnar capture.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - output_dir (str): The directory of the capture files, named <workbook>_<index>_<sheet>.oxc,
+      where index is the position of the sheet in the workbook, so that sheets whose names
+      only differ by punctuation, e.g. "clear 660" and "clear-660", do not share a file.
+    - sample_rate_hz (float, optional): The rate of the rows, one row per second by default.
+
+    Returns:
+    dict: A dictionary mapping each sheet name to the path of its capture file.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    """
+
+    from .excel_cache import get_default_cache
+
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    paths = {}
+    for index, (sheet_name, columns) in enumerate(get_default_cache().load_workbook(file_path).items()):
+        safe_name = "".join(character if character.isalnum() else "_" for character in sheet_name)
+        paths[sheet_name] = os.path.join(output_dir, f"{base_name}_{index}_{safe_name}.oxc")
+        write_columnar_capture(paths[sheet_name], columns, sample_rate_hz=sample_rate_hz)
+
+    return paths
@@ -0,0 +1,351 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Where the converted workbooks are kept, and how much disk space they may use
+DEFAULT_CACHE_DIR = os.environ.get(
+    "OXYGEN_SATURATION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "oxygen_saturation"),
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+MANIFEST_NAME = "manifest.json"
+
+
+class WorkbookCache:
+    """
+    A local cache of Excel workbooks converted to one .npy file per column.
+
+    The first read of a workbook parses every sheet once with pandas and stores each
+    column as a float64 .npy array (non-numeric cells become NaN). Columns that also hold
+    text keep their raw cell values in a JSON file next to the array, so that
+    read_excel_columns can return them unchanged. Later reads of the same workbook load
+    the arrays directly and never go through openpyxl again.
+
+    Entries are keyed by the absolute path, size, modification time and SHA-256 of the
+    content of the workbook, so an edited file is converted again. When the cache grows
+    beyond max_bytes, the least recently used entries are deleted.
+
+    Attributes:
+    - cache_dir (str): The directory holding the converted workbooks.
+    - max_bytes (int): The maximum total size of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Constructs a new WorkbookCache instance.
+
+        Parameters:
+        - cache_dir (str): The directory holding the converted workbooks. Created if needed.
+        - max_bytes (int): The maximum total size of the cache in bytes.
+
+        Raises:
+        - ValueError: If max_bytes is not positive.
+        """
+
+        if max_bytes <= 0:
+            raise ValueError("The cache size limit must be positive.")
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        # Content hashes already computed by this process, keyed by (path, size, mtime)
+        self._content_hashes = {}
+
+    def workbook_key(self, file_path: str) -> str:
+        """
+        Computes the cache key of a workbook.
+
+        Parameters:
+        - file_path (str): The path to the Excel file.
+
+        Returns:
+        str: A hexadecimal key derived from the path, size, mtime and content of the file.
+
+        Raises:
+        - FileNotFoundError: If the specified file path does not exist.
+        """
+
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        stat_key = (path, stat.st_size, stat.st_mtime_ns)
+
+        # Hash the content only once per file version and process
+        content_hash = self._content_hashes.get(stat_key)
+        if content_hash is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+            content_hash = digest.hexdigest()
+            self._content_hashes[stat_key] = content_hash
+
+        key = f"{path}|{stat.st_size}|{stat.st_mtime_ns}|{content_hash}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def sheet_names(self, file_path: str) -> list:
+        """
+        Returns the names of the sheets of a workbook, converting it if needed.
+
+        Parameters:
+        - file_path (str): The path to the Excel file.
+
+        Returns:
+        list: The sheet names, in workbook order.
+
+        Raises:
+        - FileNotFoundError: If the specified file path does not exist.
+        """
+
+        manifest = self._manifest(file_path)[1]
+        return [sheet["name"] for sheet in manifest["sheets"]]
+
+    def load_sheet(self, file_path: str, sheet_name: str, raw: bool = False) -> dict:
+        """
+        Loads all the columns of one sheet from the cache, converting the workbook if needed.
+
+        Parameters:
+        - file_path (str): The path to the Excel file.
+        - sheet_name (str): The name of the sheet.
+        - raw (bool): If True, return the cell values as lists, like read_excel_columns.
+          Otherwise return float64 arrays where non-numeric cells are NaN.
+
+        Returns:
+        dict: A dictionary mapping each column name, as a string, to its values.
+
+        Raises:
+        - FileNotFoundError: If the specified file path does not exist.
+        - ValueError: If the specified sheet does not exist in the Excel file.
+
+        Examples:
+        >>> import datetime, tempfile, openpyxl
+        >>> directory = tempfile.mkdtemp()
+        >>> workbook = openpyxl.Workbook()
+        >>> workbook.active.append(["air_660", datetime.datetime(2023, 9, 26), "notes"])
+        >>> workbook.active.append([14.5, 5.9, datetime.datetime(2023, 9, 26, 10, 30)])
+        >>> workbook.active.append([14.4, 6.0, "repeat"])
+        >>> workbook.save(os.path.join(directory, "dates.xlsx"))
+        >>> cache = WorkbookCache(os.path.join(directory, "cache"))
+        >>> cache.load_sheet(os.path.join(directory, "dates.xlsx"), "Sheet", raw=True)
+        {'air_660': [14.5, 14.4], '2023-09-26 00:00:00': [5.9, 6.0], 'notes': [datetime.datetime(2023, 9, 26, 10, 30), 'repeat']}
+        >>> shutil.rmtree(directory)
+        """
+
+        entry_dir, manifest = self._manifest(file_path)
+
+        for sheet in manifest["sheets"]:
+            if sheet["name"] == sheet_name:
+                return self._load_columns(entry_dir, sheet, raw)
+
+        raise ValueError(f"Sheet '{sheet_name}' does not exist in the Excel file.")
+
+    def load_workbook(self, file_path: str, raw: bool = False) -> dict:
+        """
+        Loads all the sheets of a workbook from the cache, converting it if needed.
+
+        Parameters:
+        - file_path (str): The path to the Excel file.
+        - raw (bool): See load_sheet.
+
+        Returns:
+        dict: A dictionary mapping each sheet name to a dictionary of column values.
+
+        Raises:
+        - FileNotFoundError: If the specified file path does not exist.
+        """
+
+        entry_dir, manifest = self._manifest(file_path)
+        return {sheet["name"]: self._load_columns(entry_dir, sheet, raw) for sheet in manifest["sheets"]}
+
+    def clear(self):
+        """
+        Deletes every entry of the cache.
+        """
+
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+    def _manifest(self, file_path: str) -> tuple:
+        """
+        Returns the entry directory and manifest of a workbook, converting it on a miss.
+        """
+
+        key = self.workbook_key(file_path)
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+
+        if not os.path.isfile(manifest_path):
+            self._convert(file_path, entry_dir)
+            self._evict(keep=key)
+
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        # Mark the entry as recently used for the LRU eviction
+        os.utime(manifest_path)
+
+        return entry_dir, manifest
+
+    def _convert(self, file_path: str, entry_dir: str):
+        """
+        Parses every sheet of a workbook once and writes it to a new cache entry.
+        """
+
+        # pandas and openpyxl are only needed on a cache miss
+        import pandas as pd
+        data_frames = pd.read_excel(file_path, sheet_name=None)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+
+        try:
+            sheets = []
+            for sheet_index, (sheet_name, data_frame) in enumerate(data_frames.items()):
+                columns = []
+                for column_index, column_name in enumerate(data_frame.columns):
+                    series = data_frame[column_name]
+                    numeric = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+
+                    file_name = f"{sheet_index}_{column_index}"
+                    np.save(os.path.join(temp_dir, file_name + ".npy"), numeric)
+
+                    # Keep the raw cells when the column is not purely numeric
+                    has_text = bool((series.notnull() & np.isnan(numeric)).any())
+                    if has_text:
+                        raw_values = [None if _is_nan(value) or value is pd.NaT else value for value in series.tolist()]
+                        with open(os.path.join(temp_dir, file_name + ".json"), "w", encoding="utf-8") as file:
+                            json.dump(raw_values, file, default=_encode_cell)
+
+                    # JSON keys must be strings, e.g. a date in the header row becomes its ISO format
+                    columns.append({
+                        "name": str(column_name),
+                        "file": file_name,
+                        "integer": series.dtype.kind in "iu",
+                        "text": has_text,
+                    })
+                sheets.append({"name": sheet_name, "columns": columns})
+
+            with open(os.path.join(temp_dir, MANIFEST_NAME), "w", encoding="utf-8") as file:
+                json.dump({"source": os.path.abspath(file_path), "sheets": sheets}, file)
+
+            # Publish the entry atomically; another process may have converted it first
+            try:
+                os.rename(temp_dir, entry_dir)
+            except OSError:
+                if not os.path.isfile(os.path.join(entry_dir, MANIFEST_NAME)):
+                    raise
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    def _load_columns(self, entry_dir: str, sheet: dict, raw: bool) -> dict:
+        """
+        Loads the columns of one sheet of a cache entry.
+        """
+
+        columns = {}
+        for column in sheet["columns"]:
+            path = os.path.join(entry_dir, column["file"])
+
+            if not raw:
+                columns[column["name"]] = np.load(path + ".npy")
+            elif column["text"]:
+                with open(path + ".json", "r", encoding="utf-8") as file:
+                    values = json.load(file, object_hook=_decode_cell)
+                    columns[column["name"]] = [math.nan if value is None else value for value in values]
+            elif column["integer"]:
+                columns[column["name"]] = np.load(path + ".npy").astype(np.int64).tolist()
+            else:
+                columns[column["name"]] = np.load(path + ".npy").tolist()
+
+        return columns
+
+    def _evict(self, keep: str):
+        """
+        Deletes the least recently used entries until the cache fits in max_bytes.
+        """
+
+        entries = []
+        total_size = 0
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            manifest_path = os.path.join(entry_dir, MANIFEST_NAME)
+            if not os.path.isfile(manifest_path):
+                continue
+
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            entries.append((os.stat(manifest_path).st_mtime, key, size))
+            total_size += size
+
+        # Oldest access first
+        for _, key, size in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total_size -= size
+
+
+# Cell types stored in the raw JSON files as {"type": ..., "value": isoformat}
+_TAGGED_TYPES = {"datetime": datetime.datetime, "date": datetime.date, "time": datetime.time}
+
+
+def _encode_cell(value):
+    """
+    Converts a cell value that JSON cannot hold, e.g. a date among text cells.
+
+    Raises:
+    - TypeError: If the value has no JSON representation.
+    """
+
+    # datetime.datetime is a subclass of datetime.date, so it is checked first
+    for name, cell_type in _TAGGED_TYPES.items():
+        if isinstance(value, cell_type):
+            return {"type": name, "value": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"type": "timedelta", "value": value.total_seconds()}
+    raise TypeError(f"Cells of type {type(value).__name__} cannot be cached.")
+
+
+def _decode_cell(tagged: dict):
+    """
+    Converts back a cell value encoded by _encode_cell.
+    """
+
+    if tagged.get("type") == "timedelta":
+        return datetime.timedelta(seconds=tagged["value"])
+    return _TAGGED_TYPES[tagged["type"]].fromisoformat(tagged["value"])
+
+
+def _is_nan(value) -> bool:
+    """
+    Checks if a cell value is a float NaN (an empty cell).
+    """
+
+    return isinstance(value, float) and math.isnan(value)
+
+
+_default_cache = None
+
+
+def get_default_cache() -> WorkbookCache:
+    """
+    Returns the cache shared by the Excel readers of this process.
+
+    Returns:
+    WorkbookCache: The cache stored in DEFAULT_CACHE_DIR.
+    """
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = WorkbookCache()
+    return _default_cache
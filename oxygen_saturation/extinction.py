@@ -0,0 +1,251 @@
+import csv
+from typing import NamedTuple
+
+import numpy as np
+
+# Moaveni's data, in [cm-1/M]:
+# At 660nm, HbO2 has a ε of 320 and Hb has a ε of 3200;
+# At 810nm, HbO2 has a ε of 860 and Hb has a ε of 880;
+# At 940nm, HbO2 has a ε of 1200 and Hb has a ε of 800.
+MOAVENI_SPECTRUM = {
+    660: (320, 3200),
+    810: (860, 880),
+    940: (1200, 800),
+}
+
+
+class PairConstants(NamedTuple):
+    """
+    The constant terms of the isosbestic ScvO2 formula for one red/NIR wavelength pair.
+
+    ScvO2 = (e_hb_red - R * e_hb_nir) / (e_hb_red - e_hbO2_red + R * (e_hbO2_nir - e_hb_nir)) * 100
+    is evaluated as (numerator_offset - R * numerator_slope) / (denominator_offset + R * denominator_slope),
+    with the factor 100 folded into the numerator terms.
+
+    Attributes:
+    - red_wavelength (float): The wavelength of the red LED in nm.
+    - nir_wavelength (float): The wavelength of the NIR LED in nm.
+    - numerator_offset (float): 100 * e_hb_red.
+    - numerator_slope (float): 100 * e_hb_nir.
+    - denominator_offset (float): e_hb_red - e_hbO2_red.
+    - denominator_slope (float): e_hbO2_nir - e_hb_nir.
+    """
+
+    red_wavelength: float
+    nir_wavelength: float
+    numerator_offset: float
+    numerator_slope: float
+    denominator_offset: float
+    denominator_slope: float
+
+    def scvo2(self, R) -> np.ndarray:
+        """
+        Evaluates the ScvO2 formula for one or more ratios R = A_red / A_nir.
+
+        Parameters:
+        - R (float or array_like): The absorbance ratios.
+
+        Returns:
+        np.ndarray: The ScvO2 of every ratio, in percent.
+        """
+
+        R = np.asarray(R, dtype=float)
+        return (self.numerator_offset - R * self.numerator_slope) / (self.denominator_offset + R * self.denominator_slope)
+
+
+class ExtinctionRegistry:
+    """
+    The extinction coefficients of HbO2 and Hb, tabulated by wavelength.
+
+    Coefficients between two tabulated wavelengths are linearly interpolated, so any LED
+    wavelength inside the tabulated range can be used. More wavelengths, or a whole
+    spectrum, can be added with register or load_csv without touching the code.
+
+    The constant terms of the ScvO2 formula are computed once per red/NIR pair and
+    cached, so that every reading only costs a multiply-add and a division.
+
+    Examples:
+    >>> registry = ExtinctionRegistry(MOAVENI_SPECTRUM)
+    >>> registry.coefficients(810)
+    (860.0, 880.0)
+    >>> registry.coefficients(735)
+    (590.0, 2040.0)
+    >>> registry.pair(660, 810).scvo2([0.8, 1.2]).round(2)
+    array([87.15, 75.07])
+    """
+
+    def __init__(self, spectrum: dict = None):
+        """
+        Constructs a new ExtinctionRegistry instance.
+
+        Parameters:
+        - spectrum (dict, optional): A dictionary mapping wavelengths in nm to their
+          (HbO2, Hb) extinction coefficients. Empty if None.
+        """
+
+        self._wavelengths = np.empty(0)
+        self._e_hbO2 = np.empty(0)
+        self._e_hb = np.empty(0)
+        self._pairs = {}
+        self._pseudo_inverses = {}
+
+        if spectrum:
+            self.register_many(spectrum)
+
+    @property
+    def wavelengths(self) -> np.ndarray:
+        """
+        np.ndarray: The tabulated wavelengths in nm, in increasing order.
+        """
+
+        return self._wavelengths.copy()
+
+    def register(self, wavelength: float, e_hbO2: float, e_hb: float):
+        """
+        Adds or replaces the extinction coefficients of one wavelength.
+
+        Parameters:
+        - wavelength (float): The wavelength in nm.
+        - e_hbO2 (float): The extinction coefficient of HbO2 in [cm-1/M].
+        - e_hb (float): The extinction coefficient of Hb in [cm-1/M].
+        """
+
+        self.register_many({wavelength: (e_hbO2, e_hb)})
+
+    def register_many(self, spectrum: dict):
+        """
+        Adds or replaces the extinction coefficients of several wavelengths.
+
+        Parameters:
+        - spectrum (dict): A dictionary mapping wavelengths in nm to (HbO2, Hb) coefficients.
+        """
+
+        table = dict(zip(self._wavelengths.tolist(), zip(self._e_hbO2.tolist(), self._e_hb.tolist())))
+        table.update({float(wavelength): (float(e_hbO2), float(e_hb)) for wavelength, (e_hbO2, e_hb) in spectrum.items()})
+
+        wavelengths = sorted(table)
+        self._wavelengths = np.array(wavelengths, dtype=float)
+        self._e_hbO2 = np.array([table[wavelength][0] for wavelength in wavelengths])
+        self._e_hb = np.array([table[wavelength][1] for wavelength in wavelengths])
+
+        # The cached pair constants and pseudo-inverses may depend on the new coefficients
+        self._pairs.clear()
+        self._pseudo_inverses.clear()
+
+    def load_csv(self, file_path: str):
+        """
+        Adds a tabulated spectrum from a CSV file with wavelength, HbO2 and Hb columns.
+
+        The first row is skipped if it is a header.
+
+        Parameters:
+        - file_path (str): The path to the CSV file.
+
+        Raises:
+        - FileNotFoundError: If the specified file does not exist.
+        - ValueError: If a row does not hold three numbers.
+        """
+
+        spectrum = {}
+        with open(file_path, "r", newline="", encoding="utf-8") as file:
+            for line_number, row in enumerate(csv.reader(file), start=1):
+                if not row:
+                    continue
+                try:
+                    wavelength, e_hbO2, e_hb = (float(value) for value in row[:3])
+                except ValueError:
+                    if line_number == 1:
+                        continue
+                    raise ValueError(f"Line {line_number} of '{file_path}' does not hold a wavelength and two coefficients.")
+                spectrum[wavelength] = (e_hbO2, e_hb)
+
+        self.register_many(spectrum)
+
+    def coefficients(self, wavelength: float) -> tuple:
+        """
+        Returns the extinction coefficients at a wavelength, interpolated if needed.
+
+        Parameters:
+        - wavelength (float): The wavelength in nm.
+
+        Returns:
+        tuple: The (HbO2, Hb) extinction coefficients in [cm-1/M].
+
+        Raises:
+        - ValueError: If the wavelength is outside the tabulated range.
+        """
+
+        if self._wavelengths.size == 0 or not self._wavelengths[0] <= wavelength <= self._wavelengths[-1]:
+            raise ValueError(f"No extinction coefficients for {wavelength}nm.")
+
+        return (float(np.interp(wavelength, self._wavelengths, self._e_hbO2)),
+                float(np.interp(wavelength, self._wavelengths, self._e_hb)))
+
+    def pair(self, red_wavelength: float, nir_wavelength: float) -> PairConstants:
+        """
+        Returns the constant terms of the ScvO2 formula for a red/NIR pair, computed once.
+
+        Parameters:
+        - red_wavelength (float): The wavelength of the red LED in nm.
+        - nir_wavelength (float): The wavelength of the NIR LED in nm.
+
+        Returns:
+        PairConstants: The cached constants of the pair.
+
+        Raises:
+        - ValueError: If one of the wavelengths is outside the tabulated range.
+        """
+
+        key = (red_wavelength, nir_wavelength)
+        constants = self._pairs.get(key)
+        if constants is None:
+            e_hbO2_red, e_hb_red = self.coefficients(red_wavelength)
+            e_hbO2_nir, e_hb_nir = self.coefficients(nir_wavelength)
+            constants = PairConstants(red_wavelength, nir_wavelength, 100 * e_hb_red, 100 * e_hb_nir,
+                                      e_hb_red - e_hbO2_red, e_hbO2_nir - e_hb_nir)
+            self._pairs[key] = constants
+        return constants
+
+    def extinction_matrix(self, wavelengths) -> np.ndarray:
+        """
+        Returns the extinction matrix of a set of wavelengths.
+
+        Parameters:
+        - wavelengths (iterable of float): The wavelengths in nm.
+
+        Returns:
+        np.ndarray: One row per wavelength, with the HbO2 and Hb coefficients in its two columns.
+
+        Raises:
+        - ValueError: If one of the wavelengths is outside the tabulated range.
+        """
+
+        return np.array([self.coefficients(wavelength) for wavelength in wavelengths])
+
+    def pseudo_inverse(self, wavelengths) -> np.ndarray:
+        """
+        Returns the Moore-Penrose pseudo-inverse of the extinction matrix of a set of wavelengths, computed once.
+
+        Parameters:
+        - wavelengths (iterable of float): The wavelengths in nm, at least two.
+
+        Returns:
+        np.ndarray: The cached read-only pseudo-inverse, of shape (2, number of wavelengths).
+
+        Raises:
+        - ValueError: If there are less than two wavelengths or one is outside the tabulated range.
+        """
+
+        key = tuple(wavelengths)
+        pseudo_inverse = self._pseudo_inverses.get(key)
+        if pseudo_inverse is None:
+            if len(key) < 2:
+                raise ValueError("At least two wavelengths are required.")
+            pseudo_inverse = np.linalg.pinv(self.extinction_matrix(key))
+            pseudo_inverse.flags.writeable = False
+            self._pseudo_inverses[key] = pseudo_inverse
+        return pseudo_inverse
+
+
+# The registry used by default by the ScvO2 calculations
+DEFAULT_REGISTRY = ExtinctionRegistry(MOAVENI_SPECTRUM)
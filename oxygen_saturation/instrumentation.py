@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+
+# The stages instrumented across the pipeline
+STAGES = ("load", "aggregate", "absorbance", "solve", "filter", "detect")
+
+
+class _NullStage:
+    """
+    The context returned by Instrumentation.stage while disabled; it does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def add(self, rows: int = 0, bytes_read: int = 0):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+    The context returned by Instrumentation.stage while enabled; it times its body.
+    """
+
+    __slots__ = ("_instrumentation", "_name", "_rows", "_bytes_read", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str, rows: int, bytes_read: int):
+        self._instrumentation = instrumentation
+        self._name = name
+        self._rows = rows
+        self._bytes_read = bytes_read
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._instrumentation._record(self._name, self._start, time.perf_counter_ns(), self._rows, self._bytes_read)
+        return False
+
+    def add(self, rows: int = 0, bytes_read: int = 0):
+        """
+        Adds rows and bytes found while the stage runs, e.g. once a file is parsed.
+        """
+
+        self._rows += rows
+        self._bytes_read += bytes_read
+
+
+class Instrumentation:
+    """
+    Per-stage wall time, call count, rows processed and bytes read.
+
+    The pipeline functions wrap their work in stage() blocks. While the instrumentation is
+    disabled, which is the default, stage() returns a shared context that does nothing,
+    so the cost is one attribute check per call. While enabled, every block adds to the
+    counters of its stage and, if tracing, is also kept as a trace event.
+
+    Attributes:
+    - enabled (bool): True to record the stages.
+    - tracing (bool): True to also keep every block as a Chrome trace event.
+
+    Examples:
+    >>> instrumentation = Instrumentation()
+    >>> instrumentation.enable()
+    >>> with instrumentation.stage("absorbance", rows=1000):
+    ...     pass
+    >>> counters = instrumentation.as_dict()["absorbance"]
+    >>> counters["calls"], counters["rows"]
+    (1, 1000)
+    """
+
+    def __init__(self):
+        """
+        Constructs a new, disabled Instrumentation instance.
+        """
+
+        self.enabled = False
+        self.tracing = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, tracing: bool = False):
+        """
+        Starts recording the stages.
+
+        Parameters:
+        - tracing (bool): True to also keep every block as a trace event for to_chrome_trace.
+        """
+
+        self.tracing = tracing
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording the stages; the counters are kept.
+        """
+
+        self.enabled = False
+
+    def reset(self):
+        """
+        Clears the counters and the trace events.
+        """
+
+        with self._lock:
+            self._counters = {}
+            self._events = []
+            self._origin = time.perf_counter_ns()
+
+    def stage(self, name: str, rows: int = 0, bytes_read: int = 0):
+        """
+        Returns a context manager recording one execution of a stage.
+
+        Parameters:
+        - name (str): The name of the stage, e.g. one of STAGES.
+        - rows (int): The number of rows processed by this execution.
+        - bytes_read (int): The number of bytes read from disk by this execution.
+
+        Returns:
+        A context manager timing its body, or doing nothing while disabled. Its add(rows,
+        bytes_read) method counts rows and bytes only known inside the block.
+        """
+
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows, bytes_read)
+
+    def _record(self, name: str, start: int, stop: int, rows: int, bytes_read: int):
+        """
+        Adds one execution of a stage to its counters.
+        """
+
+        with self._lock:
+            counters = self._counters.get(name)
+            if counters is None:
+                counters = self._counters[name] = {"seconds": 0.0, "calls": 0, "rows": 0, "bytes_read": 0}
+            counters["seconds"] += (stop - start) / 1e9
+            counters["calls"] += 1
+            counters["rows"] += rows
+            counters["bytes_read"] += bytes_read
+
+            if self.tracing:
+                self._events.append((name, start, stop, threading.get_ident(), rows, bytes_read))
+
+    def as_dict(self) -> dict:
+        """
+        Returns the counters of every stage.
+
+        Returns:
+        dict: A dictionary mapping each stage name to its seconds, calls, rows and bytes_read.
+        """
+
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+    def to_prometheus(self, prefix: str = "oxygen_saturation_stage") -> str:
+        """
+        Returns the counters in the Prometheus text exposition format.
+
+        Parameters:
+        - prefix (str): The prefix of the metric names.
+
+        Returns:
+        str: One counter per metric and stage, labelled with the stage name.
+        """
+
+        counters = self.as_dict()
+        lines = []
+        for metric, help_text in (("seconds", "Wall time spent in the stage."),
+                                  ("calls", "Number of executions of the stage."),
+                                  ("rows", "Number of rows processed by the stage."),
+                                  ("bytes_read", "Number of bytes read by the stage.")):
+            name = f"{prefix}_{metric}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for stage, values in sorted(counters.items()):
+                lines.append(f'{name}{{stage="{stage}"}} {values[metric]}')
+        return "\n".join(lines) + "\n"
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Returns the traced blocks in the Chrome trace event format.
+
+        The result can be saved with json.dump and opened in chrome://tracing or Perfetto.
+        Only the blocks recorded while tracing are included.
+
+        Returns:
+        dict: A {"traceEvents": [...]} dictionary of complete ("X") events, in microseconds.
+        """
+
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            origin = self._origin
+
+        return {"traceEvents": [
+            {"name": name, "ph": "X", "ts": (start - origin) / 1e3, "dur": (stop - start) / 1e3,
+             "pid": pid, "tid": tid, "args": {"rows": rows, "bytes_read": bytes_read}}
+            for name, start, stop, tid, rows, bytes_read in events
+        ]}
+
+    def save_chrome_trace(self, file_path: str):
+        """
+        Writes the traced blocks to a Chrome trace JSON file.
+
+        Parameters:
+        - file_path (str): The path of the JSON file.
+        """
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+# The instrumentation used by the pipeline functions
+INSTRUMENTATION = Instrumentation()
+stage = INSTRUMENTATION.stage
@@ -0,0 +1,434 @@
+import numpy as np
+
+from .ring_buffer import DEFAULT_WINDOW_SIZE, DualChannelRingBuffer
+
+# Instruction clock of the dsPIC (Fosc / 2 with Fosc = 40MHz) and Timer2/Timer3 prescaler (T2CON = T3CON = 0x0020)
+INSTRUCTION_CLOCK_HZ = 40000000 / 2
+TIMER_PRESCALE = 64
+
+# PR2 = PR3 = 1250, i.e. a 4ms period: (1 / (40MHz / 2)) * 64 * 1250
+DEFAULT_PERIOD = 1250
+
+# Number of ADC reads averaged by _T2Interrupt/_T3Interrupt for each sample (oversampling_number)
+DEFAULT_OVERSAMPLING = 4
+
+# Full scale of the 12-bit ADC, and the mid-scale level the AC amplifier output sits on
+ADC_MAX = 4095
+ADC_MID = 2048
+
+
+class SimulatedADC:
+    """
+    A simulated photodiode front end and 12-bit ADC, read on AN0 (DC) and AN1 (AC).
+
+    The DC level of each LED drops with every heart beat by the perfusion index, and the
+    AC channel is the same pulsation amplified around mid-scale, as after the analog
+    bandpass. The Red perfusion is the IR perfusion times ratio, so that the firmware's
+    Ratio = (Red_AC / Red_DC) / (IR_AC / IR_DC) comes out at ratio. Every ADC read adds
+    Gaussian noise and is rounded and clipped to 0...ADC_MAX.
+
+    Attributes:
+    - heart_rate_bpm (float): The simulated pulse rate in beats per minute.
+    - red_dc (float): The Red DC level in ADC counts.
+    - ir_dc (float): The IR DC level in ADC counts.
+    - perfusion_index (float): The peak-to-peak IR pulsation relative to the IR DC level.
+    - ratio (float): The Red perfusion relative to the IR perfusion.
+    - ac_gain (float): The gain of the AC channel relative to the DC channel.
+    - noise (float): The standard deviation of the noise of one ADC read, in counts.
+    """
+
+    def __init__(self, heart_rate_bpm: float = 72.0, red_dc: float = 1500.0, ir_dc: float = 1800.0,
+                 perfusion_index: float = 0.02, ratio: float = 0.5, ac_gain: float = 20.0,
+                 noise: float = 2.0, seed: int = None):
+        """
+        Constructs a new SimulatedADC instance.
+
+        Parameters:
+        - heart_rate_bpm (float): The simulated pulse rate in beats per minute.
+        - red_dc (float): The Red DC level in ADC counts.
+        - ir_dc (float): The IR DC level in ADC counts.
+        - perfusion_index (float): The peak-to-peak IR pulsation relative to the IR DC level.
+        - ratio (float): The Red perfusion relative to the IR perfusion.
+        - ac_gain (float): The gain of the AC channel relative to the DC channel.
+        - noise (float): The standard deviation of the noise of one ADC read, in counts.
+        - seed (int, optional): The seed of the noise generator, for reproducible traces.
+
+        Raises:
+        - ValueError: If the heart rate is not positive or the noise is negative.
+        """
+
+        if heart_rate_bpm <= 0:
+            raise ValueError("The heart rate must be positive.")
+        if noise < 0:
+            raise ValueError("The noise cannot be negative.")
+
+        self.heart_rate_bpm = heart_rate_bpm
+        self.red_dc = red_dc
+        self.ir_dc = ir_dc
+        self.perfusion_index = perfusion_index
+        self.ratio = ratio
+        self.ac_gain = ac_gain
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+
+    def pulse(self, times) -> np.ndarray:
+        """
+        The normalized pulse waveform, between -0.5 and 0.5, at the given times.
+
+        Parameters:
+        - times (array_like): The times in seconds.
+
+        Returns:
+        np.ndarray: A fundamental and a dicrotic second harmonic at the heart rate.
+        """
+
+        phase = 2 * np.pi * self.heart_rate_bpm / 60 * np.asarray(times, dtype=float)
+        return 0.4 * np.sin(phase) + 0.15 * np.sin(2 * phase - 1.0)
+
+    def read(self, led: str, times, oversampling_number: int = DEFAULT_OVERSAMPLING) -> tuple:
+        """
+        Acquires the DC (AN0) and AC (AN1) channels of one LED at the given times.
+
+        Like the timer interrupts, oversampling_number reads of each channel are summed
+        and divided with an integer division.
+
+        Parameters:
+        - led (str): 'red' or 'ir'.
+        - times (array_like): The time of each sample in seconds.
+        - oversampling_number (int): The number of ADC reads averaged for each sample.
+
+        Returns:
+        tuple: The DC samples and the AC samples, as integer arrays of ADC counts.
+
+        Raises:
+        - ValueError: If the LED is unknown or oversampling_number is not positive.
+        """
+
+        if led not in ("red", "ir"):
+            raise ValueError(f"Unknown LED '{led}', expected 'red' or 'ir'.")
+        if oversampling_number < 1:
+            raise ValueError("The oversampling number must be positive.")
+
+        dc = self.red_dc if led == "red" else self.ir_dc
+        perfusion = self.perfusion_index * (self.ratio if led == "red" else 1.0)
+
+        # More blood during the systole means less light on the photodiode
+        swing = dc * perfusion * self.pulse(times)
+        dc_level = dc - swing
+        ac_level = ADC_MID - self.ac_gain * swing
+
+        return self._convert(dc_level, oversampling_number), self._convert(ac_level, oversampling_number)
+
+    def _convert(self, level: np.ndarray, oversampling_number: int) -> np.ndarray:
+        """
+        Averages oversampling_number noisy 12-bit conversions of each level.
+        """
+
+        reads = level[:, np.newaxis] + self._rng.normal(0.0, self.noise, (level.size, oversampling_number))
+        reads = np.clip(np.rint(reads), 0, ADC_MAX).astype(np.int64)
+        return reads.sum(axis=1) // oversampling_number
+
+
+class InterruptDrivenLED:
+    """
+    A class that implements an interrupt-driven method using DSC timers and output compare modules
+    to control the timing of separate LED sequences.
+
+    Without the hardware, the timers and the ADC are simulated: run() advances a simulated
+    clock, fires the timer interrupts of the running sequences at their PR2/PR3 period and
+    hands the oversampled samples to the main loop through three ring buffers of Red/IR
+    pairs: the DC channel, the AC channel and the time of each sample. Like the main loop
+    waiting for both RedReady and IRReady, the k-th Red sample is paired with the k-th IR
+    sample, counting from setup_interrupts; the samples of the LED that is ahead wait for
+    their pair, the last buffer_size at most. The three buffers are written together, so
+    the consumer should read and advance them together, between runs.
+
+    A pair is dropped, and counted in the dropped attribute of every buffer, when the
+    buffers are full or when the sample of the LED that is ahead was discarded while it
+    waited, e.g. when only one sequence runs or PR2 and PR3 differ. The sample of the other
+    LED is then discarded too when it comes, so the next pairs stay aligned. The
+    simulation is vectorized, so it runs much faster than real time.
+
+    Attributes:
+    - ir_led_timer (int): The timer number for the IR LED sequence.
+    - red_led_timer (int): The timer number for the red LED sequence.
+    - ir_led_oc (int): The output compare module number for the IR LED sequence.
+    - red_led_oc (int): The output compare module number for the red LED sequence.
+    - periods (dict): The period register (PR2, PR3) of each timer number.
+    - oversampling_number (int): The number of ADC reads averaged for each sample.
+    - adc (SimulatedADC): The simulated front end and ADC.
+    - dc_buffer (DualChannelRingBuffer): The CH0_ADRES_Red/CH0_ADRES_IR pairs, created by setup_interrupts.
+    - ac_buffer (DualChannelRingBuffer): The CH1_ADRES_Red/CH1_ADRES_IR pairs, created by setup_interrupts.
+    - time_buffer (DualChannelRingBuffer): The time in seconds of the Red and IR samples of
+      each pair, created by setup_interrupts.
+    - time (float): The current time of the simulated clock in seconds.
+
+    Examples:
+    >>> led_controller = InterruptDrivenLED(2, 3, 1, 2, adc=SimulatedADC(seed=0))
+    >>> led_controller.setup_interrupts()
+    >>> led_controller.start_ir_led_sequence()
+    >>> led_controller.start_red_led_sequence()
+    >>> led_controller.run(1.0)
+    {'ir': 250, 'red': 250}
+    >>> led_controller.dc_buffer.available, led_controller.ac_buffer.available
+    (250, 250)
+    >>> led_controller.dc_buffer.peek(250).shape
+    (250, 2)
+    >>> led_controller.time_buffer.peek(250)[[0, -1]]
+    array([[0.004, 0.004],
+           [1.   , 1.   ]])
+    """
+
+    def __init__(self, ir_led_timer: int, red_led_timer: int, ir_led_oc: int, red_led_oc: int,
+                 pr2: int = DEFAULT_PERIOD, pr3: int = DEFAULT_PERIOD,
+                 oversampling_number: int = DEFAULT_OVERSAMPLING, adc: SimulatedADC = None,
+                 buffer_size: int = 4096):
+        """
+        Constructs a new InterruptDrivenLED instance.
+
+        Parameters:
+        - ir_led_timer (int): The timer number for the IR LED sequence.
+        - red_led_timer (int): The timer number for the red LED sequence.
+        - ir_led_oc (int): The output compare module number for the IR LED sequence.
+        - red_led_oc (int): The output compare module number for the red LED sequence.
+        - pr2 (int): The period register of Timer2, in prescaled timer ticks.
+        - pr3 (int): The period register of Timer3, in prescaled timer ticks.
+        - oversampling_number (int): The number of ADC reads averaged for each sample.
+        - adc (SimulatedADC, optional): The simulated front end, a default one if None.
+        - buffer_size (int): The number of Red/IR pairs each ring buffer can hold.
+        """
+
+        self.ir_led_timer = ir_led_timer
+        self.red_led_timer = red_led_timer
+        self.ir_led_oc = ir_led_oc
+        self.red_led_oc = red_led_oc
+        self.periods = {2: pr2, 3: pr3}
+        self.oversampling_number = oversampling_number
+        self.adc = adc if adc is not None else SimulatedADC()
+        self.buffer_size = buffer_size
+
+        self.dc_buffer = None
+        self.ac_buffer = None
+        self.time_buffer = None
+        self.time = 0.0
+
+        # Simulated timer state of each LED: period in seconds, running flag and interrupts fired
+        self._sample_period = {}
+        self._running = {"ir": False, "red": False}
+        self._ticks = {"ir": 0, "red": 0}
+        self._start_time = {"ir": 0.0, "red": 0.0}
+
+    def setup_interrupts(self):
+        """
+        Sets up the interrupts and timers for the LED sequences.
+
+        This function configures the DSC timers (Timer2 and Timer3) and the output compare modules
+        (OC1 and OC2) to control the timing of the IR LED and red LED sequences.
+
+        Raises:
+        - ValueError: If any of the timer or output compare module numbers are invalid.
+        """
+
+        # Check if the timer and output compare module numbers are valid
+        if self.ir_led_timer not in [2, 3] or self.red_led_timer not in [2, 3] or \
+                self.ir_led_oc not in [1, 2] or self.red_led_oc not in [1, 2]:
+            raise ValueError("Invalid timer or output compare module number.")
+        if any(period < 1 for period in self.periods.values()) or self.oversampling_number < 1:
+            raise ValueError("The timer periods and the oversampling number must be positive.")
+
+        # Configure Timer2 for IR LED sequence: (1 / (Fosc / 2)) * 64 * PR2
+        self._sample_period["ir"] = TIMER_PRESCALE * self.periods[self.ir_led_timer] / INSTRUCTION_CLOCK_HZ
+
+        # Configure Timer3 for red LED sequence: (1 / (Fosc / 2)) * 64 * PR3
+        self._sample_period["red"] = TIMER_PRESCALE * self.periods[self.red_led_timer] / INSTRUCTION_CLOCK_HZ
+
+        # Configure OC1 and OC2, with the buffers handing the Red/IR pairs of each channel to the main loop
+        window_size = min(DEFAULT_WINDOW_SIZE, self.buffer_size)
+        self.dc_buffer = DualChannelRingBuffer(self.buffer_size, window_size, dtype=np.int16)
+        self.ac_buffer = DualChannelRingBuffer(self.buffer_size, window_size, dtype=np.int16)
+        self.time_buffer = DualChannelRingBuffer(self.buffer_size, window_size)
+
+        # Time, DC and AC of the samples of each LED still waiting for the sample of the other
+        # LED, and the number of samples of each LED acquired so far, i.e. the pair index
+        # following the last pending sample
+        self._pending = {led: np.empty((3, 0)) for led in ("ir", "red")}
+        self._count = {"ir": 0, "red": 0}
+
+    def start_ir_led_sequence(self):
+        """
+        Starts the IR LED sequence.
+
+        This function triggers the start of the IR LED sequence by enabling the corresponding
+        timer and output compare module.
+
+        Raises:
+        - ValueError: If the IR LED timer or output compare module numbers are invalid.
+        """
+
+        # Check if the IR LED timer and output compare module numbers are valid
+        if self.ir_led_timer not in [2, 3] or self.ir_led_oc not in [1, 2]:
+            raise ValueError("Invalid IR LED timer or output compare module number.")
+
+        # Enable Timer2 for IR LED sequence, and OC1 for IR LED sequence
+        self._start("ir")
+
+    def start_red_led_sequence(self):
+        """
+        Starts the red LED sequence.
+
+        This function triggers the start of the red LED sequence by enabling the corresponding
+        timer and output compare module.
+
+        Raises:
+        - ValueError: If the red LED timer or output compare module numbers are invalid.
+        """
+
+        # Check if the red LED timer and output compare module numbers are valid
+        if self.red_led_timer not in [2, 3] or self.red_led_oc not in [1, 2]:
+            raise ValueError("Invalid red LED timer or output compare module number.")
+
+        # Enable Timer3 for red LED sequence, and OC2 for red LED sequence
+        self._start("red")
+
+    def stop_ir_led_sequence(self):
+        """
+        Stops the IR LED sequence.
+
+        This function stops the IR LED sequence by disabling the corresponding timer and output compare module.
+        """
+
+        # Disable Timer2 and OC1 for IR LED sequence
+        self._running["ir"] = False
+
+    def stop_red_led_sequence(self):
+        """
+        Stops the red LED sequence.
+
+        This function stops the red LED sequence by disabling the corresponding timer and output compare module.
+        """
+
+        # Disable Timer3 and OC2 for red LED sequence
+        self._running["red"] = False
+
+    def run(self, duration: float, block_size: int = 65536) -> dict:
+        """
+        Advances the simulated clock and acquires the samples of the running sequences.
+
+        Every timer interrupt in (time, time + duration] gives one sample of the DC and AC
+        channels of its LED, acquired at the time of the interrupt. Both LEDs advance
+        block_size interrupts at a time and their samples are written to the buffers as
+        soon as they are paired, so the memory used does not grow with the duration.
+
+        Parameters:
+        - duration (float): The simulated time to advance, in seconds.
+        - block_size (int): The maximum number of samples generated at once per LED.
+
+        Returns:
+        dict: The number of samples acquired for 'ir' and 'red'.
+
+        Raises:
+        - RuntimeError: If setup_interrupts has not been called.
+        - ValueError: If the duration is negative.
+        """
+
+        if not self._sample_period:
+            raise RuntimeError("setup_interrupts must be called before run.")
+        if duration < 0:
+            raise ValueError("The duration cannot be negative.")
+
+        end_time = self.time + duration
+        acquired = {"ir": 0, "red": 0}
+
+        # Interrupts fire at the end of each period; the small margin absorbs rounding errors
+        last_ticks = {
+            led: int((end_time - self._start_time[led]) / self._sample_period[led] + 1e-9)
+            for led in ("ir", "red") if self._running[led]
+        }
+
+        while any(self._ticks[led] < last_tick for led, last_tick in last_ticks.items()):
+            for led, last_tick in last_ticks.items():
+                if self._ticks[led] >= last_tick:
+                    continue
+
+                ticks = np.arange(self._ticks[led] + 1, min(last_tick, self._ticks[led] + block_size) + 1)
+                times = self._start_time[led] + ticks * self._sample_period[led]
+                dc, ac = self.adc.read(led, times, self.oversampling_number)
+                self._pending[led] = np.concatenate((self._pending[led], np.stack((times, dc, ac))), axis=1)
+
+                self._ticks[led] = int(ticks[-1])
+                self._count[led] += ticks.size
+                acquired[led] += ticks.size
+
+            self._write_pairs()
+
+        self.time = end_time
+        return acquired
+
+    def _write_pairs(self):
+        """
+        Writes the Red/IR pairs completed so far to the DC, AC and time buffers.
+        """
+
+        # The pair index of the first pending sample of each LED
+        first = {led: self._count[led] - self._pending[led].shape[1] for led in ("red", "ir")}
+
+        # The samples whose pair was discarded earlier cannot be paired any more
+        start = max(first.values())
+        red = self._pending["red"][:, start - first["red"]:]
+        ir = self._pending["ir"][:, start - first["ir"]:]
+
+        n = min(red.shape[1], ir.shape[1])
+        if n:
+            self.dc_buffer.write(red[1, :n], ir[1, :n])
+            self.ac_buffer.write(red[2, :n], ir[2, :n])
+            self.time_buffer.write(red[0, :n], ir[0, :n])
+
+        # Only the samples of the LED that is ahead are left, the last buffer_size at most;
+        # the pairs of the older ones are lost
+        self._pending = {}
+        for led, pending in (("red", red[:, n:]), ("ir", ir[:, n:])):
+            discarded = max(0, pending.shape[1] - self.buffer_size)
+            for buffer in (self.dc_buffer, self.ac_buffer, self.time_buffer):
+                buffer.dropped += discarded
+            self._pending[led] = pending[:, discarded:]
+
+    def _start(self, led: str):
+        """
+        Starts the timer of one LED at the current simulated time.
+        """
+
+        if not self._running[led]:
+            self._running[led] = True
+            self._ticks[led] = 0
+            self._start_time[led] = self.time
+
+
+if __name__ == "__main__":
+    # Example usage of the InterruptDrivenLED class:
+
+    # Create an instance of InterruptDrivenLED with timer and output compare module numbers
+    led_controller = InterruptDrivenLED(ir_led_timer=2, red_led_timer=3, ir_led_oc=1, red_led_oc=2)
+
+    # Set up the interrupts and timers for the LED sequences
+    led_controller.setup_interrupts()
+
+    # Start the IR LED sequence
+    led_controller.start_ir_led_sequence()
+
+    # Start the red LED sequence
+    led_controller.start_red_led_sequence()
+
+    # Acquire one minute of samples, much faster than real time, reading the pairs every second
+    pairs = 0
+    for _ in range(60):
+        led_controller.run(1.0)
+        for buffer in (led_controller.dc_buffer, led_controller.ac_buffer, led_controller.time_buffer):
+            for window in buffer.windows():
+                pairs += window.shape[0] if buffer is led_controller.ac_buffer else 0
+    print(f"Read {pairs} Red/IR pairs, {led_controller.ac_buffer.dropped} dropped.")
+
+    # Stop the IR LED sequence
+    led_controller.stop_ir_led_sequence()
+
+    # Stop the red LED sequence
+    led_controller.stop_red_led_sequence()
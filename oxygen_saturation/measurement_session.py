@@ -0,0 +1,294 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .calculate_scvo2 import calculate_scvo2_from_absorbance
+from .extinction import DEFAULT_REGISTRY, ExtinctionRegistry
+
+# Fraction of the absorbances discarded at each end before averaging
+DEFAULT_TRIM = 0.1
+
+
+class SessionResult(NamedTuple):
+    """
+    The ScvO2 of a measurement session, or of every set of score_measurement_sets.
+
+    Attributes:
+    - scvo2 (float or np.ndarray): The ScvO2 in percent, from the robust means of the absorbances.
+    - A_red (float or np.ndarray): The robust mean of the red absorbances.
+    - A_nir (float or np.ndarray): The robust mean of the NIR absorbances.
+    - n_red (int or np.ndarray): The number of valid red readings averaged.
+    - n_nir (int or np.ndarray): The number of valid NIR readings averaged.
+    - rejected (int or np.ndarray): The number of readings without an absorbance (zero or
+      negative measurements), left out of the means.
+    """
+
+    scvo2: float
+    A_red: float
+    A_nir: float
+    n_red: int
+    n_nir: int
+    rejected: int
+
+
+def robust_mean(values, trim: float = DEFAULT_TRIM, axis: int = -1):
+    """
+    Calculates the trimmed mean of values along an axis, ignoring NaN.
+
+    The floor(trim * n) smallest and largest of the n valid values are discarded before
+    averaging, so that a few outlying readings do not move the result.
+
+    Parameters:
+    - values (array_like): The values.
+    - trim (float): The fraction discarded at each end, from 0 (plain mean) to below 0.5.
+    - axis (int): The axis to average.
+
+    Returns:
+    float or np.ndarray: The trimmed mean, NaN where there is no valid value.
+
+    Raises:
+    - ValueError: If trim is not in [0, 0.5).
+
+    Examples:
+    >>> float(robust_mean([1.0, 1.1, 0.9, 1.0, 1.2, 0.8, 1.0, 1.1, 0.9, 25.0]))
+    1.025
+    >>> robust_mean([[1.0, 2.0, np.nan], [np.nan, np.nan, np.nan]], trim=0)
+    array([1.5, nan])
+    """
+
+    if not 0 <= trim < 0.5:
+        raise ValueError("The trimmed fraction must be in [0, 0.5).")
+
+    # Sorting moves the NaN to the end, so the valid values are the first n of each row
+    ordered = np.sort(np.moveaxis(np.asarray(values, dtype=float), axis, -1), axis=-1)
+    n = np.count_nonzero(~np.isnan(ordered), axis=-1)
+    cut = np.floor(trim * n).astype(int)
+
+    position = np.arange(ordered.shape[-1])
+    kept = (position >= cut[..., None]) & (position < (n - cut)[..., None])
+    with np.errstate(invalid='ignore'):
+        result = np.where(kept, ordered, 0.0).sum(axis=-1) / np.count_nonzero(kept, axis=-1)
+
+    return result[()]
+
+
+def _as_array(values) -> np.ndarray:
+    """
+    Converts readings to a float array, including from generators and other iterators.
+    """
+
+    if np.ndim(values) == 0 and hasattr(values, "__iter__") and not isinstance(values, (str, bytes)):
+        return np.fromiter(values, dtype=float)
+    return np.asarray(values, dtype=float)
+
+
+class MeasurementSession:
+    """
+    Accumulates red and NIR air/sample readings and calculates ScvO2 from all of them.
+
+    This is the non-interactive version of cal.calculate: readings are added as scalars,
+    arrays or iterables, every absorbance log10(air / sample) is kept, and the ScvO2 is
+    calculated from the robust means of the red and NIR absorbances.
+
+    Examples:
+    >>> session = MeasurementSession(nir_wavelength=810)
+    >>> session.add_red(14.5, [5.9, 6.0, 5.8])
+    3
+    >>> session.add_nir(11.9, iter([6.5, 6.4, 0.0]))
+    2
+    >>> result = session.result()
+    >>> round(result.scvo2, 2), result.n_red, result.n_nir, result.rejected
+    (66.93, 3, 2, 1)
+    """
+
+    def __init__(self, red_wavelength: float = 660, nir_wavelength: float = 810, trim: float = DEFAULT_TRIM,
+                 registry: ExtinctionRegistry = DEFAULT_REGISTRY):
+        """
+        Constructs a new, empty MeasurementSession instance.
+
+        Parameters:
+        - red_wavelength (float): The wavelength of the red LED in nm.
+        - nir_wavelength (float): The wavelength of the NIR LED in nm.
+        - trim (float): The fraction of the absorbances discarded at each end; see robust_mean.
+        - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+        Raises:
+        - ValueError: If one of the wavelengths has no extinction coefficients.
+        """
+
+        # Failing now rather than when the first result is requested
+        registry.pair(red_wavelength, nir_wavelength)
+
+        self.red_wavelength = red_wavelength
+        self.nir_wavelength = nir_wavelength
+        self.trim = trim
+        self.registry = registry
+        self.reset()
+
+    def reset(self):
+        """
+        Discards all the readings.
+        """
+
+        self._red = []
+        self._nir = []
+        self._rejected = 0
+
+    def share_red(self, nir_wavelength: float) -> "MeasurementSession":
+        """
+        Returns an empty session for another NIR wavelength that shares the red readings of this one.
+
+        Red readings added to either session are used by both, so that they are entered once.
+        A rejected reading is only counted by the session it was added to, so the rejected
+        counts of the two sessions add up. After a reset, a session no longer shares its red readings.
+
+        Parameters:
+        - nir_wavelength (float): The wavelength of the NIR LED of the new session in nm.
+
+        Returns:
+        MeasurementSession: The new session, with the red wavelength, trim and registry of this one.
+
+        Raises:
+        - ValueError: If the NIR wavelength has no extinction coefficients.
+
+        Examples:
+        >>> session_810 = MeasurementSession(nir_wavelength=810)
+        >>> session_940 = session_810.share_red(940)
+        >>> session_810.add_red(14.5, [5.9, 0.0])
+        1
+        >>> _ = session_810.add_nir(11.9, 6.5), session_940.add_nir(8.5, 3.4)
+        >>> [(session.result().n_red, session.result().rejected) for session in (session_810, session_940)]
+        [(1, 1), (1, 0)]
+        """
+
+        session = MeasurementSession(self.red_wavelength, nir_wavelength, self.trim, self.registry)
+        session._red = self._red
+        return session
+
+    def _add(self, absorbances: list, air, sample) -> int:
+        """
+        Appends the valid absorbances of readings and returns how many there are.
+        """
+
+        result = calculate_log10_ratio_array(_as_array(air), _as_array(sample))
+        values = np.ravel(result.values)
+        valid = values[~np.isnan(values)]
+
+        self._rejected += values.size - valid.size
+        if valid.size:
+            absorbances.append(valid)
+        return valid.size
+
+    def add_red(self, air, sample) -> int:
+        """
+        Adds readings of the red LED.
+
+        Parameters:
+        - air (float or array_like): The optical power measured in air, broadcast against sample.
+        - sample (float, array_like or iterable): The optical powers measured in the sample.
+
+        Returns:
+        int: The number of readings added; readings without an absorbance are rejected.
+        """
+
+        return self._add(self._red, air, sample)
+
+    def add_nir(self, air, sample) -> int:
+        """
+        Adds readings of the NIR LED.
+
+        Parameters:
+        - air (float or array_like): The optical power measured in air, broadcast against sample.
+        - sample (float, array_like or iterable): The optical powers measured in the sample.
+
+        Returns:
+        int: The number of readings added; readings without an absorbance are rejected.
+        """
+
+        return self._add(self._nir, air, sample)
+
+    @property
+    def A_red_list(self) -> np.ndarray:
+        """
+        np.ndarray: Every red absorbance added, in order.
+        """
+
+        return np.concatenate(self._red) if self._red else np.empty(0)
+
+    @property
+    def A_nir_list(self) -> np.ndarray:
+        """
+        np.ndarray: Every NIR absorbance added, in order.
+        """
+
+        return np.concatenate(self._nir) if self._nir else np.empty(0)
+
+    def result(self) -> SessionResult:
+        """
+        Calculates ScvO2 from all the readings added so far.
+
+        Returns:
+        SessionResult: The ScvO2 and the robust mean absorbances.
+
+        Raises:
+        - ValueError: If there is no valid red or no valid NIR reading.
+        """
+
+        if not (self._red and self._nir):
+            raise ValueError("At least one set of data in red and one in NIR is required.")
+
+        A_red = self.A_red_list
+        A_nir = self.A_nir_list
+        mean_red = float(robust_mean(A_red, self.trim))
+        mean_nir = float(robust_mean(A_nir, self.trim))
+        scvo2 = float(calculate_scvo2_from_absorbance(mean_red, mean_nir, self.red_wavelength, self.nir_wavelength,
+                                                      self.registry))
+
+        return SessionResult(scvo2, mean_red, mean_nir, A_red.size, A_nir.size, self._rejected)
+
+
+def score_measurement_sets(red_air, red_sample, nir_air, nir_sample, red_wavelength: float = 660,
+                           nir_wavelength: float = 810, trim: float = DEFAULT_TRIM,
+                           registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> SessionResult:
+    """
+    Calculates the ScvO2 of many measurement sets at once, like one MeasurementSession per set.
+
+    The readings of each set are along the last axis; sets with fewer readings are padded
+    with NaN. The air measurements are broadcast against the samples, e.g. one value per set
+    with shape (n_sets, 1).
+
+    Parameters:
+    - red_air (array_like): The optical powers measured in air with the red LED.
+    - red_sample (array_like): The optical powers measured in the samples with the red LED.
+    - nir_air (array_like): The optical powers measured in air with the NIR LED.
+    - nir_sample (array_like): The optical powers measured in the samples with the NIR LED.
+    - red_wavelength (float): The wavelength of the red LED in nm.
+    - nir_wavelength (float): The wavelength of the NIR LED in nm.
+    - trim (float): The fraction of the absorbances discarded at each end; see robust_mean.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    SessionResult: One array per field with a value per set. The ScvO2 of a set without
+    valid red or NIR readings is NaN.
+
+    Examples:
+    >>> result = score_measurement_sets(14.5, [[5.9, 6.0], [5.5, np.nan]], 11.9, [[6.5, 6.4], [6.2, 6.3]])
+    >>> result.scvo2.round(2), result.n_red
+    (array([67.35, 65.8 ]), array([2, 1]))
+    """
+
+    A_red = calculate_log10_ratio_array(red_air, red_sample)
+    A_nir = calculate_log10_ratio_array(nir_air, nir_sample)
+
+    # The NaN padding is not a rejected reading, unlike the zero and negative measurements
+    rejected = (np.count_nonzero(A_red.invalid & ~np.isnan(np.broadcast_to(red_sample, A_red.values.shape)), axis=-1) +
+                np.count_nonzero(A_nir.invalid & ~np.isnan(np.broadcast_to(nir_sample, A_nir.values.shape)), axis=-1))
+
+    mean_red = robust_mean(A_red.values, trim)
+    mean_nir = robust_mean(A_nir.values, trim)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scvo2 = calculate_scvo2_from_absorbance(mean_red, mean_nir, red_wavelength, nir_wavelength, registry)
+
+    return SessionResult(scvo2, mean_red, mean_nir, np.count_nonzero(~np.isnan(A_red.values), axis=-1),
+                         np.count_nonzero(~np.isnan(A_nir.values), axis=-1), rejected)
@@ -0,0 +1,474 @@
+import heapq
+import math
+from collections import deque
+from statistics import median
+
+import numpy as np
+from .instrumentation import stage
+
+def calculate_average_median(*values):
+    """
+    Calculates the average and median of a given set of values.
+
+    This function takes multiple values as input and calculates their average
+    and median. The average is calculated by summing all the values and dividing
+    by the total count. The median is the middle value of the sorted list of values.
+
+    Parameters:
+    - *values: Variable number of input values.
+
+    Returns:
+    tuple: A tuple containing the average and median of the input values.
+
+    Raises:
+    - ValueError: If no values are provided.
+
+    Examples:
+    >>> calculate_average_median(1, 2, 3, 4, 5)
+    (3.0, 3)
+    >>> calculate_average_median(10, 20, 30, 40, 50, 60)
+    (35.0, 35)
+    >>> calculate_average_median(2)
+    (2.0, 2)
+    """
+
+    # Checking if any values are provided
+    if len(values) == 0:
+        raise ValueError("No values provided.")
+
+    # Calculating the average
+    average = sum(values) / len(values)
+
+    # Calculating the median
+    median_value = median(values)
+
+    # Returning the average and median as a tuple
+    return average, median_value
+
+# Values kept per level of the median sketch; the median is exact up to this many values
+DEFAULT_SKETCH_CAPACITY = 4096
+
+
+class StreamingAggregator:
+    """
+    Running count, mean, variance and median of an unbounded stream of values.
+
+    The mean and variance are updated with Welford's algorithm, merged chunk by chunk.
+    The median is estimated with a compactor sketch (Karnin, Lang and Liberty, 2016):
+    level h holds values that each stand for 2**h values of the stream, and a level that
+    grows beyond capacity values is sorted and every other value is promoted to the next
+    level. Every step works on whole NumPy arrays, so a chunk costs one sort instead of a
+    Python loop per value, and the memory used stays O(capacity * log(count / capacity)).
+    The median is exact up to capacity values; afterwards, its rank error is a small
+    fraction of count, about log2(count / capacity) / capacity.
+
+    Two aggregators of different streams can be combined with merge, e.g. the results of
+    several processes.
+
+    Attributes:
+    - count (int): The number of values consumed so far.
+    - minimum (float): The smallest value consumed so far.
+    - maximum (float): The largest value consumed so far.
+    - capacity (int): The number of values kept per level of the median sketch.
+
+    Examples:
+    >>> aggregator = StreamingAggregator(capacity=64)
+    >>> aggregator.update(np.arange(1001.0))
+    >>> aggregator.count, aggregator.mean, abs(aggregator.median - 500) <= 1001 * 0.05
+    (1001, 500.0, True)
+    >>> aggregator.update([])
+    >>> StreamingAggregator().update([1.0, float('nan')])
+    Traceback (most recent call last):
+    ...
+    ValueError: Values cannot be NaN.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SKETCH_CAPACITY):
+        """
+        Constructs a new, empty StreamingAggregator instance.
+
+        Parameters:
+        - capacity (int): The number of values kept per level of the median sketch.
+
+        Raises:
+        - ValueError: If the capacity is less than 2.
+        """
+
+        if capacity < 2:
+            raise ValueError("The sketch capacity must be at least 2.")
+
+        self.capacity = capacity
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # Median sketch: the values of level h, and how many times each level was compacted
+        self._levels = []
+        self._compactions = []
+
+    def update(self, values):
+        """
+        Consumes a chunk of values.
+
+        Parameters:
+        - values (float or array_like): A single value or a chunk of values.
+
+        Raises:
+        - ValueError: If the chunk contains NaN.
+        """
+
+        chunk = np.asarray(values, dtype=float).ravel()
+        if chunk.size == 0:
+            return
+        if np.isnan(chunk).any():
+            raise ValueError("Values cannot be NaN.")
+
+        with stage("aggregate", rows=chunk.size):
+            chunk_mean = float(chunk.mean())
+            self._merge_moments(chunk.size, chunk_mean, float(((chunk - chunk_mean) ** 2).sum()),
+                                float(chunk.min()), float(chunk.max()))
+            self._add(0, chunk)
+
+    def merge(self, other: "StreamingAggregator"):
+        """
+        Adds the values consumed by another aggregator, as if they had been consumed by this one.
+
+        Parameters:
+        - other (StreamingAggregator): The other aggregator, left unchanged.
+        """
+
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other._mean, other._m2, other.minimum, other.maximum)
+        for level, values in enumerate(other._levels):
+            self._add(level, values)
+
+    def _merge_moments(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        """
+        Merges the count, mean, variance and extremes of other values (Chan et al.).
+        """
+
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def _add(self, level: int, values: np.ndarray):
+        """
+        Adds values to a level of the median sketch, compacting the full levels.
+        """
+
+        levels = self._levels
+        while values.size:
+            if level == len(levels):
+                levels.append(np.empty(0))
+                self._compactions.append(0)
+
+            items = np.concatenate((levels[level], values))
+            if items.size <= self.capacity:
+                levels[level] = items
+                return
+
+            # The odd value out stays; every other one of the others moves up with twice the
+            # weight, starting alternately from the first and the second to avoid a bias
+            items.sort()
+            odd = items.size % 2
+            offset = self._compactions[level] % 2
+            self._compactions[level] += 1
+            levels[level] = items[items.size - odd:].copy()
+            values = items[offset:items.size - odd:2]
+            level += 1
+
+    @property
+    def mean(self) -> float:
+        """
+        float: The mean of the values consumed so far.
+        """
+
+        if self.count == 0:
+            raise ValueError("No values provided.")
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """
+        float: The sample variance of the values consumed so far (0 for a single value).
+        """
+
+        if self.count == 0:
+            raise ValueError("No values provided.")
+        if self.count == 1:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    @property
+    def median(self) -> float:
+        """
+        float: The median of the values consumed so far, estimated after capacity values.
+        """
+
+        if self.count == 0:
+            raise ValueError("No values provided.")
+        if len(self._levels) == 1:
+            return float(np.median(self._levels[0]))
+
+        # Weighted median of the sketch: the first value reaching half of the total weight
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(items.size, 2.0 ** level) for level, items in enumerate(self._levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        return float(values[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+    def summary(self) -> tuple:
+        """
+        Returns the current statistics of the stream.
+
+        Returns:
+        tuple: A tuple containing the count, the mean and the median of the values.
+
+        Raises:
+        - ValueError: If no values have been consumed yet.
+        """
+
+        return self.count, self.mean, self.median
+
+
+class ChannelAggregators:
+    """
+    One StreamingAggregator per channel, e.g. per air/sample column and wavelength.
+
+    Examples:
+    >>> channels = ChannelAggregators()
+    >>> channels.update({'air_660': [14.52, 14.66], 'Sam1_660': [5.908]})
+    >>> channels.update({'air_660': [13.96]})
+    >>> channels.summary()['air_660']
+    (3, 14.38, 14.52)
+    """
+
+    def __init__(self, channels=()):
+        """
+        Constructs a new ChannelAggregators instance.
+
+        Parameters:
+        - channels (iterable of str): Channels to create up front. Other channels are
+          created the first time they receive values.
+        """
+
+        self._aggregators = {channel: StreamingAggregator() for channel in channels}
+
+    def __getitem__(self, channel: str) -> StreamingAggregator:
+        return self._aggregators[channel]
+
+    def __contains__(self, channel: str) -> bool:
+        return channel in self._aggregators
+
+    def update(self, chunks: dict):
+        """
+        Consumes a chunk of values for each of the given channels.
+
+        Parameters:
+        - chunks (dict): A dictionary mapping each channel name to a chunk of values.
+        """
+
+        for channel, values in chunks.items():
+            if channel not in self._aggregators:
+                self._aggregators[channel] = StreamingAggregator()
+            self._aggregators[channel].update(values)
+
+    def summary(self) -> dict:
+        """
+        Returns the current statistics of every channel that has received values.
+
+        Returns:
+        dict: A dictionary mapping each channel name to its (count, mean, median) tuple.
+        """
+
+        return {channel: aggregator.summary() for channel, aggregator in self._aggregators.items() if aggregator.count}
+
+
+class RollingMedian:
+    """
+    The exact median of the last window values of a stream.
+
+    The window is kept in arrival order, to know which value leaves, and split in two
+    heaps: the smaller half in a max-heap and the larger half in a min-heap, so that the
+    median is at their tops. A value leaving the window is not searched for: it is only
+    counted out of its half, and popped once it reaches the top of its heap. Each heap
+    entry holds the position of the value in the stream, which tells whether it has left,
+    and the heaps are rebuilt when the entries that left outnumber the window, so an
+    update costs O(log window) amortized. NaN values are skipped.
+
+    Attributes:
+    - window (int): The number of values the median is taken over.
+
+    Examples:
+    >>> rolling = RollingMedian(3)
+    >>> rolling.extend([5.0, 1.0, 4.0, 2.0, float('nan'), 8.0])
+    array([5., 3., 4., 2., 2., 4.])
+    """
+
+    def __init__(self, window: int):
+        """
+        Constructs a new, empty RollingMedian instance.
+
+        Parameters:
+        - window (int): The number of values the median is taken over.
+
+        Raises:
+        - ValueError: If the window is not positive.
+        """
+
+        if window < 1:
+            raise ValueError("The window length must be positive.")
+
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """
+        Discards all the values.
+        """
+
+        self._values = deque()
+        # The smaller half as (-value, -position), the larger half as (value, position),
+        # and the number of entries of each still in the window
+        self._low = []
+        self._high = []
+        self._n_low = 0
+        self._n_high = 0
+        # The number of values pushed, i.e. the position of the next one
+        self._count = 0
+
+    def __len__(self) -> int:
+        """
+        The number of values in the window, at most window.
+        """
+
+        return len(self._values)
+
+    def push(self, value: float) -> float:
+        """
+        Adds a value, removing the oldest one if the window is full.
+
+        Returns:
+        float: The median of the window.
+        """
+
+        if value == value:
+            low = self._low
+            if len(self._values) == self.window:
+                # The top of the smaller half is its largest value still in the window
+                if (-self._values.popleft(), self.window - self._count) >= low[0]:
+                    self._n_low -= 1
+                else:
+                    self._n_high -= 1
+
+            # The top of the smaller half separates the halves even if it has just left
+            entry = (-value, -self._count)
+            if low:
+                to_low = entry >= low[0]
+            else:
+                to_low = not self._high or (value, self._count) < self._high[0]
+            if to_low:
+                heapq.heappush(low, entry)
+                self._n_low += 1
+            else:
+                heapq.heappush(self._high, (value, self._count))
+                self._n_high += 1
+
+            self._values.append(value)
+            self._count += 1
+            self._balance()
+        return self.median
+
+    def _balance(self):
+        """
+        Moves the top of one heap to the other so that the smaller half has as many values
+        as the larger one, or one more, and pops the entries that left from the tops.
+        """
+
+        start = self._count - len(self._values)
+        self._prune(start)
+
+        # A push removes one value and adds one, so one move restores the balance
+        if self._n_low > self._n_high + 1:
+            value, position = heapq.heappop(self._low)
+            heapq.heappush(self._high, (-value, -position))
+            self._n_low -= 1
+            self._n_high += 1
+            self._prune(start)
+        elif self._n_low < self._n_high:
+            value, position = heapq.heappop(self._high)
+            heapq.heappush(self._low, (-value, -position))
+            self._n_low += 1
+            self._n_high -= 1
+            self._prune(start)
+
+        # Rebuilding once the entries that left outnumber the window keeps the memory bounded
+        if len(self._low) + len(self._high) > 2 * self.window:
+            self._low = [entry for entry in self._low if -entry[1] >= start]
+            self._high = [entry for entry in self._high if entry[1] >= start]
+            heapq.heapify(self._low)
+            heapq.heapify(self._high)
+
+    def _prune(self, start: int):
+        """
+        Pops the entries before position start from the tops of the heaps.
+        """
+
+        low = self._low
+        while low and -low[0][1] < start:
+            heapq.heappop(low)
+        high = self._high
+        while high and high[0][1] < start:
+            heapq.heappop(high)
+
+    def extend(self, values) -> np.ndarray:
+        """
+        Adds values one by one.
+
+        Returns:
+        np.ndarray: The median of the window after each value.
+        """
+
+        push = self.push
+        return np.array([push(value) for value in np.asarray(values, dtype=float).ravel().tolist()])
+
+    @property
+    def median(self) -> float:
+        """
+        float: The median of the window, NaN if it is empty.
+        """
+
+        n = len(self._values)
+        if n == 0:
+            return math.nan
+        if n % 2:
+            return -self._low[0][0]
+        return (self._high[0][0] - self._low[0][0]) / 2
+
+
+if __name__ == "__main__":
+    # Example usage of the calculate_average_median function
+
+    # Example 1: Calculating average and median of multiple values
+    values1 = [1, 2, 3, 4, 5]
+    average1, median1 = calculate_average_median(*values1)
+    print(f"For the values {values1}, the average is {average1} and the median is {median1}.")
+
+    # Example 2: Calculating average and median of a single value
+    values2 = [10]
+    average2, median2 = calculate_average_median(*values2)
+    print(f"For the value {values2}, the average is {average2} and the median is {median2}.")
+
+    # Example 3: Calculating average and median of no values (should raise an error)
+    try:
+        average3, median3 = calculate_average_median()
+        print(f"For no values, the average is {average3} and the median is {median3}.")
+    except ValueError as e:
+        print(f"Error: {e}")
@@ -0,0 +1,99 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .extinction import DEFAULT_REGISTRY, ExtinctionRegistry
+from .instrumentation import stage
+
+# The wavelengths measured in the workbooks, in nm
+DEFAULT_WAVELENGTHS = (660, 810, 940)
+
+
+class LeastSquaresResult(NamedTuple):
+    """
+    The result of solve_saturation.
+
+    The concentrations are relative: they include the unknown optical path length, which
+    cancels out in the saturation.
+
+    Attributes:
+    - hbO2 (np.ndarray): The fitted HbO2 concentration of every sample.
+    - hb (np.ndarray): The fitted Hb concentration of every sample.
+    - saturation (np.ndarray): HbO2 / (HbO2 + Hb) of every sample, in percent.
+    """
+
+    hbO2: np.ndarray
+    hb: np.ndarray
+    saturation: np.ndarray
+
+
+def solve_saturation(absorbances, wavelengths=DEFAULT_WAVELENGTHS,
+                     registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> LeastSquaresResult:
+    """
+    Fits the HbO2 and Hb concentrations to the absorbances at N wavelengths by least squares.
+
+    Each absorbance is modelled by Beer-Lambert as A(λ) = e_hbO2(λ) * HbO2 + e_hb(λ) * Hb,
+    and the system is solved with the pseudo-inverse of the extinction matrix. The
+    pseudo-inverse is computed once per wavelength set by the registry, so all the samples
+    are solved with a single matrix multiplication. With two wavelengths, this gives the
+    same saturation as calculate_scvo2_from_absorbance.
+
+    Parameters:
+    - absorbances (array_like): The absorbances, with the wavelengths along the last axis,
+      e.g. of shape (number of samples, N).
+    - wavelengths (iterable of float): The N wavelengths in nm, in the order of the last axis.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    LeastSquaresResult: The concentrations and saturation of every sample, NaN where an
+    absorbance is NaN.
+
+    Raises:
+    - ValueError: If the last axis does not have one absorbance per wavelength.
+
+    Examples:
+    >>> result = solve_saturation([[0.2, 0.25], [0.3, 0.25]], (660, 810))
+    >>> result.saturation.round(2)
+    array([87.15, 75.07])
+    """
+
+    wavelengths = tuple(wavelengths)
+    absorbances = np.asarray(absorbances, dtype=float)
+    if absorbances.ndim == 0 or absorbances.shape[-1] != len(wavelengths):
+        raise ValueError(f"Expected {len(wavelengths)} absorbances along the last axis, got shape {absorbances.shape}.")
+
+    with stage("solve", rows=absorbances.size // len(wavelengths)):
+        concentrations = absorbances @ registry.pseudo_inverse(wavelengths).T
+        hbO2 = concentrations[..., 0]
+        hb = concentrations[..., 1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            saturation = hbO2 / (hbO2 + hb) * 100
+
+    return LeastSquaresResult(hbO2, hb, saturation)
+
+
+def calculate_saturation_lstsq(air, sample, wavelengths=DEFAULT_WAVELENGTHS,
+                               registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> np.ndarray:
+    """
+    Calculates the saturation of samples from their optical power at all the measured wavelengths.
+
+    Parameters:
+    - air (array_like): The optical power measured in air, one value per wavelength,
+      broadcast against the samples.
+    - sample (array_like): The optical power measured in the samples, with the wavelengths
+      along the last axis.
+    - wavelengths (iterable of float): The wavelengths in nm, in the order of the last axis.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    np.ndarray: The saturation of every sample in percent, NaN where an absorbance is undefined.
+
+    Examples:
+    >>> calculate_saturation_lstsq([14.0, 11.9, 8.5], [[5.9, 6.5, 3.4], [6.1, 6.6, 3.5]]).round(2)
+    array([73.42, 73.73])
+    """
+
+    absorbances = calculate_log10_ratio_array(air, sample).values
+    return solve_saturation(absorbances, wavelengths, registry).saturation
@@ -0,0 +1,310 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .bandpass_filter import SAMPLE_RATE_HZ
+from .instrumentation import stage
+
+
+class BeatDetection(NamedTuple):
+    """
+    The beats found by detect_beats, one element (or row) per Detection_Done.
+
+    Attributes:
+    - beat_index (np.ndarray): The sample index of each Detection_Done, i.e. of IR_Min2.
+    - extrema_index (np.ndarray): The sample indexes of IR_Max, IR_Min, IR_Max2 and IR_Min2, shape (n, 4).
+    - ir_extrema (np.ndarray): IR_Max, IR_Min, IR_Max2 and IR_Min2, shape (n, 4).
+    - red_extrema (np.ndarray): Red_Max, Red_Min, Red_Max2 and Red_Min2, shape (n, 4).
+    - ir_vpp (np.ndarray): The IR peak-to-peak value, averaged over the two cycles.
+    - red_vpp (np.ndarray): The Red peak-to-peak value, averaged over the two cycles.
+    - pulse_rate (np.ndarray): The instantaneous pulse rate in beats per minute, from IR_Max to IR_Max2.
+    """
+
+    beat_index: np.ndarray
+    extrema_index: np.ndarray
+    ir_extrema: np.ndarray
+    red_extrema: np.ndarray
+    ir_vpp: np.ndarray
+    red_vpp: np.ndarray
+    pulse_rate: np.ndarray
+
+
+def detect_beats(ir_ac, red_ac, sample_rate_hz: float = SAMPLE_RATE_HZ, min_amplitude: float = 0.0) -> BeatDetection:
+    """
+    Finds the peaks, troughs and beats of filtered IR and Red traces, without a loop over the samples.
+
+    This follows the firmware main loop: the IR trace is searched for IR_Max, IR_Min, IR_Max2
+    and IR_Min2 in that order, and Detection_Done is reached at IR_Min2. Each Detection_Done
+    is one beat, and the search then starts again after it, so the two-cycle groups do not
+    overlap. The Red extrema are taken from the Red trace around the same samples.
+
+    Parameters:
+    - ir_ac (array_like): The filtered IR AC samples.
+    - red_ac (array_like): The filtered Red AC samples.
+    - sample_rate_hz (float): The sampling rate in Hz, used for the pulse rate.
+    - min_amplitude (float): Swings between a peak and a trough smaller than this are
+      treated as noise and ignored.
+
+    Returns:
+    BeatDetection: The extrema, peak-to-peak values and pulse rate of every beat.
+
+    Raises:
+    - ValueError: If the IR and Red traces do not have the same length, or contain NaN or
+      infinite samples.
+
+    Examples:
+    >>> t = np.arange(1000) / 250
+    >>> beats = detect_beats(np.sin(2 * np.pi * t), 0.5 * np.sin(2 * np.pi * t))
+    >>> beats.beat_index, beats.pulse_rate
+    (array([438, 938]), array([60., 60.]))
+    >>> detect_beats([0.0, 1.0, np.nan, 1.0], [0.0, 1.0, 0.0, 1.0], min_amplitude=0.5)
+    Traceback (most recent call last):
+    ...
+    ValueError: The traces cannot contain NaN or infinite samples.
+    """
+
+    ir_ac = np.asarray(ir_ac, dtype=float)
+    red_ac = np.asarray(red_ac, dtype=float)
+    if ir_ac.shape != red_ac.shape:
+        raise ValueError("The Red and IR traces must have the same length.")
+    _check_finite(ir_ac, red_ac)
+
+    with stage("detect", rows=ir_ac.size):
+        return _detect(ir_ac, red_ac, *_find_extrema(ir_ac, min_amplitude), sample_rate_hz)
+
+
+def _detect(ir_ac: np.ndarray, red_ac: np.ndarray, index: np.ndarray, is_max: np.ndarray,
+            sample_rate_hz: float, start: int = 0) -> BeatDetection:
+    """
+    Groups the alternating IR extrema into beats and measures them.
+
+    The Red window of the first extremum starts at sample start.
+    """
+
+    # Starting at the first maximum and keeping complete groups of Max, Min, Max2, Min2
+    if index.size and not is_max[0]:
+        index = index[1:]
+    red_extrema = _extrema_around(red_ac, index, start)
+
+    complete = index.size - index.size % 4
+    extrema_index = index[:complete].reshape(-1, 4)
+    ir_extrema = ir_ac[extrema_index]
+    red_extrema = red_extrema[:complete].reshape(-1, 4)
+
+    ir_vpp = (np.abs(ir_extrema[:, 0] - ir_extrema[:, 1]) + np.abs(ir_extrema[:, 2] - ir_extrema[:, 3])) / 2
+    red_vpp = (np.abs(red_extrema[:, 0] - red_extrema[:, 1]) + np.abs(red_extrema[:, 2] - red_extrema[:, 3])) / 2
+    pulse_rate = 60.0 * sample_rate_hz / (extrema_index[:, 2] - extrema_index[:, 0])
+
+    return BeatDetection(extrema_index[:, 3], extrema_index, ir_extrema, red_extrema, ir_vpp, red_vpp, pulse_rate)
+
+
+class BeatDetector:
+    """
+    Streaming version of detect_beats, for traces that arrive in chunks.
+
+    The samples after the last complete beat are kept between calls, so the beats are the
+    same as with detect_beats on the whole trace, and their indexes count from the first
+    sample ever processed.
+
+    Attributes:
+    - sample_rate_hz (float): The sampling rate in Hz.
+    - min_amplitude (float): See detect_beats.
+    - max_pending (int): The maximum number of samples kept while no beat is found.
+    """
+
+    def __init__(self, sample_rate_hz: float = SAMPLE_RATE_HZ, min_amplitude: float = 0.0,
+                 max_pending: int = None):
+        """
+        Constructs a new BeatDetector instance.
+
+        Parameters:
+        - sample_rate_hz (float): The sampling rate in Hz.
+        - min_amplitude (float): See detect_beats.
+        - max_pending (int, optional): The maximum number of samples kept while no beat is
+          found, 10 seconds of samples by default.
+        """
+
+        self.sample_rate_hz = sample_rate_hz
+        self.min_amplitude = min_amplitude
+        self.max_pending = max_pending if max_pending is not None else int(10 * sample_rate_hz)
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the pending samples and restarts the sample count.
+        """
+
+        self._ir = np.empty(0)
+        self._red = np.empty(0)
+        self._offset = 0
+        self._start = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        int: The number of samples kept for the next call: the next beats are among the
+        last pending samples processed, or after them.
+        """
+
+        return self._ir.size
+
+    def process(self, ir_chunk, red_chunk) -> BeatDetection:
+        """
+        Consumes a chunk of samples and returns the beats completed so far.
+
+        Parameters:
+        - ir_chunk (array_like): The next filtered IR AC samples.
+        - red_chunk (array_like): The next filtered Red AC samples.
+
+        Returns:
+        BeatDetection: The beats completed since the previous call.
+
+        Raises:
+        - ValueError: If the IR and Red chunks do not have the same length, or contain NaN
+          or infinite samples; the pending samples are left unchanged.
+
+        Examples:
+        >>> detector = BeatDetector(min_amplitude=0.5)
+        >>> detector.process([0.0, np.inf], [0.0, 0.0])
+        Traceback (most recent call last):
+        ...
+        ValueError: The traces cannot contain NaN or infinite samples.
+        """
+
+        ir_chunk = np.asarray(ir_chunk, dtype=float)
+        red_chunk = np.asarray(red_chunk, dtype=float)
+        if ir_chunk.shape != red_chunk.shape:
+            raise ValueError("The Red and IR chunks must have the same length.")
+        _check_finite(ir_chunk, red_chunk)
+
+        ir = np.concatenate((self._ir, ir_chunk))
+        red = np.concatenate((self._red, red_chunk))
+
+        with stage("detect", rows=ir.size - self._ir.size):
+            index, is_max = _find_extrema(ir, self.min_amplitude)
+            beats = _detect(ir, red, index, is_max, self.sample_rate_hz, self._start)
+
+            # The last extremum may still move with the next samples, so its beat is not final
+            last_extremum = index[-1] if index.size else 0
+            final = beats.beat_index < last_extremum
+            beats = BeatDetection(*(field[final] for field in beats))
+
+            if beats.beat_index.size:
+                # Restarting at IR_Min2, with the Red window of the next extremum where detect_beats opens it
+                last_beat = beats.beat_index[-1]
+                next_extremum = index[np.searchsorted(index, last_beat, side='right')]
+                keep_from = last_beat
+                self._start = (next_extremum - last_beat) // 2 + 1
+            else:
+                keep_from = max(0, ir.size - self.max_pending)
+                self._start = max(0, self._start - keep_from)
+
+            self._ir = ir[keep_from:]
+            self._red = red[keep_from:]
+
+            offset = self._offset
+            self._offset += keep_from
+
+        return beats._replace(beat_index=beats.beat_index + offset, extrema_index=beats.extrema_index + offset)
+
+
+def _check_finite(*traces: np.ndarray):
+    """
+    Rejects traces with NaN or infinite samples, which have no extremum.
+
+    Raises:
+    - ValueError: If one of the traces has a sample that is not finite.
+    """
+
+    if not all(np.isfinite(trace).all() for trace in traces):
+        raise ValueError("The traces cannot contain NaN or infinite samples.")
+
+
+def _find_extrema(signal: np.ndarray, min_amplitude: float) -> tuple:
+    """
+    Finds the alternating extrema of a signal, ignoring the swings smaller than min_amplitude.
+    """
+
+    index, is_max = _alternating_extrema(signal)
+    if min_amplitude > 0:
+        index, is_max = _remove_small_swings(signal, index, is_max, min_amplitude)
+    return index, is_max
+
+
+def _alternating_extrema(signal: np.ndarray) -> tuple:
+    """
+    Finds the local extrema of a signal, where the sign of its slope changes.
+
+    Flat runs are skipped, so the returned extrema always alternate between maxima and minima.
+
+    Returns:
+    tuple: The sample indexes of the extrema and a boolean array, True for the maxima.
+    """
+
+    slope = np.sign(np.diff(signal))
+    sloped = np.flatnonzero(slope)
+    signs = slope[sloped]
+
+    change = np.flatnonzero(signs[1:] != signs[:-1])
+    return sloped[change + 1], signs[change] > 0
+
+
+def _remove_small_swings(signal: np.ndarray, index: np.ndarray, is_max: np.ndarray, threshold: float) -> tuple:
+    """
+    Removes the pairs of consecutive extrema whose swing is smaller than threshold.
+
+    Each pass removes the smallest swings that are at least four extrema apart, and moves
+    their neighbours to the larger of the two extrema they now replace, so the extrema
+    keep alternating. Passes are repeated until every swing reaches the threshold.
+    """
+
+    while index.size > 1:
+        values = signal[index]
+        swing = np.abs(np.diff(values))
+        if swing.min() >= threshold:
+            break
+
+        # Smallest swings of their neighbourhood, far enough apart to be removed together
+        padded = np.concatenate(([np.inf, np.inf], swing, [np.inf, np.inf]))
+        smallest = (swing < threshold) & (swing < padded[:-4]) & (swing < padded[1:-3]) & \
+                   (swing <= padded[3:-1]) & (swing <= padded[4:])
+        pair = np.flatnonzero(smallest)
+        if pair.size == 0:
+            break
+
+        # The neighbours before and after the pair take the more extreme of the two candidates
+        before = pair[pair > 0]
+        after = pair[pair + 2 < index.size]
+        keep_index = index.copy()
+        for neighbour, candidate in ((before - 1, before + 1), (after + 2, after)):
+            candidate_values = values[candidate]
+            neighbour_values = values[neighbour]
+            better = np.where(is_max[neighbour], candidate_values > neighbour_values,
+                              candidate_values < neighbour_values)
+            keep_index[neighbour[better]] = index[candidate[better]]
+
+        removed = np.zeros(index.size, dtype=bool)
+        removed[pair] = True
+        removed[pair + 1] = True
+        index = keep_index[~removed]
+        is_max = is_max[~removed]
+
+    return index, is_max
+
+
+def _extrema_around(signal: np.ndarray, index: np.ndarray, start: int = 0) -> np.ndarray:
+    """
+    Takes the extremum of a signal around each of the alternating extrema of another one.
+
+    Each window spans halfway to the previous and to the next extremum, and the first one
+    starts at sample start; maxima and minima alternate, starting with a maximum.
+    """
+
+    if index.size == 0:
+        return np.empty(0)
+
+    bounds = np.concatenate(([start], (index[:-1] + index[1:]) // 2 + 1))
+    maxima = np.maximum.reduceat(signal, bounds)
+    minima = np.minimum.reduceat(signal, bounds)
+
+    return np.where(np.arange(index.size) % 2 == 0, maxima, minima)
@@ -0,0 +1,266 @@
+import os
+
+import numpy as np
+from statistics import median
+from .excel_cache import get_default_cache
+from .instrumentation import stage
+
+def read_excel_columns(file_path: str, sheet_name: str, use_cache: bool = True) -> dict:
+    """
+    Reads data from an Excel file and extracts all columns as lists.
+
+    This function uses the pandas library to read the Excel file and extract all columns.
+    The columns are saved in a dictionary where the keys are column names and the values
+    are the corresponding lists.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - sheet_name (str): The name of the sheet in the Excel file.
+    - use_cache (bool): If True, serve the sheet from the converted-workbook cache
+      (see excel_cache.WorkbookCache) instead of parsing the Excel file again.
+
+    Returns:
+    dict: A dictionary where the keys are column names, converted to strings, and the values
+    are the corresponding lists.
+
+    Raises:
+    - FileNotFoundError: If the specified Excel file does not exist.
+    - ValueError: If the specified sheet does not exist in the Excel file.
+    """
+
+    try:
+        if use_cache:
+            return get_default_cache().load_sheet(file_path, sheet_name, raw=True)
+
+        # Read the Excel file using pandas, imported only when a workbook is parsed
+        import pandas as pd
+        excel_file = pd.ExcelFile(file_path)
+
+        # Check if the specified sheet exists in the Excel file
+        if sheet_name not in excel_file.sheet_names:
+            raise ValueError(f"Sheet '{sheet_name}' does not exist in the Excel file.")
+
+        # Read the sheet
+        data_frame = excel_file.parse(sheet_name)
+
+        # Create a dictionary to store column data
+        columns = {}
+
+        # Iterate over each column, named like in the cache even if the header is a date or a number
+        for column in data_frame.columns:
+            # Extract the column as a list
+            columns[str(column)] = data_frame[column].tolist()
+
+        # Return the dictionary of column values
+        return columns
+
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Excel file '{file_path}' not found.")
+
+
+def _numeric_arrays(data_frame) -> dict:
+    """
+    Converts every column of a parsed sheet to a float array.
+
+    Parameters:
+    - data_frame (pd.DataFrame): The parsed sheet.
+
+    Returns:
+    dict: A dictionary mapping each column name to a float array where text and empty
+    cells are NaN, the same layout as the converted-workbook cache.
+    """
+
+    import pandas as pd
+
+    # Coerce every cell at once; text and empty cells become NaN
+    return {
+        str(column_name): pd.to_numeric(data_frame[column_name], errors='coerce').to_numpy(dtype=float)
+        for column_name in data_frame.columns
+    }
+
+
+def _select_numeric_columns(columns: dict, sheet_name: str, column_names=None) -> dict:
+    """
+    Extracts the requested columns of an already loaded sheet, dropping the non-numeric cells.
+
+    Parameters:
+    - columns (dict): The float arrays of the sheet, with NaN for non-numeric cells.
+    - sheet_name (str): The name of the sheet, used in error messages.
+    - column_names (iterable of str, optional): The columns to extract. All columns if None.
+
+    Returns:
+    dict: A dictionary mapping each column name to a NumPy array of its numeric values.
+
+    Raises:
+    - ValueError: If one of the requested columns does not exist in the sheet.
+    """
+
+    if column_names is None:
+        column_names = columns.keys()
+
+    numeric_columns = {}
+    for column_name in column_names:
+        # Check if the specified column exists in the sheet
+        if column_name not in columns:
+            raise ValueError(f"Column '{column_name}' does not exist in sheet '{sheet_name}'.")
+        values = columns[column_name]
+        numeric_columns[column_name] = values[~np.isnan(values)]
+
+    return numeric_columns
+
+
+def _loaded_size(file_path: str, sheets, use_cache: bool) -> tuple:
+    """
+    Counts the rows loaded from the sheets, and the bytes read to load them.
+
+    Returns:
+    tuple: The number of rows of the longest column of each sheet, summed, and the size of
+    the cached arrays or of the workbook.
+    """
+
+    rows = sum(max((values.size for values in columns.values()), default=0) for columns in sheets)
+    if use_cache:
+        return rows, sum(values.nbytes for columns in sheets for values in columns.values())
+    return rows, os.path.getsize(file_path)
+
+
+def read_numeric_columns(file_path: str, sheet_name: str, column_names=None, use_cache: bool = True) -> dict:
+    """
+    Reads several numeric columns from one sheet of an Excel file in a single pass.
+
+    The sheet is parsed once and every requested column is returned as a NumPy array,
+    with the non-numeric values filtered out. This replaces calling
+    read_numeric_column_from_excel once per column, which parses the whole workbook again
+    on every call.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - sheet_name (str): The name of the sheet containing the data.
+    - column_names (iterable of str, optional): The columns to extract, e.g. the
+      air/Sam1/Sam2 columns at 660, 810 and 940nm. All columns if None.
+    - use_cache (bool): If True, serve the sheet from the converted-workbook cache.
+
+    Returns:
+    dict: A dictionary mapping each column name to a NumPy array of its numeric values.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If the specified sheet name or one of the column names does not exist in the Excel file.
+    """
+
+    with stage("load") as record:
+        try:
+            if use_cache:
+                columns = get_default_cache().load_sheet(file_path, sheet_name)
+            else:
+                # Read the Excel file and parse the specified sheet only once
+                import pandas as pd
+                excel_file = pd.ExcelFile(file_path)
+
+                # Check if the specified sheet exists in the Excel file
+                if sheet_name not in excel_file.sheet_names:
+                    raise ValueError(f"Sheet '{sheet_name}' does not exist in the Excel file.")
+
+                data_frame = excel_file.parse(sheet_name)
+                columns = _numeric_arrays(data_frame)
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File '{file_path}' not found.")
+
+        record.add(*_loaded_size(file_path, [columns], use_cache))
+
+    return _select_numeric_columns(columns, sheet_name, column_names)
+
+
+def read_all_numeric_columns(file_path: str, column_names=None, use_cache: bool = True) -> dict:
+    """
+    Reads the numeric columns of every sheet of an Excel file in a single pass.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - column_names (iterable of str, optional): The columns to extract from each sheet.
+      All columns if None.
+    - use_cache (bool): If True, serve the workbook from the converted-workbook cache.
+
+    Returns:
+    dict: A dictionary mapping each sheet name to a dictionary of column name -> NumPy array.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If one of the column names does not exist in one of the sheets.
+    """
+
+    with stage("load") as record:
+        try:
+            if use_cache:
+                sheets = get_default_cache().load_workbook(file_path)
+            else:
+                # Parse all the sheets of the workbook at once
+                import pandas as pd
+                data_frames = pd.read_excel(file_path, sheet_name=None)
+                sheets = {sheet_name: _numeric_arrays(data_frame) for sheet_name, data_frame in data_frames.items()}
+
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File '{file_path}' not found.")
+
+        record.add(*_loaded_size(file_path, sheets.values(), use_cache))
+
+    return {
+        sheet_name: _select_numeric_columns(columns, sheet_name, column_names)
+        for sheet_name, columns in sheets.items()
+    }
+
+
+def read_numeric_column_from_excel(file_path: str, sheet_name: str, column_name: str, use_cache: bool = True) -> list:
+    """
+    Reads data from an Excel file and extracts a specific column as a list,
+    filtering out non-numeric values.
+
+    To read several columns of the same sheet, use read_numeric_columns instead,
+    which parses the sheet only once.
+
+    Parameters:
+    - file_path (str): The path to the Excel file.
+    - sheet_name (str): The name of the sheet containing the data.
+    - column_name (str): The name of the column to extract.
+    - use_cache (bool): If True, serve the sheet from the converted-workbook cache.
+
+    Returns:
+    list: A list containing only the numeric values from the specified column.
+
+    Raises:
+    - FileNotFoundError: If the specified file path does not exist.
+    - ValueError: If the specified sheet name or column name does not exist in the Excel file.
+    """
+
+    columns = read_numeric_columns(file_path, sheet_name, [column_name], use_cache)
+    return columns[column_name].tolist()
+
+
+if __name__ == "__main__":
+    # Example usage:
+    file_path = "data.xlsx"
+    sheet_name = "Sheet2"
+
+    try:
+        column_data = read_excel_columns(file_path, sheet_name)
+        for column, values in column_data.items():
+            print(f"The column '{column}' from sheet '{sheet_name}' in the Excel file '{file_path}' is:")
+            print(values)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+
+    # Air and sample measurements, all parsed from the sheet in a single pass
+    numeric_data = read_numeric_columns(file_path, sheet_name)
+
+    air_660 = median(numeric_data['air_660'])
+    clear_660 = median(numeric_data['Sam1_660'])
+    red_660 = median(numeric_data['Sam2_660'])
+
+    air_810 = median(numeric_data['air_810'])
+    clear_810 = median(numeric_data['Sam1_810'])
+    red_810 = median(numeric_data['Sam2_810'])
+
+    air_940 = median(numeric_data['air_940'])
+    clear_940 = median(numeric_data['Sam1_940'])
+    red_940 = median(numeric_data['Sam2_940'])
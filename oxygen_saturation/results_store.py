@@ -0,0 +1,204 @@
+import sqlite3
+import time as _time
+from itertools import islice
+from typing import NamedTuple
+
+# Rows buffered before one transaction inserts them all
+DEFAULT_BATCH_SIZE = 10000
+
+RESULT_FIELDS = ("file", "sheet", "sample", "red_wavelength", "nir_wavelength", "time", "value")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file TEXT,
+    sheet TEXT,
+    sample TEXT NOT NULL,
+    red_wavelength INTEGER,
+    nir_wavelength INTEGER,
+    time REAL NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS results_sample_time ON results (sample, time);
+CREATE INDEX IF NOT EXISTS results_time ON results (time);
+"""
+
+
+class StoredResult(NamedTuple):
+    """
+    One row of a ResultsStore.
+
+    Attributes:
+    - file (str): The path to the Excel file.
+    - sheet (str): The name of the sheet.
+    - sample (str): The name of the sample, e.g. Sam1.
+    - red_wavelength (int): The wavelength of the red LED in nm.
+    - nir_wavelength (int): The wavelength of the NIR LED in nm.
+    - time (float): The time of the result in seconds since the epoch.
+    - value (float): The saturation in percent, None where it is undefined.
+    """
+
+    file: str
+    sheet: str
+    sample: str
+    red_wavelength: int
+    nir_wavelength: int
+    time: float
+    value: float
+
+
+class ResultsStore:
+    """
+    A local SQLite store of computed saturation values, indexed by sample and time.
+
+    The database is opened in WAL mode, so that it can be read while a batch is written.
+    Rows are buffered and inserted batch_size at a time, in one transaction per batch,
+    instead of one commit per row. Buffered rows are only visible after flush, which is
+    also called by close and at the end of a with block.
+
+    Examples:
+    >>> with ResultsStore(":memory:") as store:
+    ...     store.add_scored([("data.xlsx", "Sheet1", "Sam1", 660, 810, 79.9),
+    ...                       ("data.xlsx", "Sheet1", "Sam2", 660, 810, 78.7)], time=100.0)
+    ...     store.add("data.xlsx", "Sheet2", "Sam1", 660, 810, 200.0, 75.0)
+    ...     store.flush()
+    ...     [(row.sheet, row.value) for row in store.query(sample="Sam1", start=50.0)]
+    [('Sheet1', 79.9), ('Sheet2', 75.0)]
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Opens a store, creating the database and its indexes if needed.
+
+        Parameters:
+        - path (str): The path to the SQLite database, or ":memory:".
+        - batch_size (int): The number of rows buffered before they are inserted.
+
+        Raises:
+        - ValueError: If the batch size is not positive.
+        """
+
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive.")
+
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs at checkpoints: a crash can lose the last
+        # transactions but never corrupts the database
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, file: str, sheet: str, sample: str, red_wavelength: int, nir_wavelength: int, time: float,
+            value: float):
+        """
+        Adds one result.
+
+        Parameters:
+        - file (str): The path to the Excel file.
+        - sheet (str): The name of the sheet.
+        - sample (str): The name of the sample.
+        - red_wavelength (int): The wavelength of the red LED in nm.
+        - nir_wavelength (int): The wavelength of the NIR LED in nm.
+        - time (float): The time of the result in seconds since the epoch.
+        - value (float): The saturation in percent.
+        """
+
+        self._pending.append((file, sheet, sample, red_wavelength, nir_wavelength, time, value))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        """
+        Adds results given as (file, sheet, sample, red_wavelength, nir_wavelength, time, value) tuples.
+
+        Parameters:
+        - rows (iterable of tuple): The results.
+        """
+
+        # Filling the buffer one batch at a time keeps the memory bounded for long iterators
+        rows = iter(rows)
+        while True:
+            self._pending.extend(islice(rows, self.batch_size - len(self._pending)))
+            if len(self._pending) < self.batch_size:
+                break
+            self.flush()
+
+    def add_scored(self, rows, time: float = None):
+        """
+        Adds the rows of batch_scvo2.score_columns, which have no time.
+
+        Parameters:
+        - rows (iterable of tuple): (file, sheet, sample, red_wavelength, nir_wavelength, scvo2) tuples.
+        - time (float, optional): The time of the results, now by default.
+        """
+
+        time = _time.time() if time is None else time
+        self.add_many((*row[:5], time, row[5]) for row in rows)
+
+    def flush(self):
+        """
+        Inserts the buffered results in one transaction.
+        """
+
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def close(self):
+        """
+        Inserts the buffered results and closes the database.
+        """
+
+        try:
+            self.flush()
+        finally:
+            self._connection.close()
+
+    def query(self, sample: str = None, start: float = None, stop: float = None, file: str = None,
+              sheet: str = None) -> list:
+        """
+        Returns the stored results matching all the given criteria, in time order.
+
+        Parameters:
+        - sample (str, optional): The name of the sample.
+        - start (float, optional): The earliest time, included.
+        - stop (float, optional): The latest time, excluded.
+        - file (str, optional): The path to the Excel file.
+        - sheet (str, optional): The name of the sheet.
+
+        Returns:
+        list: The StoredResult rows; buffered rows are not included until flush.
+        """
+
+        conditions = []
+        parameters = []
+        for condition, parameter in (("sample = ?", sample), ("time >= ?", start), ("time < ?", stop),
+                                     ("file = ?", file), ("sheet = ?", sheet)):
+            if parameter is not None:
+                conditions.append(condition)
+                parameters.append(parameter)
+
+        sql = "SELECT * FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY time"
+
+        return [StoredResult(*row) for row in self._connection.execute(sql, parameters)]
+
+    def count(self) -> int:
+        """
+        Returns the number of stored results, without the buffered ones.
+        """
+
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -0,0 +1,190 @@
+import numpy as np
+
+# One second of samples of the firmware at 250 samples per second, per channel
+DEFAULT_WINDOW_SIZE = 250
+
+
+class DualChannelRingBuffer:
+    """
+    A preallocated single-producer, single-consumer ring buffer of interleaved Red/IR samples.
+
+    This is the Python side of the firmware's RedReady/IRReady hand-off: the acquisition
+    side writes Red/IR sample pairs with write(), and the processing side reads them with
+    peek() and advance(). The samples are stored interleaved, one [red, ir] row per sample,
+    in an array allocated once, so nothing is allocated per sample or per block.
+
+    The first window_size - 1 rows are mirrored after the end of the array, so any window
+    of up to window_size samples is contiguous and peek() returns a NumPy view into the
+    buffer instead of a copy, even across the wrap-around. The view stays valid until the
+    consumer calls advance().
+
+    The producer only moves the write position and the consumer only moves the read
+    position, and each position is published with a single assignment after the data is
+    in place, so one producer thread and one consumer thread can use the buffer without a
+    lock. When the buffer is full, write() keeps the unread samples and drops the new ones.
+
+    Attributes:
+    - capacity (int): The number of sample pairs the buffer can hold.
+    - window_size (int): The largest window returned by peek().
+    - dropped (int): The number of sample pairs dropped because the buffer was full.
+
+    Examples:
+    >>> buffer = DualChannelRingBuffer(4, window_size=3)
+    >>> buffer.write([1, 2, 3], [10, 20, 30])
+    3
+    >>> buffer.advance(2)
+    >>> buffer.write([4, 5], [40, 50])
+    2
+    >>> buffer.peek()
+    array([[ 3., 30.],
+           [ 4., 40.],
+           [ 5., 50.]])
+    """
+
+    def __init__(self, capacity: int, window_size: int = DEFAULT_WINDOW_SIZE, dtype=np.float64):
+        """
+        Constructs a new, empty DualChannelRingBuffer instance.
+
+        Parameters:
+        - capacity (int): The number of sample pairs the buffer can hold.
+        - window_size (int): The largest window returned by peek(), at most capacity.
+        - dtype (data-type): The type of the samples, e.g. np.int16 for raw ADC counts.
+
+        Raises:
+        - ValueError: If the capacity or the window size is not positive, or if the window
+          size is larger than the capacity.
+        """
+
+        if capacity < 1 or window_size < 1:
+            raise ValueError("The capacity and the window size must be positive.")
+        if window_size > capacity:
+            raise ValueError("The window size cannot be larger than the capacity.")
+
+        self.capacity = capacity
+        self.window_size = window_size
+        self.dropped = 0
+
+        # Interleaved [red, ir] rows, followed by the mirror of the first window_size - 1 rows
+        self._data = np.zeros((capacity + window_size - 1, 2), dtype=dtype)
+
+        # Total number of pairs written and read; each one is only ever changed by one side
+        self._write_count = 0
+        self._read_count = 0
+
+    @property
+    def available(self) -> int:
+        """
+        int: The number of sample pairs written and not read yet.
+        """
+
+        return self._write_count - self._read_count
+
+    @property
+    def free(self) -> int:
+        """
+        int: The number of sample pairs that can be written before the buffer is full.
+        """
+
+        return self.capacity - self.available
+
+    def write(self, red, ir) -> int:
+        """
+        Appends a block of Red/IR sample pairs. Called by the producer only.
+
+        Parameters:
+        - red (float or array_like): The Red samples.
+        - ir (float or array_like): The IR samples, as many as Red samples.
+
+        Returns:
+        int: The number of pairs written, less than the block size if the buffer is full.
+
+        Raises:
+        - ValueError: If the Red and IR blocks do not have the same length.
+        """
+
+        red = np.ravel(red)
+        ir = np.ravel(ir)
+        if red.size != ir.size:
+            raise ValueError("The Red and IR blocks must have the same length.")
+
+        n = min(red.size, self.capacity - (self._write_count - self._read_count))
+        self.dropped += red.size - n
+        if n == 0:
+            return 0
+
+        start = self._write_count % self.capacity
+        first = min(n, self.capacity - start)
+        self._store(start, red[:first], ir[:first])
+        if first < n:
+            self._store(0, red[first:n], ir[first:n])
+
+        # Publishing the samples only once they are in place
+        self._write_count += n
+        return n
+
+    def _store(self, start: int, red: np.ndarray, ir: np.ndarray):
+        """
+        Copies a block that does not wrap around to start, and to its mirror if needed.
+        """
+
+        stop = start + red.size
+        self._data[start:stop, 0] = red
+        self._data[start:stop, 1] = ir
+
+        mirror_stop = min(stop, self.window_size - 1)
+        if start < mirror_stop:
+            self._data[self.capacity + start:self.capacity + mirror_stop] = self._data[start:mirror_stop]
+
+    def peek(self, n: int = None) -> np.ndarray:
+        """
+        Returns the oldest unread sample pairs without copying them. Called by the consumer only.
+
+        Parameters:
+        - n (int, optional): The maximum number of pairs, window_size by default.
+
+        Returns:
+        np.ndarray: A read-only view of shape (m, 2), with the Red samples in column 0 and
+        the IR samples in column 1, where m is at most n, window_size and available.
+        """
+
+        n = self.window_size if n is None else min(n, self.window_size)
+        n = max(0, min(n, self._write_count - self._read_count))
+
+        start = self._read_count % self.capacity
+        window = self._data[start:start + n]
+        window.flags.writeable = False
+        return window
+
+    def advance(self, n: int):
+        """
+        Marks sample pairs as read, so that the producer can reuse their space. Called by the consumer only.
+
+        Parameters:
+        - n (int): The number of pairs read, at most available.
+
+        Raises:
+        - ValueError: If n is negative or larger than the number of unread pairs.
+        """
+
+        if not 0 <= n <= self._write_count - self._read_count:
+            raise ValueError("Cannot advance past the unread samples.")
+
+        self._read_count += n
+
+    def windows(self, n: int = None):
+        """
+        Yields the unread samples as consecutive zero-copy windows, advancing after each one.
+
+        Parameters:
+        - n (int, optional): The maximum size of each window, window_size by default.
+
+        Yields:
+        np.ndarray: Read-only views of shape (m, 2); see peek().
+        """
+
+        while True:
+            window = self.peek(n)
+            if window.shape[0] == 0:
+                return
+            yield window
+            self.advance(window.shape[0])
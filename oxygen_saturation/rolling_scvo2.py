@@ -0,0 +1,160 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .calculate_log10_ratio import calculate_log10_ratio_array
+from .calculate_scvo2 import calculate_scvo2_from_absorbance
+from .extinction import DEFAULT_REGISTRY, ExtinctionRegistry
+from .median_average import RollingMedian
+
+# One second of samples at the firmware sampling rate
+DEFAULT_WINDOW = 250
+
+
+class RollingScvO2Result(NamedTuple):
+    """
+    The ScvO2 values emitted by RollingScvO2.
+
+    Attributes:
+    - index (np.ndarray): The index of the last sample of each window, counted from the
+      first sample of the stream.
+    - scvo2 (np.ndarray): The ScvO2 of each window in percent, NaN where an absorbance is undefined.
+    """
+
+    index: np.ndarray
+    scvo2: np.ndarray
+
+
+class RollingScvO2:
+    """
+    Time-resolved ScvO2 from the rolling medians of the red and NIR sample measurements.
+
+    This is the sliding-window version of 'calculate directly.py': instead of collapsing
+    each column to one median, the median of the last window measurements of each channel
+    is kept up to date with a RollingMedian, in O(log window) per measurement, and a ScvO2
+    value is emitted every step measurements. The air measurements are references, e.g.
+    the medians of the air columns.
+
+    Attributes:
+    - air_red (float): The optical power measured in air with the red LED.
+    - air_nir (float): The optical power measured in air with the NIR LED.
+    - window (int): The number of measurements of each median.
+    - step (int): A value is emitted every step measurements.
+    - min_count (int): No value is emitted before this many measurements.
+
+    Examples:
+    >>> rolling = RollingScvO2(14.5, 11.9, window=3, step=2)
+    >>> result = rolling.update([5.9, 6.0, 5.8, 7.5], [6.5, 6.4, 6.6, 6.5])
+    >>> result.index, result.scvo2.round(2)
+    (array([3]), array([67.21]))
+    >>> rolling.update([6.1, 6.0], [6.5, 6.5]).scvo2.round(2)
+    array([68.04])
+    """
+
+    def __init__(self, air_red: float, air_nir: float, window: int = DEFAULT_WINDOW, step: int = 1,
+                 min_count: int = None, red_wavelength: float = 660, nir_wavelength: float = 810,
+                 registry: ExtinctionRegistry = DEFAULT_REGISTRY):
+        """
+        Constructs a new RollingScvO2 instance.
+
+        Parameters:
+        - air_red (float): The optical power measured in air with the red LED.
+        - air_nir (float): The optical power measured in air with the NIR LED.
+        - window (int): The number of measurements of each median.
+        - step (int): A value is emitted every step measurements.
+        - min_count (int, optional): No value is emitted before this many measurements,
+          window by default so that every value covers a full window.
+        - red_wavelength (float): The wavelength of the red LED in nm.
+        - nir_wavelength (float): The wavelength of the NIR LED in nm.
+        - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+        Raises:
+        - ValueError: If the window or the step is not positive, or a wavelength has no
+          extinction coefficients.
+        """
+
+        if step < 1:
+            raise ValueError("The step must be positive.")
+        registry.pair(red_wavelength, nir_wavelength)
+
+        self.air_red = air_red
+        self.air_nir = air_nir
+        self.window = window
+        self.step = step
+        self.min_count = window if min_count is None else min_count
+        self.red_wavelength = red_wavelength
+        self.nir_wavelength = nir_wavelength
+        self.registry = registry
+
+        self._red = RollingMedian(window)
+        self._nir = RollingMedian(window)
+        self._count = 0
+
+    def reset(self):
+        """
+        Discards the measurements and restarts the sample count.
+        """
+
+        self._red.reset()
+        self._nir.reset()
+        self._count = 0
+
+    def update(self, red, nir) -> RollingScvO2Result:
+        """
+        Consumes the next measurements of both channels.
+
+        Parameters:
+        - red (array_like): The next sample measurements with the red LED.
+        - nir (array_like): The next sample measurements with the NIR LED, as many as red.
+
+        Returns:
+        RollingScvO2Result: The values emitted by these measurements.
+
+        Raises:
+        - ValueError: If the two channels do not have the same number of measurements.
+        """
+
+        red = np.asarray(red, dtype=float).ravel()
+        nir = np.asarray(nir, dtype=float).ravel()
+        if red.shape != nir.shape:
+            raise ValueError("The red and NIR channels must have the same number of measurements.")
+
+        # Only the medians of the emitted windows are needed, but every measurement updates the windows
+        red_medians = self._red.extend(red)
+        nir_medians = self._nir.extend(nir)
+
+        index = np.arange(self._count, self._count + red.size)
+        self._count += red.size
+        emitted = ((index + 1) % self.step == 0) & (index + 1 >= self.min_count)
+
+        A_red = calculate_log10_ratio_array(self.air_red, red_medians[emitted]).values
+        A_nir = calculate_log10_ratio_array(self.air_nir, nir_medians[emitted]).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scvo2 = calculate_scvo2_from_absorbance(A_red, A_nir, self.red_wavelength, self.nir_wavelength,
+                                                    self.registry)
+
+        return RollingScvO2Result(index[emitted], scvo2)
+
+
+def rolling_scvo2(air_red: float, red, air_nir: float, nir, window: int = DEFAULT_WINDOW, step: int = 1,
+                  red_wavelength: float = 660, nir_wavelength: float = 810,
+                  registry: ExtinctionRegistry = DEFAULT_REGISTRY) -> RollingScvO2Result:
+    """
+    Calculates the ScvO2 trend of whole red and NIR captures; see RollingScvO2.
+
+    Parameters:
+    - air_red (float): The optical power measured in air with the red LED.
+    - red (array_like): The sample measurements with the red LED.
+    - air_nir (float): The optical power measured in air with the NIR LED.
+    - nir (array_like): The sample measurements with the NIR LED, as many as red.
+    - window (int): The number of measurements of each median.
+    - step (int): A value is emitted every step measurements.
+    - red_wavelength (float): The wavelength of the red LED in nm.
+    - nir_wavelength (float): The wavelength of the NIR LED in nm.
+    - registry (ExtinctionRegistry): The extinction coefficients, Moaveni's data by default.
+
+    Returns:
+    RollingScvO2Result: The index of the last measurement and the ScvO2 of every full window.
+    """
+
+    return RollingScvO2(air_red, air_nir, window, step, None, red_wavelength, nir_wavelength, registry).update(red, nir)
@@ -0,0 +1,255 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .bandpass_filter import SAMPLE_RATE_HZ, BandpassFilter
+from .spo2_calculation import DEFAULT_LOOKUP_TABLE, RatioLookupTable, SpO2Result, TraceSpO2, spo2_from_trace
+
+# _T3Interrupt: the probe is not connected when CH0_ADRES_Red <= 74 (60mV) and CH1_ADRES_Red >= 4000 (3.2V)
+PROBE_OFF_DC_MAX = 74
+PROBE_OFF_AC_MIN = 4000
+
+# Finger_Present_Threshold is not defined in Oximeter_mcp.cpp: without a finger most of the
+# Red light reaches the photodiode, so the DC level rises towards the full scale of 4095
+FINGER_PRESENT_THRESHOLD = 3000
+
+# Status of a sample or a segment
+VALID, PROBE_OFF, NO_FINGER, TOO_SHORT = 0, 1, 2, 3
+STATUS_NAMES = {VALID: "valid", PROBE_OFF: "probe_off", NO_FINGER: "no_finger", TOO_SHORT: "too_short"}
+
+
+class Thresholds(NamedTuple):
+    """
+    The thresholds of the firmware's probe-off and finger-present checks, in ADC counts.
+
+    Attributes:
+    - probe_off_dc_max (float): The probe is off when the Red DC is at most this...
+    - probe_off_ac_min (float): ...and the Red AC is at least this.
+    - finger_present_threshold (float): There is no finger when the Red DC is above this.
+    """
+
+    probe_off_dc_max: float = PROBE_OFF_DC_MAX
+    probe_off_ac_min: float = PROBE_OFF_AC_MIN
+    finger_present_threshold: float = FINGER_PRESENT_THRESHOLD
+
+
+DEFAULT_THRESHOLDS = Thresholds()
+
+
+def classify_samples(red_dc, red_ac, thresholds: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """
+    Runs the checks of _T3Interrupt on every sample of a trace at once.
+
+    Parameters:
+    - red_dc (array_like): The Red DC samples, CH0_ADRES_Red.
+    - red_ac (array_like): The Red AC samples, CH1_ADRES_Red, before filtering.
+    - thresholds (Thresholds): The thresholds of the checks.
+
+    Returns:
+    np.ndarray: The status of every sample, VALID, PROBE_OFF or NO_FINGER, as int8.
+
+    Examples:
+    >>> classify_samples([1500, 60, 3500], [2048, 4095, 2048])
+    array([0, 1, 2], dtype=int8)
+    """
+
+    red_dc = np.asarray(red_dc)
+    red_ac = np.asarray(red_ac)
+
+    # The probe check comes first, like in the firmware
+    probe_off = (red_dc <= thresholds.probe_off_dc_max) & (red_ac >= thresholds.probe_off_ac_min)
+    no_finger = red_dc > thresholds.finger_present_threshold
+    return np.where(probe_off, PROBE_OFF, np.where(no_finger, NO_FINGER, VALID)).astype(np.int8)
+
+
+class Segments(NamedTuple):
+    """
+    The contiguous runs of samples with the same status, in order.
+
+    Attributes:
+    - start (np.ndarray): The index of the first sample of each segment.
+    - stop (np.ndarray): The index after the last sample of each segment.
+    - status (np.ndarray): The status of each segment, VALID, PROBE_OFF, NO_FINGER or TOO_SHORT.
+    """
+
+    start: np.ndarray
+    stop: np.ndarray
+    status: np.ndarray
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        np.ndarray: Boolean mask of the valid segments.
+        """
+
+        return self.status == VALID
+
+    @property
+    def n_samples(self) -> int:
+        """
+        int: The number of samples of the trace.
+        """
+
+        return int(self.stop[-1]) if self.stop.size else 0
+
+    def valid_intervals(self) -> list:
+        """
+        Returns the (start, stop) sample indexes of the valid segments.
+        """
+
+        valid = self.valid
+        return list(zip(self.start[valid].tolist(), self.stop[valid].tolist()))
+
+    def mask(self) -> np.ndarray:
+        """
+        Returns a boolean mask of the valid samples.
+        """
+
+        return np.repeat(self.valid, self.stop - self.start)
+
+
+def segments_from_status(status, min_valid_samples: int = 1) -> Segments:
+    """
+    Run-length encodes per-sample statuses into segments.
+
+    Parameters:
+    - status (array_like): The status of every sample, e.g. from classify_samples.
+    - min_valid_samples (int): Valid segments shorter than this are marked TOO_SHORT.
+
+    Returns:
+    Segments: The segments.
+    """
+
+    status = np.asarray(status, dtype=np.int8).ravel()
+    if status.size == 0:
+        return Segments(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int8))
+
+    change = np.flatnonzero(status[1:] != status[:-1]) + 1
+    start = np.concatenate(([0], change))
+    stop = np.concatenate((change, [status.size]))
+    segment_status = status[start]
+    segment_status[(segment_status == VALID) & (stop - start < min_valid_samples)] = TOO_SHORT
+
+    return Segments(start, stop, segment_status)
+
+
+def segment_trace(red_dc, red_ac, thresholds: Thresholds = DEFAULT_THRESHOLDS,
+                  min_valid_samples: int = 1) -> Segments:
+    """
+    Splits a trace into valid segments and probe-off or no-finger segments.
+
+    Parameters:
+    - red_dc (array_like): The Red DC samples, CH0_ADRES_Red.
+    - red_ac (array_like): The Red AC samples, CH1_ADRES_Red, before filtering.
+    - thresholds (Thresholds): The thresholds of the checks.
+    - min_valid_samples (int): Valid segments shorter than this are marked TOO_SHORT.
+
+    Returns:
+    Segments: The segments.
+
+    Examples:
+    >>> segments = segment_trace([1500, 1500, 60, 60, 1500, 3500], [2048, 2048, 4095, 4095, 2048, 2048])
+    >>> segments.valid_intervals(), segments.status
+    ([(0, 2), (4, 5)], array([0, 1, 0, 2], dtype=int8))
+    """
+
+    return segments_from_status(classify_samples(red_dc, red_ac, thresholds), min_valid_samples)
+
+
+def apply_to_valid(segments: Segments, function, *arrays, fill: float = np.nan) -> np.ndarray:
+    """
+    Applies an element-wise function to the valid segments only.
+
+    The function is called once per valid segment, with the slices of the arrays, and the
+    invalid samples are never passed to it.
+
+    Parameters:
+    - segments (Segments): The segments of the arrays.
+    - function (callable): A function of the arrays returning one value per sample.
+    - arrays (array_like): The per-sample arguments of the function.
+    - fill (float): The value of the invalid samples.
+
+    Returns:
+    np.ndarray: The result of the function on the valid samples, fill elsewhere.
+
+    Examples:
+    >>> from .calculate_scvo2 import calculate_scvo2_from_absorbance
+    >>> segments = segments_from_status([0, 0, 1])
+    >>> apply_to_valid(segments, calculate_scvo2_from_absorbance, [0.2, 0.3, 9.9], [0.25, 0.25, 9.9]).round(2)
+    array([87.15, 75.07,   nan])
+    """
+
+    arrays = [np.asarray(array) for array in arrays]
+    output = np.full(segments.n_samples, fill, dtype=float)
+    for start, stop in segments.valid_intervals():
+        output[start:stop] = function(*(array[start:stop] for array in arrays))
+    return output
+
+
+def spo2_from_segments(red_dc, red_ac, ir_dc, ir_ac, thresholds: Thresholds = DEFAULT_THRESHOLDS,
+                       bandpass: BandpassFilter = None, lookup_table: RatioLookupTable = DEFAULT_LOOKUP_TABLE,
+                       sample_rate_hz: float = SAMPLE_RATE_HZ, min_amplitude: float = 0.0) -> TraceSpO2:
+    """
+    Filters and replays SpO2_Calculation() over the valid segments of a raw trace only.
+
+    The probe-off and no-finger samples are never filtered nor searched for beats. The
+    filter restarts at the beginning of each valid segment, and its first num_taps - 1
+    outputs, which still depend on the zeros of the delay line, are discarded, so segments
+    shorter than num_taps give no beat.
+
+    Parameters:
+    - red_dc (array_like): The Red DC samples, CH0_ADRES_Red.
+    - red_ac (array_like): The Red AC samples, CH1_ADRES_Red, before filtering.
+    - ir_dc (array_like): The IR DC samples, CH0_ADRES_IR.
+    - ir_ac (array_like): The IR AC samples, CH1_ADRES_IR, before filtering.
+    - thresholds (Thresholds): The thresholds of the probe-off and finger-present checks.
+    - bandpass (BandpassFilter, optional): A two-channel filter for the Red and IR AC,
+      BandpassFilter.design at sample_rate_hz by default.
+    - lookup_table (RatioLookupTable): The Ratio-to-SpO2 table.
+    - sample_rate_hz (float): The sampling rate in Hz.
+    - min_amplitude (float): See peak_detection.detect_beats.
+
+    Returns:
+    TraceSpO2: The beats of all the valid segments, with sample indexes in the whole trace.
+
+    Raises:
+    - ValueError: If the four traces do not have the same length.
+
+    Examples:
+    >>> from .interrupt_driven_led import SimulatedADC
+    >>> adc = SimulatedADC(seed=1)
+    >>> times = np.arange(5000) / SAMPLE_RATE_HZ
+    >>> red_dc, red_ac = adc.read('red', times)
+    >>> ir_dc, ir_ac = adc.read('ir', times)
+    >>> red_dc[1000:3000], red_ac[1000:3000] = 60, 4095
+    >>> beats = spo2_from_segments(red_dc, red_ac, ir_dc, ir_ac, min_amplitude=100)
+    >>> beats.beat_index
+    array([ 590, 3715, 4131, 4548, 4965])
+    """
+
+    red_dc, red_ac, ir_dc, ir_ac = (np.asarray(trace, dtype=float) for trace in (red_dc, red_ac, ir_dc, ir_ac))
+    if not red_dc.shape == red_ac.shape == ir_dc.shape == ir_ac.shape:
+        raise ValueError("The Red and IR traces must have the same length.")
+
+    if bandpass is None:
+        bandpass = BandpassFilter.design(sample_rate_hz=sample_rate_hz, n_channels=2)
+    settling = bandpass.num_taps - 1
+
+    beat_index, pulse_rate, results = [], [], []
+    for start, stop in segment_trace(red_dc, red_ac, thresholds, settling + 1).valid_intervals():
+        bandpass.reset()
+        filtered = bandpass.process(np.stack((red_ac[start:stop], ir_ac[start:stop])))[:, settling:]
+
+        first = start + settling
+        beats = spo2_from_trace(red_dc[first:stop], filtered[0], ir_dc[first:stop], filtered[1],
+                                lookup_table, sample_rate_hz, min_amplitude)
+        beat_index.append(beats.beat_index + first)
+        pulse_rate.append(beats.pulse_rate)
+        results.append(beats.result)
+
+    if not results:
+        empty = np.empty(0)
+        return TraceSpO2(np.empty(0, dtype=np.intp), empty, SpO2Result(*(empty,) * len(SpO2Result._fields)))
+
+    return TraceSpO2(np.concatenate(beat_index), np.concatenate(pulse_rate),
+                     SpO2Result(*(np.concatenate(field) for field in zip(*results))))
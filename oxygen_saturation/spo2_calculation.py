@@ -0,0 +1,311 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .bandpass_filter import SAMPLE_RATE_HZ
+from .peak_detection import detect_beats
+
+
+class RatioLookupTable:
+    """
+    A uniformly spaced Ratio-to-SpO2 lookup table with linear interpolation.
+
+    The firmware's SpO2_Calculation() maps Ratio to %SpO2 "using lookup table". Because the
+    table is uniformly spaced, the entry of a ratio is found by one index computation
+    instead of a search, and a whole array of ratios is converted at once. Ratios outside
+    the table are clamped to its first or last entry.
+
+    Attributes:
+    - ratio_start (float): The ratio of the first entry.
+    - ratio_step (float): The ratio increment between two entries.
+    - spo2_values (np.ndarray): The %SpO2 of each entry.
+
+    Examples:
+    >>> table = RatioLookupTable(0.0, 0.5, [100, 90, 80])
+    >>> table([0.25, 0.6, 2.0])
+    array([95., 88., 80.])
+    """
+
+    def __init__(self, ratio_start: float, ratio_step: float, spo2_values):
+        """
+        Constructs a new RatioLookupTable instance.
+
+        Parameters:
+        - ratio_start (float): The ratio of the first entry.
+        - ratio_step (float): The ratio increment between two entries.
+        - spo2_values (array_like): The %SpO2 of each entry.
+
+        Raises:
+        - ValueError: If the step is not positive or if there are less than two entries.
+        """
+
+        if ratio_step <= 0:
+            raise ValueError("The ratio step must be positive.")
+
+        self.ratio_start = float(ratio_start)
+        self.ratio_step = float(ratio_step)
+        self.spo2_values = np.asarray(spo2_values, dtype=float).ravel()
+
+        if self.spo2_values.size < 2:
+            raise ValueError("A lookup table needs at least two entries.")
+
+        # Slope of every interval, so that an interpolation is one multiply-add
+        self._slopes = np.append(np.diff(self.spo2_values), 0.0)
+
+    @classmethod
+    def from_function(cls, function, ratio_start: float = 0.0, ratio_stop: float = 3.0,
+                      size: int = 256) -> "RatioLookupTable":
+        """
+        Builds a table by sampling a Ratio-to-SpO2 function on a uniform grid.
+
+        Parameters:
+        - function (callable): Maps an array of ratios to an array of %SpO2.
+        - ratio_start (float): The ratio of the first entry.
+        - ratio_stop (float): The ratio of the last entry.
+        - size (int): The number of entries.
+
+        Returns:
+        RatioLookupTable: The new table.
+
+        Raises:
+        - ValueError: If there are less than two entries, or ratio_stop is not above ratio_start.
+
+        Examples:
+        >>> RatioLookupTable.from_function(lambda ratios: 110 - 25 * ratios, 0.0, 2.0, size=5).spo2_values
+        array([110. ,  97.5,  85. ,  72.5,  60. ])
+        >>> RatioLookupTable.from_function(lambda ratios: 110 - 25 * ratios, size=1)
+        Traceback (most recent call last):
+        ...
+        ValueError: A lookup table needs at least two entries.
+        """
+
+        # Checking before the step is computed, which divides by size - 1
+        if size < 2:
+            raise ValueError("A lookup table needs at least two entries.")
+
+        ratios = np.linspace(ratio_start, ratio_stop, size)
+        return cls(ratio_start, (ratio_stop - ratio_start) / (size - 1), function(ratios))
+
+    @property
+    def ratios(self) -> np.ndarray:
+        """
+        np.ndarray: The ratio of each entry.
+        """
+
+        return self.ratio_start + self.ratio_step * np.arange(self.spo2_values.size)
+
+    def __call__(self, ratio) -> np.ndarray:
+        """
+        Looks up the %SpO2 of one or more ratios.
+
+        Parameters:
+        - ratio (float or array_like): The ratios.
+
+        Returns:
+        np.ndarray: The interpolated %SpO2 of each ratio, NaN where the ratio is NaN.
+        """
+
+        position = (np.asarray(ratio, dtype=float) - self.ratio_start) / self.ratio_step
+        position = np.clip(position, 0, self.spo2_values.size - 1)
+
+        with np.errstate(invalid='ignore'):
+            index = np.nan_to_num(position).astype(np.intp)
+        spo2 = self.spo2_values[index] + (position - index) * self._slopes[index]
+
+        return np.where(np.isnan(position), np.nan, spo2)
+
+    def save(self, file_path: str):
+        """
+        Saves the table to a NumPy .npz file.
+
+        Parameters:
+        - file_path (str): The path to the file.
+        """
+
+        np.savez(file_path, ratio_start=self.ratio_start, ratio_step=self.ratio_step, spo2_values=self.spo2_values)
+
+    @classmethod
+    def load(cls, file_path: str) -> "RatioLookupTable":
+        """
+        Loads a table saved by save.
+
+        Parameters:
+        - file_path (str): The path to the .npz file.
+
+        Returns:
+        RatioLookupTable: The table.
+
+        Raises:
+        - FileNotFoundError: If the specified file does not exist.
+        """
+
+        with np.load(file_path) as data:
+            return cls(float(data["ratio_start"]), float(data["ratio_step"]), data["spo2_values"])
+
+    def to_c_array(self, name: str = "SpO2_Table", values_per_line: int = 8) -> str:
+        """
+        Formats the table as C source for the firmware.
+
+        The entries are a const float array, and the first ratio and the step are macros
+        named after the array, so that SpO2_Calculation() can look up a Ratio with one index
+        computation, like __call__:
+
+            position = (Ratio - SPO2_TABLE_START) / SPO2_TABLE_STEP, clamped to [0, SPO2_TABLE_SIZE - 1]
+            SpO2 = SpO2_Table[i] + (position - i) * (SpO2_Table[i + 1] - SpO2_Table[i]), with i = (int)position
+
+        Parameters:
+        - name (str): The name of the array; the macros use its upper case.
+        - values_per_line (int): The number of entries on each line.
+
+        Returns:
+        str: The macros and the array definition.
+
+        Examples:
+        >>> print(RatioLookupTable(0.0, 0.5, [100, 90, 80]).to_c_array())
+        #define SPO2_TABLE_START 0.0f
+        #define SPO2_TABLE_STEP 0.5f
+        #define SPO2_TABLE_SIZE 3
+        const float SpO2_Table[SPO2_TABLE_SIZE] = {
+            100.0f, 90.0f, 80.0f
+        };
+        """
+
+        def literal(value):
+            # The shortest decimal that rounds to the same float32
+            return np.format_float_positional(np.float32(value), trim='0') + "f"
+
+        prefix = name.upper()
+        values = [literal(value) for value in self.spo2_values]
+        lines = [", ".join(values[i:i + values_per_line]) for i in range(0, len(values), values_per_line)]
+
+        return "\n".join([
+            f"#define {prefix}_START {literal(self.ratio_start)}",
+            f"#define {prefix}_STEP {literal(self.ratio_step)}",
+            f"#define {prefix}_SIZE {self.spo2_values.size}",
+            f"const float {name}[{prefix}_SIZE] = {{",
+            ",\n".join("    " + line for line in lines),
+            "};",
+        ])
+
+
+# Empirical calibration commonly used with this kind of transmissive probe: %SpO2 = 110 - 25 * Ratio
+DEFAULT_LOOKUP_TABLE = RatioLookupTable.from_function(lambda ratio: np.clip(110 - 25 * ratio, 0, 100))
+
+
+class SpO2Result(NamedTuple):
+    """
+    The quantities computed by SpO2_Calculation(), one element per beat.
+
+    Attributes:
+    - ir_vpp (np.ndarray): The IR peak-to-peak value, averaged over the two cycles.
+    - red_vpp (np.ndarray): The Red peak-to-peak value, averaged over the two cycles.
+    - ir_vrms (np.ndarray): The IR RMS value, IR_Vpp / sqrt(8).
+    - red_vrms (np.ndarray): The Red RMS value, Red_Vpp / sqrt(8).
+    - ratio (np.ndarray): (Red_Vrms / CH0_ADRES_Red) / (IR_Vrms / CH0_ADRES_IR).
+    - spo2 (np.ndarray): The %SpO2 looked up from the ratio.
+    """
+
+    ir_vpp: np.ndarray
+    red_vpp: np.ndarray
+    ir_vrms: np.ndarray
+    red_vrms: np.ndarray
+    ratio: np.ndarray
+    spo2: np.ndarray
+
+
+def calculate_spo2(ir_max, ir_min, ir_max2, ir_min2, red_max, red_min, red_max2, red_min2,
+                   dc_red, dc_ir, lookup_table: RatioLookupTable = DEFAULT_LOOKUP_TABLE) -> SpO2Result:
+    """
+    Calculates %SpO2 like the firmware's SpO2_Calculation(), for any number of beats at once.
+
+    Every parameter is an array with one element per beat (or a scalar broadcast to all the
+    beats): the maxima and minima of the two cycles found before Detection_Done, and the DC
+    levels CH0_ADRES_Red and CH0_ADRES_IR at that time.
+
+    Parameters:
+    - ir_max, ir_min, ir_max2, ir_min2 (array_like): IR_Max, IR_Min, IR_Max2 and IR_Min2.
+    - red_max, red_min, red_max2, red_min2 (array_like): Red_Max, Red_Min, Red_Max2 and Red_Min2.
+    - dc_red (array_like): The Red DC level, CH0_ADRES_Red.
+    - dc_ir (array_like): The IR DC level, CH0_ADRES_IR.
+    - lookup_table (RatioLookupTable): The Ratio-to-SpO2 table.
+
+    Returns:
+    SpO2Result: The intermediate quantities and the %SpO2 of every beat.
+
+    Examples:
+    >>> result = calculate_spo2(12, 2, 11, 1, 10, 5, 9, 4, 2000, 2000)
+    >>> float(result.ratio), float(result.spo2)
+    (0.5, 97.5)
+    """
+
+    def vpp(maximum, minimum, maximum2, minimum2):
+        first = np.abs(np.asarray(maximum, dtype=float) - np.asarray(minimum, dtype=float))
+        second = np.abs(np.asarray(maximum2, dtype=float) - np.asarray(minimum2, dtype=float))
+        return (first + second) / 2
+
+    ir_vpp = vpp(ir_max, ir_min, ir_max2, ir_min2)
+    red_vpp = vpp(red_max, red_min, red_max2, red_min2)
+
+    ir_vrms = ir_vpp / np.sqrt(8)
+    red_vrms = red_vpp / np.sqrt(8)
+
+    # Using lookup table to calculate SpO2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (red_vrms / np.asarray(dc_red, dtype=float)) / (ir_vrms / np.asarray(dc_ir, dtype=float))
+    spo2 = lookup_table(ratio)
+
+    return SpO2Result(ir_vpp, red_vpp, ir_vrms, red_vrms, ratio, spo2)
+
+
+class TraceSpO2(NamedTuple):
+    """
+    The result of spo2_from_trace.
+
+    Attributes:
+    - beat_index (np.ndarray): The sample index of each Detection_Done, i.e. of IR_Min2.
+    - pulse_rate (np.ndarray): The pulse rate of each beat in beats per minute.
+    - result (SpO2Result): The SpO2_Calculation() quantities of each beat.
+    """
+
+    beat_index: np.ndarray
+    pulse_rate: np.ndarray
+    result: SpO2Result
+
+
+def spo2_from_trace(red_dc, red_ac, ir_dc, ir_ac, lookup_table: RatioLookupTable = DEFAULT_LOOKUP_TABLE,
+                    sample_rate_hz: float = SAMPLE_RATE_HZ, min_amplitude: float = 0.0) -> TraceSpO2:
+    """
+    Replays SpO2_Calculation() over a whole recorded trace in one vectorized pass.
+
+    The AC traces are expected to be already bandpass filtered (see bandpass_filter). The
+    beats are found with peak_detection.detect_beats; every group of two cycles, IR_Max,
+    IR_Min, IR_Max2 and IR_Min2, gives one beat, and the DC levels are read at IR_Min2,
+    when the firmware sets Detection_Done.
+
+    Parameters:
+    - red_dc (array_like): The Red DC samples, CH0_ADRES_Red.
+    - red_ac (array_like): The filtered Red AC samples.
+    - ir_dc (array_like): The IR DC samples, CH0_ADRES_IR.
+    - ir_ac (array_like): The filtered IR AC samples.
+    - lookup_table (RatioLookupTable): The Ratio-to-SpO2 table.
+    - sample_rate_hz (float): The sampling rate in Hz.
+    - min_amplitude (float): See peak_detection.detect_beats.
+
+    Returns:
+    TraceSpO2: The sample index, pulse rate and SpO2 quantities of every detected beat.
+
+    Raises:
+    - ValueError: If the four traces do not have the same length.
+    """
+
+    red_dc, red_ac, ir_dc, ir_ac = (np.asarray(trace, dtype=float) for trace in (red_dc, red_ac, ir_dc, ir_ac))
+    if not red_dc.shape == red_ac.shape == ir_dc.shape == ir_ac.shape:
+        raise ValueError("The Red and IR traces must have the same length.")
+
+    beats = detect_beats(ir_ac, red_ac, sample_rate_hz, min_amplitude)
+    beat_index = beats.beat_index
+
+    result = calculate_spo2(*beats.ir_extrema.T, *beats.red_extrema.T,
+                            red_dc[beat_index], ir_dc[beat_index], lookup_table)
+
+    return TraceSpO2(beat_index, beats.pulse_rate, result)
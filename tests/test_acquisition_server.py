@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from oxygen_saturation import acquisition_server
+from oxygen_saturation.acquisition_server import DevicePipeline
+from oxygen_saturation.bandpass_filter import SAMPLE_RATE_HZ
+from oxygen_saturation.interrupt_driven_led import SimulatedADC
+
+
+def make_rows(seconds: float, seed: int = 1, flat_from: float = None, flat_to: float = None) -> np.ndarray:
+    """
+    Simulates the Red DC, Red AC, IR DC and IR AC columns of a SAMPLES stream.
+
+    Between flat_from and flat_to seconds the pulsation stops, so the beat detector finds
+    no extremum and keeps more samples pending than while the pulse is regular.
+    """
+    adc = SimulatedADC(seed=seed)
+    times = np.arange(int(seconds * SAMPLE_RATE_HZ)) / SAMPLE_RATE_HZ
+    if flat_from is not None:
+        pulse = adc.pulse
+        adc.pulse = lambda t: np.where((t >= flat_from) & (t < flat_to), 0.0, pulse(t))
+        adc.noise = 0.0
+    red_dc, red_ac = adc.read("red", times)
+    ir_dc, ir_ac = adc.read("ir", times)
+    return np.column_stack((red_dc, red_ac, ir_dc, ir_ac))
+
+
+class TestDevicePipeline(unittest.TestCase):
+
+    def process_in_chunks(self, rows: np.ndarray, sizes) -> list:
+        """
+        Feeds rows to a new pipeline in chunks of the given sizes, cycled, and returns the results.
+        """
+        pipeline = DevicePipeline("bed-1")
+        results = []
+        start = 0
+        for size in sizes:
+            if start >= rows.shape[0]:
+                break
+            results += pipeline.process_samples(start, rows[start:start + size])
+            start += size
+
+            # The DC history holds exactly the samples the detector may still report a beat on
+            self.assertEqual(pipeline._dc.shape[0], pipeline.detector.pending)
+        return results
+
+    def assert_same_results(self, rows: np.ndarray, sizes):
+        """
+        Checks that chunked processing gives the beats, and the SpO2, of one single call.
+        """
+        expected = self.process_in_chunks(rows, [rows.shape[0]])
+        results = self.process_in_chunks(rows, sizes)
+        self.assertGreater(len(expected), 0)
+
+        # The filter state carried between frames only changes the last bits of the values
+        self.assertEqual([result.sample_index for result in results], [result.sample_index for result in expected])
+        np.testing.assert_allclose([result.value for result in results], [result.value for result in expected])
+        np.testing.assert_allclose([result.pulse_rate for result in results], [result.pulse_rate for result in expected])
+
+    def test_chunk_size_does_not_change_the_results(self):
+        """
+        Tests frames of many sizes, from a few samples to several beats.
+        """
+        rows = make_rows(30.0)
+        rng = np.random.default_rng(0)
+        self.assert_same_results(rows, rng.integers(1, 400, 1000).tolist())
+
+    def test_beats_after_a_long_pause_use_their_own_dc(self):
+        """
+        Tests a pause in the pulsation longer than the detector's max_pending, followed by
+        small frames that complete the beats around it: the SpO2 of every beat must use the
+        DC levels of its own sample, not those of the oldest sample of a shorter history.
+        """
+        rows = make_rows(40.0, flat_from=8.0, flat_to=20.0)
+
+        dc_levels = []
+
+        def spy(*args):
+            dc_levels.append(np.column_stack(args[8:10]))
+            return calculate_spo2(*args)
+
+        calculate_spo2 = acquisition_server.calculate_spo2
+        with mock.patch.object(acquisition_server, "calculate_spo2", spy):
+            results = self.process_in_chunks(rows, [2200, 3000] + [7] * 5000)
+
+        self.assertGreater(len(results), 10)
+        sample_index = [result.sample_index for result in results]
+        np.testing.assert_array_equal(np.concatenate(dc_levels), rows[sample_index][:, [0, 2]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import unittest
+
+import numpy as np
+
+from oxygen_saturation.batch_scvo2 import WAVELENGTHS
+from oxygen_saturation.bootstrap_scvo2 import bootstrap_sheets
+
+
+def make_columns(seed: int = 0) -> dict:
+    """
+    Generates the air and Sam1 columns of one sheet.
+    """
+    rng = np.random.default_rng(seed)
+    return {f"{prefix}_{wavelength}": rng.normal(level, 0.1, 30)
+            for prefix, levels in (("air", (14.5, 11.9, 8.5)), ("Sam1", (5.9, 6.5, 3.4)))
+            for wavelength, level in zip(WAVELENGTHS, levels)}
+
+
+class TestBootstrapSheets(unittest.TestCase):
+
+    def bounds(self, file_path: str) -> list:
+        """
+        Returns the interval bounds of the same sheet, scored as part of file_path.
+        """
+        intervals, errors = bootstrap_sheets(file_path, {"Sheet1": make_columns()}, n_resamples=200, workers=1)
+        self.assertEqual(errors, [])
+        return [(interval.lower, interval.upper) for interval in intervals]
+
+    def test_same_file_name_in_other_directories(self):
+        """
+        Tests that workbooks of the same name in different directories get independent
+        resamples, while the same workbook always gets the same intervals.
+        """
+        first = self.bounds(os.path.join("site_a", "data.xlsx"))
+        self.assertEqual(first, self.bounds(os.path.join("site_a", "data.xlsx")))
+        self.assertEqual(first, self.bounds(os.path.abspath(os.path.join("site_a", "data.xlsx"))))
+        self.assertNotEqual(first, self.bounds(os.path.join("site_b", "data.xlsx")))
+
+
+if __name__ == "__main__":
+    unittest.main()
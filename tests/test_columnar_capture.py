@@ -0,0 +1,79 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from oxygen_saturation.columnar_capture import (COLUMNAR_MAGIC, ColumnarCapture, convert_workbook,
+                                                write_columnar_capture)
+from oxygen_saturation.excel_cache import WorkbookCache
+
+
+class TestColumnarCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "capture.oxc")
+        write_columnar_capture(self.path, {"red": np.arange(5.0), "ir": np.arange(5, dtype=np.int16)})
+        with open(self.path, "rb") as file:
+            self.data = file.read()
+
+    def write(self, data: bytes):
+        """
+        Replaces the capture file with data.
+        """
+        with open(self.path, "wb") as file:
+            file.write(data)
+
+    def test_truncated_header(self):
+        """
+        Tests that a file cut anywhere before its last column raises ValueError.
+        """
+        header_end = len(COLUMNAR_MAGIC) + 4 + struct.unpack_from("<I", self.data, len(COLUMNAR_MAGIC))[0]
+        for length in (len(COLUMNAR_MAGIC), len(COLUMNAR_MAGIC) + 2, header_end - 1, header_end + 8):
+            self.write(self.data[:length])
+            with self.assertRaises(ValueError, msg=f"cut after {length} bytes"):
+                ColumnarCapture(self.path)
+
+    def test_corrupt_header(self):
+        """
+        Tests that a header that is not valid UTF-8 JSON, or lacks a key, raises ValueError.
+        """
+        start = len(COLUMNAR_MAGIC) + 4
+        self.write(self.data[:start] + b"\xff" * (len(self.data) - start))
+        with self.assertRaises(ValueError):
+            ColumnarCapture(self.path)
+
+        header = b'{"columns": []}'
+        self.write(COLUMNAR_MAGIC + struct.pack("<I", len(header)) + header)
+        with self.assertRaises(ValueError):
+            ColumnarCapture(self.path)
+
+    def test_sheets_with_similar_names_get_their_own_file(self):
+        """
+        Tests that sheets whose names only differ by punctuation are not written to the same file.
+        """
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        workbook.active.title = "clear 660"
+        workbook.active.append(["air_660"])
+        workbook.active.append([14.5])
+        workbook.create_sheet("clear-660").append(["air_660"])
+        workbook["clear-660"].append([13.5])
+        workbook_path = os.path.join(self.directory, "data.xlsx")
+        workbook.save(workbook_path)
+
+        cache = WorkbookCache(os.path.join(self.directory, "cache"))
+        with mock.patch("oxygen_saturation.excel_cache._default_cache", cache):
+            paths = convert_workbook(workbook_path, os.path.join(self.directory, "captures"))
+
+        self.assertEqual(len(set(paths.values())), 2)
+        self.assertEqual(ColumnarCapture(paths["clear 660"])["air_660"][0], 14.5)
+        self.assertEqual(ColumnarCapture(paths["clear-660"])["air_660"][0], 13.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
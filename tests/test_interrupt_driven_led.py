@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from oxygen_saturation.interrupt_driven_led import InterruptDrivenLED, SimulatedADC
+
+
+class TestInterruptDrivenLED(unittest.TestCase):
+
+    def make_controller(self, pr2: int = 1250, pr3: int = 1250, buffer_size: int = 100) -> InterruptDrivenLED:
+        """
+        Returns a controller with the IR LED on Timer2 and the red LED on Timer3, set up.
+        """
+        led_controller = InterruptDrivenLED(2, 3, 1, 2, pr2=pr2, pr3=pr3, adc=SimulatedADC(seed=0),
+                                            buffer_size=buffer_size)
+        led_controller.setup_interrupts()
+        return led_controller
+
+    def test_pairs_are_time_stamped(self):
+        """
+        Tests that the time buffer holds the interrupt time of both samples of each pair.
+        """
+        led_controller = self.make_controller(buffer_size=300)
+        led_controller.start_ir_led_sequence()
+        led_controller.start_red_led_sequence()
+        led_controller.run(1.0)
+
+        times = led_controller.time_buffer.peek(250)
+        np.testing.assert_allclose(times[:, 0], np.arange(1, 251) * 0.004)
+        np.testing.assert_array_equal(times[:, 0], times[:, 1])
+        self.assertEqual(led_controller.dc_buffer.available, led_controller.time_buffer.available)
+
+    def test_uneven_periods_keep_the_pairs_aligned(self):
+        """
+        Tests that with PR2 != PR3 the k-th Red sample stays paired with the k-th IR sample
+        and that the discarded IR samples are counted as dropped pairs.
+        """
+        # The IR LED samples twice as fast as the red LED
+        led_controller = self.make_controller(pr2=1250, pr3=2500)
+        led_controller.start_ir_led_sequence()
+        led_controller.start_red_led_sequence()
+        acquired = led_controller.run(2.0)
+
+        times = led_controller.time_buffer.peek(100)
+        self.assertGreater(times.shape[0], 0)
+        np.testing.assert_allclose(times[:, 0] / 0.008, times[:, 1] / 0.004)
+
+        # Every IR sample is paired, dropped, or one of the last buffer_size waiting for its pair
+        handled = led_controller.time_buffer.available + led_controller.time_buffer.dropped
+        self.assertGreaterEqual(handled, acquired["ir"] - led_controller.buffer_size)
+        self.assertLessEqual(handled, acquired["ir"])
+        self.assertEqual(led_controller.dc_buffer.dropped, led_controller.time_buffer.dropped)
+        self.assertEqual(led_controller.ac_buffer.dropped, led_controller.time_buffer.dropped)
+
+    def test_single_sequence_counts_the_discarded_samples(self):
+        """
+        Tests that the samples of a sequence running alone are counted as dropped once more
+        than buffer_size of them wait for their pair.
+        """
+        led_controller = self.make_controller()
+        led_controller.start_ir_led_sequence()
+        self.assertEqual(led_controller.run(1.0), {"ir": 250, "red": 0})
+
+        self.assertEqual(led_controller.dc_buffer.available, 0)
+        self.assertEqual(led_controller.dc_buffer.dropped, 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from oxygen_saturation.median_average import RollingMedian
+
+
+class TestRollingMedian(unittest.TestCase):
+
+    def test_matches_the_median_of_the_window(self):
+        """
+        Tests the rolling median against numpy.median on streams with repeated values, NaN
+        and monotonic runs, which move values between the two heaps the most.
+        """
+        rng = np.random.default_rng(0)
+        for window in (1, 2, 3, 4, 7, 10):
+            values = rng.integers(0, 6, 300).astype(float)
+            values[rng.random(300) < 0.1] = np.nan
+            values[100:200] = np.sort(values[100:200])
+
+            valid = []
+            expected = []
+            for value in values:
+                if value == value:
+                    valid.append(value)
+                expected.append(np.median(valid[-window:]) if valid else np.nan)
+
+            rolling = RollingMedian(window)
+            np.testing.assert_array_equal(rolling.extend(values), expected)
+            self.assertEqual(len(rolling), window)
+
+    def test_memory_stays_bounded(self):
+        """
+        Tests that the entries that left the window do not accumulate in the heaps.
+        """
+        rolling = RollingMedian(5)
+        rolling.extend(np.arange(10000.0))
+        self.assertEqual(rolling.median, 9997.0)
+        self.assertLessEqual(len(rolling._low) + len(rolling._high), 2 * rolling.window + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from oxygen_saturation.calibration import fit_calibration
+from oxygen_saturation.cli import main
+from oxygen_saturation.spo2_calculation import RatioLookupTable
+
+
+class TestRatioLookupTable(unittest.TestCase):
+
+    def test_from_function_needs_two_entries(self):
+        """
+        Tests that a table of less than two entries raises ValueError, not ZeroDivisionError.
+        """
+        for size in (1, 0, -3):
+            with self.assertRaises(ValueError):
+                RatioLookupTable.from_function(lambda ratios: 110 - 25 * ratios, size=size)
+
+    def test_from_function_two_entries(self):
+        """
+        Tests the smallest table, which interpolates between its two entries.
+        """
+        table = RatioLookupTable.from_function(lambda ratios: 110 - 25 * ratios, 0.0, 2.0, size=2)
+        np.testing.assert_allclose(table([0.0, 1.0, 2.0]), [110.0, 85.0, 60.0])
+
+    def test_calibration_size_one(self):
+        """
+        Tests that fit_calibration, and the calibrate command, reject a table of one entry.
+        """
+        ratio = np.array([0.4, 0.6, 0.8, 1.0])
+        with self.assertRaises(ValueError):
+            fit_calibration(ratio, 110 - 25 * ratio, size=1)
+
+        path = os.path.join(tempfile.mkdtemp(), "reference.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("ratio,spo2\n0.4,100\n0.6,95\n0.8,90\n1.0,85\n")
+        with self.assertRaises(ValueError):
+            main(["calibrate", path, "--size", "1"])
+
+
+if __name__ == "__main__":
+    unittest.main()